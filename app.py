@@ -1,11 +1,46 @@
 import streamlit as st
-from database import SupabaseHelper
-from datetime import date, datetime
-import pandas as pd
+from database import (
+    SEARCH_LIMIT,
+    SupabaseHelper,
+    TICKET_PAGE_SIZE,
+    TICKET_VIEW_COLUMNS,
+    get_instrumentation,
+    get_round_trip_count,
+)
+from async_database import fetch_concurrently
+from identity_map import IdentityMap
+from instrumentation import bucket_counts, percentile
+from session_store import SESSION_QUERY_PARAM, get_session_store
+from rerun_profiler import (
+    current_profile,
+    finish_profile,
+    profile_phase,
+    start_profile,
+)
+from ticket_filter import TicketFilter
+from ticket_normalize import is_overdue
+from ticket_export import EXPORT_FORMATS, export_tickets_to_tempfile
+from ticket_sync import SNAPSHOT_COLUMNS, get_ticket_snapshot, is_delta_sync_enabled
+from change_feed import (
+    CHANGE_FEED_MODE,
+    CHANGE_FEED_POLL_SECONDS,
+    get_change_feed,
+    get_change_feed_error,
+    get_change_store,
+    is_change_feed_enabled,
+)
+from write_queue import (
+    WRITE_QUEUE_POLL_SECONDS,
+    apply_pending,
+    get_write_queue,
+    is_write_queue_enabled,
+)
+from datetime import datetime
 import os
-import json
-import time
+import secrets
 import hashlib
+import functools
+import contextlib
 
 # Cấu hình trang Streamlit với theme sáng
 st.set_page_config(
@@ -15,55 +50,72 @@ st.set_page_config(
     initial_sidebar_state="collapsed",
 )
 
-# Load environment variables
-from dotenv import load_dotenv
-
-load_dotenv()
-
-# File để lưu trạng thái login
-LOGIN_FILE = ".streamlit_login_cache"
-
-
 def save_login_info(user_data):
-    """Lưu thông tin đăng nhập vào file local"""
+    """Tạo session đăng nhập và đưa token vào URL (?session=...)"""
     try:
-        login_data = {
-            "user_id": user_data.get("id"),
-            "username": user_data.get("username"),
-            "full_name": user_data.get("full_name"),
-            "project": user_data.get("project"),
-            "is_admin": user_data.get("is_admin", False),
-            "timestamp": time.time(),
-            "expires": time.time() + (30 * 24 * 60 * 60),  # 30 days
-        }
-        with open(LOGIN_FILE, "w") as f:
-            json.dump(login_data, f)
+        token = get_session_store().create(user_data)
+    except RuntimeError as e:
+        # Thiếu cấu hình (SESSION_SECRET)
+        st.warning(f"⚠️ Không lưu được phiên đăng nhập: {e}")
+        return
     except Exception as e:
-        pass
+        st.warning(
+            f"⚠️ Không lưu được phiên đăng nhập: {e}. Vui lòng chạy "
+            "python migrate_database.py (migrations/0009_user_sessions.sql, "
+            "0010_user_session_functions.sql)"
+        )
+        return
+    st.query_params[SESSION_QUERY_PARAM] = token
 
 
 def load_login_info():
-    """Đọc thông tin đăng nhập từ file local"""
-    try:
-        if os.path.exists(LOGIN_FILE):
-            with open(LOGIN_FILE, "r") as f:
-                login_data = json.load(f)
+    """
+    Đọc phiên đăng nhập từ token trong URL
+
+    Chữ ký được kiểm tra trước, session hợp lệ nằm trong LRU của process nên
+    thường không cần đọc bảng sessions. Quyền admin và project được đọc lại
+    từ bảng users (user bị hạ quyền/chuyển project không giữ quyền cũ theo
+    session; user đã bị xóa không đăng nhập lại được).
 
-            # Kiểm tra xem có hết hạn không
-            if login_data.get("expires", 0) > time.time():
-                return login_data
+    Returns:
+        dict: user_id, username, full_name, project, is_admin hoặc None
+    """
+    token = st.query_params.get(SESSION_QUERY_PARAM)
+    if not token:
         return None
+    try:
+        login_data = get_session_store().validate(token)
     except Exception as e:
+        st.warning(f"⚠️ Không kiểm tra được phiên đăng nhập: {e}")
         return None
+    if login_data is not None:
+        user = SupabaseHelper().get_user_by_id(login_data["user_id"])
+        if user is None:
+            login_data = None
+        else:
+            login_data = {
+                **login_data,
+                "username": user.get("username"),
+                "full_name": user.get("full_name"),
+                "project": user.get("project"),
+                "is_admin": bool(user.get("is_admin", False)),
+            }
+    if login_data is None:
+        # Token sai, hết hạn, đã đăng xuất hoặc user không còn: bỏ khỏi URL
+        del st.query_params[SESSION_QUERY_PARAM]
+    return login_data
 
 
 def remove_login_info():
-    """Xóa thông tin đăng nhập"""
+    """Xóa phiên đăng nhập (đăng xuất)"""
+    token = st.query_params.get(SESSION_QUERY_PARAM)
+    if not token:
+        return
     try:
-        if os.path.exists(LOGIN_FILE):
-            os.remove(LOGIN_FILE)
+        get_session_store().revoke(token)
     except Exception as e:
-        pass
+        st.warning(f"⚠️ Không xóa được phiên đăng nhập: {e}")
+    del st.query_params[SESSION_QUERY_PARAM]
 
 
 # CSS để ẩn sidebar và custom styling với light theme
@@ -179,6 +231,136 @@ UU_TIEN_OPTIONS = ["Thấp", "Trung bình", "Cao", "Khẩn cấp"]
 
 TRANG_THAI_OPTIONS = ["Chờ xử lý", "Đang xử lý", "Hoàn thành", "Hủy bỏ"]
 
+# Phân trang danh sách tickets (mặc định TICKET_PAGE_SIZE của database.py)
+TICKET_PAGE_SIZE_OPTIONS = [25, 50, 100, 200]
+
+# Chế độ hiển thị bảng: lưới (một widget) hoặc chi tiết (widget theo từng dòng)
+VIEW_MODES = ["📊 Bảng lưới", "📝 Chi tiết"]
+
+# Các cột lọc được theo khoảng ngày (cột -> nhãn)
+TICKET_DATE_FILTERS = {
+    "ngay_yeu_cau": "Ngày tạo",
+    "thoi_han_mong_muon": "Thời hạn",
+    "ngay_hoan_thanh": "Ngày hoàn thành",
+}
+
+# Thứ tự sắp xếp danh sách tickets (nhãn -> (cột, giảm dần))
+TICKET_SORT_OPTIONS = {
+    "Ngày tạo (mới nhất)": ("ngay_yeu_cau", True),
+    "Ngày tạo (cũ nhất)": ("ngay_yeu_cau", False),
+    "Thời hạn (gần nhất)": ("thoi_han_mong_muon", False),
+    "Thời hạn (xa nhất)": ("thoi_han_mong_muon", True),
+    "Ngày hoàn thành (mới nhất)": ("ngay_hoan_thanh", True),
+}
+
+# Giá trị "không đổi" trong thanh thao tác hàng loạt
+BULK_KEEP = "— Giữ nguyên —"
+
+# Các cột cần có để hiện dialog xác nhận xóa ticket (nội dung dùng bản preview nếu
+# chưa tải đầy đủ)
+TICKET_CONFIRM_FIELDS = ["id", "phan_loai", "nen_tang", "uu_tien", "trang_thai"]
+
+# Các phần trang được đếm số request tới Supabase (xem track_round_trips)
+ROUND_TRIP_SCOPES = {
+    "page": "Toàn trang",
+    "tickets": "Tickets",
+    "ticket_list": "Danh sách",
+    "analytics": "Phân tích",
+    "users": "Users",
+    "dialog": "Dialog",
+    "export": "Xuất dữ liệu",
+}
+
+
+# Profiler từng lần chạy lại: bật cho mọi session bằng RERUN_PROFILER=true, hoặc
+# admin bật cho session của mình trong tab Hiệu năng
+RERUN_PROFILER_ENABLED = os.getenv("RERUN_PROFILER", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+# Thư mục ghi file .pstats của các lần chạy có cProfile (trống = chỉ tải xuống)
+RERUN_PROFILE_DIR = os.getenv("RERUN_PROFILE_DIR", "")
+
+# Số lần chạy gần nhất được giữ trong session để xem waterfall
+RERUN_PROFILE_HISTORY = 20
+
+
+def is_rerun_profiler_enabled():
+    """Profiler từng lần chạy lại có đang bật cho session này không"""
+    return RERUN_PROFILER_ENABLED or st.session_state.get("rerun_profiler", False)
+
+
+@contextlib.contextmanager
+def profile_rerun(name):
+    """
+    Đo một phần trang bằng profiler (nếu đang bật)
+
+    Phần đầu tiên của một lần chạy (main khi chạy toàn trang, hoặc fragment/
+    dialog khi chỉ chạy riêng phần đó) bắt đầu một profile mới và lưu vào
+    st.session_state.rerun_profiles; các phần bên trong là span con.
+    """
+    if current_profile() is not None or not is_rerun_profiler_enabled():
+        with profile_phase(name):
+            yield
+        return
+
+    use_cprofile = st.session_state.pop("cprofile_next_rerun", False)
+    profile = start_profile(name, use_cprofile, counter=get_round_trip_count)
+    try:
+        yield
+    finally:
+        # Cả khi bị ngắt bởi st.rerun()/st.stop()
+        finish_profile(profile)
+        profiles = st.session_state.setdefault("rerun_profiles", [])
+        profiles.append(profile)
+        del profiles[:-RERUN_PROFILE_HISTORY]
+        if profile.has_stats and RERUN_PROFILE_DIR:
+            save_rerun_profile(profile)
+
+
+def rerun_profile_filename(profile):
+    """Tên file .pstats của một lần chạy (vd. rerun-20250101-093000-main.pstats)"""
+    started = datetime.fromtimestamp(profile.started_at).strftime("%Y%m%d-%H%M%S")
+    return f"rerun-{started}-{profile.label}.pstats"
+
+
+def save_rerun_profile(profile):
+    """Ghi file .pstats của một lần chạy có cProfile vào RERUN_PROFILE_DIR"""
+    path = os.path.join(RERUN_PROFILE_DIR, rerun_profile_filename(profile))
+    try:
+        os.makedirs(RERUN_PROFILE_DIR, exist_ok=True)
+        profile.dump_stats(path)
+    except OSError as e:
+        st.warning(f"⚠️ Không ghi được file pstats: {e}")
+
+
+def track_round_trips(scope):
+    """
+    Ghi số request tới Supabase của mỗi lần chạy một phần trang vào
+    st.session_state.round_trips[scope]
+
+    Mỗi fragment được đếm riêng, nên có thể so sánh một tương tác chỉ chạy
+    lại fragment với một lần chạy lại toàn trang. Khi bật profiler, phần
+    trang cũng là một span (xem profile_rerun).
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = get_round_trip_count()
+            try:
+                with profile_rerun(func.__name__):
+                    return func(*args, **kwargs)
+            finally:
+                round_trips = st.session_state.setdefault("round_trips", {})
+                round_trips[scope] = get_round_trip_count() - start
+
+        return wrapper
+
+    return decorator
+
 
 def check_credentials(username, password, db):
     """Kiểm tra thông tin đăng nhập từ database"""
@@ -252,7 +434,7 @@ def check_authentication():
     if st.session_state.get("authenticated", False):
         return True
 
-    # Nếu chưa có trong session, kiểm tra file local
+    # Nếu chưa có trong session, kiểm tra token trong URL
     user_data = load_login_info()
     if user_data:
         st.session_state.authenticated = True
@@ -266,62 +448,101 @@ def check_authentication():
     return False
 
 
-def calculate_completion_days(created_date, completed_date):
-    """Tính số ngày hoàn thành"""
-    if not created_date or not completed_date:
-        return None
+def is_ticket_dialog_open():
+    """Kiểm tra có dialog tickets nào đang mở không"""
+    return any(
+        st.session_state.get(flag)
+        for flag in [
+            "show_add_modal",
+            "show_edit_modal",
+            "show_delete_confirm",
+            "show_bulk_delete_confirm",
+        ]
+    )
 
-    try:
-        # Parse dates
-        if isinstance(created_date, str):
-            # Xử lý các format ngày khác nhau
-            created_str = created_date.strip()
-            if "T" in created_str:
-                created = datetime.strptime(created_str[:10], "%Y-%m-%d")
-            else:
-                created = datetime.strptime(created_str[:10], "%Y-%m-%d")
-        elif isinstance(created_date, datetime):
-            created = created_date
-        elif isinstance(created_date, date):
-            created = datetime.combine(created_date, datetime.min.time())
-        else:
-            return None
 
-        if isinstance(completed_date, str):
-            # Xử lý các format ngày khác nhau
-            completed_str = completed_date.strip()
-            if "T" in completed_str:
-                completed = datetime.strptime(completed_str[:10], "%Y-%m-%d")
-            else:
-                completed = datetime.strptime(completed_str[:10], "%Y-%m-%d")
-        elif isinstance(completed_date, datetime):
-            completed = completed_date
-        elif isinstance(completed_date, date):
-            completed = datetime.combine(completed_date, datetime.min.time())
-        else:
-            return None
+@st.fragment(run_every=CHANGE_FEED_POLL_SECONDS)
+def watch_ticket_changes(project):
+    """
+    Theo dõi change feed: chỉ so sánh version trong bộ nhớ (không gọi Supabase),
+    và rerun trang khi có ticket liên quan vừa thay đổi
+    """
+    version = get_change_store().version_for(project)
+    last_seen = st.session_state.get("ticket_feed_version")
+    if last_seen == version:
+        return
 
-        # Calculate difference
-        diff = completed - created
-        return max(0, diff.days)  # Không trả về số âm
-    except (ValueError, TypeError, AttributeError) as e:
-        return None
-    except Exception as e:
-        return None
+    # Không rerun khi đang mở dialog để không làm mất dữ liệu đang nhập
+    if is_ticket_dialog_open():
+        return
+
+    st.session_state.ticket_feed_version = version
+    if last_seen is not None:
+        st.rerun()
+
+
+def write_queue_owner():
+    """ID của session trong hàng đợi ghi nền (để nhận kết quả thao tác của mình)"""
+    if "write_queue_owner" not in st.session_state:
+        st.session_state.write_queue_owner = secrets.token_hex(8)
+    return st.session_state.write_queue_owner
+
+
+@st.fragment(run_every=WRITE_QUEUE_POLL_SECONDS)
+def watch_pending_writes():
+    """
+    Theo dõi hàng đợi ghi nền (không gọi Supabase): khi mọi thao tác của
+    session đã xong, nhận kết quả rồi rerun trang một lần để thay bản lạc quan
+    bằng dữ liệu thật (hoặc hoàn tác nếu lỗi)
+    """
+    write_queue = get_write_queue()
+    owner = write_queue_owner()
+    if write_queue.jobs_for(owner) or is_ticket_dialog_open():
+        return
+
+    finished = write_queue.take_finished(owner)
+    if not finished:
+        return
 
+    # Thread nền ghi không qua identity map của session: cập nhật ở đây để
+    # dialog sửa không dùng lại dòng cũ (lưu lại sẽ ghi đè thay đổi vừa xong)
+    identity_map = st.session_state.get("identity_map")
+    if identity_map is not None:
+        for job in finished:
+            if job.result:
+                identity_map.remember("tickets", [job.result])
+            elif job.ticket_id is not None:
+                identity_map.forget("tickets", [job.ticket_id])
 
+    st.session_state.write_results = st.session_state.get("write_results", []) + [
+        {"action": job.describe(), "error": job.error} for job in finished
+    ]
+    st.rerun()
+
+
+@track_round_trips("page")
 def main():
     # Kiểm tra xác thực trước
-    if not check_authentication():
+    with profile_phase("check_authentication"):
+        authenticated = check_authentication()
+    if not authenticated:
         show_login_form()
         return
 
+    # Identity map của session: dialog dùng lại các dòng đã tải
+    if "identity_map" not in st.session_state:
+        st.session_state.identity_map = IdentityMap()
+
     try:
-        db = SupabaseHelper()
+        with profile_phase("init_database"):
+            db = SupabaseHelper(identity_map=st.session_state.identity_map)
     except Exception as e:
         st.error(f"❌ Lỗi kết nối Supabase: {e}")
         return
 
+    # Đánh số mỗi lần chạy toàn trang để các fragment phân biệt với lần chạy riêng
+    st.session_state.page_run = st.session_state.get("page_run", 0) + 1
+
     # Khởi tạo session states
     if "show_add_modal" not in st.session_state:
         st.session_state.show_add_modal = False
@@ -331,6 +552,8 @@ def main():
         st.session_state.edit_ticket_id = None
     if "show_delete_confirm" not in st.session_state:
         st.session_state.show_delete_confirm = False
+    if "show_bulk_delete_confirm" not in st.session_state:
+        st.session_state.show_bulk_delete_confirm = False
     if "delete_ticket_id" not in st.session_state:
         st.session_state.delete_ticket_id = None
 
@@ -350,34 +573,50 @@ def main():
     is_admin = st.session_state.get("is_admin", False)
 
     # Header chung với thông tin user
-    col1, col2 = st.columns([4, 1])
-    with col1:
-        user_info = f"👤 {st.session_state.get('full_name', st.session_state.get('username', 'User'))} | 📁 Project: {st.session_state.get('project', 'N/A')}"
-        if is_admin:
-            user_info += " | 👑 Administrator"
-        st.caption(user_info)
-    with col2:
-        if st.button(
-            "🚪 Đăng xuất", help="Đăng xuất khỏi hệ thống", use_container_width=True
-        ):
-            # Xóa session state
-            st.session_state.authenticated = False
-            # Xóa tất cả thông tin user
-            for key in ["username", "user_id", "full_name", "project", "is_admin"]:
-                if key in st.session_state:
-                    del st.session_state[key]
-            remove_login_info()  # Xóa thông tin đăng nhập
-            st.rerun()
+    with profile_phase("header"):
+        col1, col2 = st.columns([4, 1])
+        with col1:
+            user_info = f"👤 {st.session_state.get('full_name', st.session_state.get('username', 'User'))} | 📁 Project: {st.session_state.get('project', 'N/A')}"
+            if is_admin:
+                user_info += " | 👑 Administrator"
+            st.caption(user_info)
+        with col2:
+            if st.button(
+                "🚪 Đăng xuất", help="Đăng xuất khỏi hệ thống", use_container_width=True
+            ):
+                # Xóa session state
+                st.session_state.authenticated = False
+                # Xóa tất cả thông tin user
+                for key in ["username", "user_id", "full_name", "project", "is_admin"]:
+                    if key in st.session_state:
+                        del st.session_state[key]
+                remove_login_info()  # Xóa thông tin đăng nhập
+                st.rerun()
+
+    # Nhận thay đổi từ các session khác mà không cần tải lại toàn bộ
+    if is_change_feed_enabled():
+        with profile_phase("change_feed"):
+            get_change_feed()
+            watch_ticket_changes(None if is_admin else st.session_state.get("project"))
+
+    # Chờ kết quả các thao tác thêm/sửa ticket đang ghi nền của session
+    if is_write_queue_enabled() and get_write_queue().has_jobs(write_queue_owner()):
+        watch_pending_writes()
 
     # Navigation menu cho admin
     if is_admin:
-        tab1, tab2 = st.tabs(["📋 Quản lý Tickets", "👥 Quản lý Users"])
+        tab1, tab2, tab3 = st.tabs(
+            ["📋 Quản lý Tickets", "👥 Quản lý Users", "⏱️ Hiệu năng"]
+        )
 
         with tab1:
             show_tickets_table(db)
 
         with tab2:
             show_users_management(db)
+
+        with tab3:
+            show_performance()
     else:
         # User thường chỉ xem tickets
         show_tickets_table(db)
@@ -392,6 +631,9 @@ def main():
     if st.session_state.show_delete_confirm:
         show_delete_confirmation(db)
 
+    if st.session_state.show_bulk_delete_confirm:
+        show_bulk_delete_confirmation(db)
+
     # Modals cho users (chỉ cho admin)
     if is_admin:
         if st.session_state.show_add_user_modal:
@@ -403,8 +645,20 @@ def main():
         if st.session_state.show_delete_user_confirm:
             show_delete_user_confirmation(db)
 
+    # Waterfall của các lần chạy trước (lần hiện tại được lưu khi kết thúc)
+    if is_rerun_profiler_enabled():
+        show_rerun_profiles()
+
 
+@st.fragment
+@track_round_trips("tickets")
 def show_tickets_table(db):
+    """
+    Phần tickets (fragment): bộ lọc, thống kê và danh sách
+
+    Đổi bộ lọc chỉ chạy lại fragment này, không chạy lại xác thực, header
+    hay tab users.
+    """
     # Header với filters và nút thêm
     col1, col2 = st.columns([4, 1])
 
@@ -414,252 +668,879 @@ def show_tickets_table(db):
     with col2:
         if st.button("➕ Thêm Ticket", type="primary", use_container_width=True):
             st.session_state.show_add_modal = True
+            # Dialog được mở ở main() nên cần chạy lại cả trang (dữ liệu đã có trong cache)
             st.rerun()
 
-    # Filters
-    col1, col2, col3 = st.columns(3)
+    # Lấy dữ liệu từ bảng theo project của user
+    try:
+        with profile_phase("show_ticket_filters"):
+            filters = show_ticket_filters()
+
+        # Lấy tickets theo project của user
+        user_project = st.session_state.get("project")
+        is_admin = st.session_state.get("is_admin", False)
+
+        # Về trang đầu khi bộ lọc thay đổi
+        filter_signature = filters.key()
+        if st.session_state.get("ticket_filter_signature") != filter_signature:
+            st.session_state.ticket_filter_signature = filter_signature
+            st.session_state.ticket_page = 0
+
+        scope_project = None if is_admin else user_project
+        page = st.session_state.get("ticket_page", 0)
+        page_size = st.session_state.get("ticket_page_size", TICKET_PAGE_SIZE)
+
+        # Lần chạy lại toàn trang (không phải chỉ fragment này): tab users cũng
+        # được vẽ lại nên danh sách users được gửi kèm
+        full_run = st.session_state.get("tickets_page_run") != st.session_state.get(
+            "page_run"
+        )
+        st.session_state.tickets_page_run = st.session_state.get("page_run")
+
+        snapshot = None
+        with profile_phase("fetch_data"):
+            if is_delta_sync_enabled():
+                # Snapshot cục bộ: chỉ tải các dòng thay đổi kể từ lần sync trước
+                snapshot = get_ticket_snapshot(scope_project)
+                if not snapshot.sync(db):
+                    st.warning(
+                        "⚠️ Không đồng bộ được tickets, đang hiển thị dữ liệu cũ."
+                    )
+                stats = snapshot.stats(filters)
+            else:
+                # Trang tickets, thống kê (tổng hợp trong database) và với admin là
+                # danh sách users cho tab bên cạnh được gửi song song; trang tickets
+                # nằm sẵn trong cache cho fragment danh sách bên dưới
+                calls = {
+                    "page": (
+                        "select_tickets_page",
+                        scope_project,
+                        filters if filters else None,
+                        page,
+                        page_size,
+                        TICKET_VIEW_COLUMNS["list"],
+                    ),
+                    "stats": (
+                        "get_ticket_stats",
+                        scope_project,
+                        filters if filters else None,
+                    ),
+                }
+                if is_admin and full_run:
+                    calls["users"] = ("get_all_users",)
+                stats = fetch_concurrently(db, **calls)["stats"]
+
+        with profile_phase("show_ticket_stats"):
+            show_ticket_stats(db, stats, is_admin)
+
+        show_ticket_export(
+            db, scope_project, filters, stats["total"] if stats else None
+        )
+
+        # Phân tích chi tiết chỉ tải thêm vài cột nhỏ khi người dùng bật
+        show_ticket_analytics(db, scope_project, filters, snapshot)
+
+        show_ticket_list(db, scope_project, filters, snapshot)
+    except Exception as e:
+        st.error(f"Lỗi khi lấy dữ liệu: {e}")
+
+
+def show_ticket_filters():
+    """
+    Hiển thị bộ lọc tickets (nhiều giá trị, khoảng ngày, quá hạn)
+
+    Returns:
+        TicketFilter: Bộ lọc đang chọn (lọc trong database)
+    """
+    col1, col2, col3, col4 = st.columns(4)
     with col1:
-        filter_trang_thai = st.selectbox(
-            "Lọc theo trạng thái:", ["Tất cả"] + TRANG_THAI_OPTIONS
+        trang_thai = st.multiselect(
+            "Lọc theo trạng thái:", TRANG_THAI_OPTIONS, placeholder="Tất cả"
         )
     with col2:
-        filter_uu_tien = st.selectbox("Lọc theo ưu tiên:", ["Tất cả"] + UU_TIEN_OPTIONS)
+        uu_tien = st.multiselect(
+            "Lọc theo ưu tiên:", UU_TIEN_OPTIONS, placeholder="Tất cả"
+        )
     with col3:
-        filter_phan_loai = st.selectbox(
-            "Lọc theo phân loại:", ["Tất cả"] + PHAN_LOAI_OPTIONS
+        phan_loai = st.multiselect(
+            "Lọc theo phân loại:", PHAN_LOAI_OPTIONS, placeholder="Tất cả"
+        )
+    with col4:
+        nen_tang = st.multiselect(
+            "Lọc theo nền tảng:", NEN_TANG_OPTIONS, placeholder="Tất cả"
         )
 
-    # Lấy dữ liệu từ bảng theo project của user
+    date_ranges = {}
+    with st.expander("📅 Lọc theo ngày"):
+        date_cols = st.columns(3)
+        for col, (column, label) in zip(date_cols, TICKET_DATE_FILTERS.items()):
+            with col:
+                picked = st.date_input(
+                    label, value=(), format="DD/MM/YYYY", key=f"filter_{column}"
+                )
+            # Đang chọn dở (mới có ngày bắt đầu) -> lọc từ ngày đó
+            if picked:
+                date_ranges[column] = (picked[0], picked[1] if picked[1:] else None)
+        overdue = st.checkbox("⚠️ Chỉ tickets quá hạn", key="filter_overdue")
+
+    return TicketFilter(
+        values={
+            "trang_thai": trang_thai,
+            "uu_tien": uu_tien,
+            "phan_loai": phan_loai,
+            "nen_tang": nen_tang,
+        },
+        date_ranges=date_ranges,
+        overdue=overdue,
+    )
+
+
+def show_ticket_stats(db, stats, is_admin=False):
+    """
+    Hiển thị các ô thống kê tổng quan
+
+    Args:
+        db (SupabaseHelper): Database helper
+        stats (dict): Kết quả get_ticket_stats (None nếu lỗi)
+        is_admin (bool): Hiện thêm bộ đếm cache và round trip cho admin
+    """
     try:
-        # Áp dụng filters
-        filters = {}
-        if filter_trang_thai != "Tất cả":
-            filters["trang_thai"] = filter_trang_thai
-        if filter_uu_tien != "Tất cả":
-            filters["uu_tien"] = filter_uu_tien
-        if filter_phan_loai != "Tất cả":
-            filters["phan_loai"] = filter_phan_loai
+        if stats is None:
+            raise ValueError("không lấy được thống kê")
 
-        # Lấy tickets theo project của user
-        user_project = st.session_state.get("project")
-        is_admin = st.session_state.get("is_admin", False)
+        total_tickets = stats["total"]
+        cho_xu_ly = stats["by_status"].get("Chờ xử lý", 0)
+        dang_xu_ly = stats["by_status"].get("Đang xử lý", 0)
+        hoan_thanh = stats["by_status"].get("Hoàn thành", 0)
 
-        if is_admin:
-            # Admin có thể xem tất cả tickets
-            tickets = db.select_data("tickets", "*", filters if filters else None)
+        # Thời gian hoàn thành trung bình
+        if stats["avg_completion_days"] is not None:
+            avg_display = f"{stats['avg_completion_days']} ngày"
         else:
-            # User thường chỉ xem tickets của project mình
-            tickets = db.select_tickets_by_project(
-                user_project, filters if filters else None
+            avg_display = "Chưa có dữ liệu"
+
+        # Hiển thị thống kê
+        col1, col2, col3, col4, col5 = st.columns(5)
+        with col1:
+            st.metric("Tổng tickets", total_tickets)
+        with col2:
+            st.metric("Chờ xử lý", cho_xu_ly)
+        with col3:
+            st.metric("Đang xử lý", dang_xu_ly)
+        with col4:
+            st.metric("Hoàn thành", hoan_thanh)
+        with col5:
+            st.metric("TG HT trung bình", avg_display)
+
+        # Bộ đếm cache truy vấn và round trip (chỉ admin)
+        if is_admin:
+            cache_stats = db.get_cache_stats()
+            st.caption(
+                f"🗄️ Cache: {cache_stats['hits']} hit / {cache_stats['misses']} miss"
+                f" ({cache_stats['hit_rate']:.0%}) · {cache_stats['size']} entry"
             )
+            round_trips = st.session_state.get("round_trips", {})
+            if round_trips:
+                st.caption(
+                    "🔁 Request tới Supabase (lần chạy gần nhất): "
+                    + " · ".join(
+                        f"{ROUND_TRIP_SCOPES.get(scope, scope)}: {count}"
+                        for scope, count in round_trips.items()
+                    )
+                )
 
-        # Kiểm tra dữ liệu hợp lệ
-        if tickets is None:
-            tickets = []
-        elif not isinstance(tickets, list):
-            tickets = []
+    except Exception as e:
+        st.error(f"Lỗi khi tính toán thống kê: {e}")
+        # Hiển thị thống kê cơ bản
+        col1, col2, col3, col4, col5 = st.columns(5)
+        with col1:
+            st.metric("Tổng tickets", 0)
+        with col2:
+            st.metric("Chờ xử lý", 0)
+        with col3:
+            st.metric("Đang xử lý", 0)
+        with col4:
+            st.metric("Hoàn thành", 0)
+        with col5:
+            st.metric("TG HT trung bình", "Lỗi tính toán")
+
+
+@st.fragment
+@track_round_trips("export")
+def show_ticket_export(db, project, filters, total=None):
+    """
+    Xuất tickets đang lọc ra CSV/Parquet (fragment: tạo file không chạy lại
+    danh sách)
 
-        try:
-            total_tickets = len(tickets) if tickets else 0
-            cho_xu_ly = (
-                len([t for t in tickets if t.get("trang_thai") == "Chờ xử lý"])
-                if tickets
-                else 0
+    File được ghi theo từng trang vào file tạm; nút tải xuống chỉ đọc file
+    khi người dùng bấm.
+
+    Args:
+        db (SupabaseHelper): Database helper
+        project (str): Project cần lọc (None = tất cả project)
+        filters (TicketFilter): Các filter đang áp dụng
+        total (int): Tổng số tickets khớp bộ lọc (để hiện tiến độ)
+    """
+    with st.expander("📥 Xuất dữ liệu"):
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            fmt = st.radio(
+                "Định dạng:",
+                list(EXPORT_FORMATS),
+                format_func=str.upper,
+                key="ticket_export_format",
+                horizontal=True,
             )
-            dang_xu_ly = (
-                len([t for t in tickets if t.get("trang_thai") == "Đang xử lý"])
-                if tickets
-                else 0
+        signature = (project, filters.key() if filters else (), fmt)
+
+        # File của lần xuất trước không còn khớp bộ lọc/định dạng (hoặc đã bị
+        # dọn vì quá EXPORT_FILE_MAX_AGE) -> bỏ
+        export = st.session_state.get("ticket_export")
+        if export and (
+            export["signature"] != signature or not os.path.exists(export["path"])
+        ):
+            discard_ticket_export()
+            export = None
+
+        with col2:
+            create = st.button("⚙️ Tạo file", use_container_width=True)
+
+        if create:
+            discard_ticket_export()
+            bar = st.progress(0.0, text="Đang xuất tickets...")
+            try:
+                path, rows = export_tickets_to_tempfile(
+                    db,
+                    fmt,
+                    project,
+                    filters or None,
+                    on_progress=lambda written: bar.progress(
+                        min(written / total, 1.0) if total else 0.0,
+                        text=f"Đã xuất {written}/{total or '?'} tickets...",
+                    ),
+                )
+            except Exception as e:
+                bar.empty()
+                st.error(f"Lỗi khi xuất tickets: {e}")
+                return
+            bar.empty()
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            export = {
+                "path": path,
+                "rows": rows,
+                "signature": signature,
+                "file_name": f"tickets_{project or 'all'}_{timestamp}"
+                + EXPORT_FORMATS[fmt][1],
+                "mime": EXPORT_FORMATS[fmt][0],
+            }
+            st.session_state.ticket_export = export
+
+        if export:
+            st.download_button(
+                f"⬇️ Tải xuống ({export['rows']} tickets)",
+                data=functools.partial(read_export_file, export["path"]),
+                file_name=export["file_name"],
+                mime=export["mime"],
+                on_click="ignore",
+                type="primary",
             )
-            hoan_thanh = (
-                len([t for t in tickets if t.get("trang_thai") == "Hoàn thành"])
-                if tickets
-                else 0
+
+
+def read_export_file(path):
+    """Đọc file đã xuất (chạy trên thread riêng khi người dùng bấm tải xuống)"""
+    with open(path, "rb") as file:
+        return file.read()
+
+
+def discard_ticket_export():
+    """Xóa file tạm của lần xuất trước (nếu có)"""
+    export = st.session_state.pop("ticket_export", None)
+    if export:
+        try:
+            os.remove(export["path"])
+        except OSError:
+            pass
+
+
+@st.fragment
+@track_round_trips("analytics")
+def show_ticket_analytics(db, project, filters, snapshot=None):
+    """Nút bật phân tích chi tiết (fragment: bật/tắt không tải lại danh sách)"""
+    if st.toggle("📈 Phân tích chi tiết", key="show_ticket_analytics"):
+        show_ticket_breakdowns(db, project, filters, snapshot)
+
+
+@st.fragment
+@track_round_trips("ticket_list")
+def show_ticket_list(db, project, filters, snapshot=None):
+    """
+    Danh sách tickets (fragment): chuyển trang, đổi số dòng, đổi kiểu hiển thị
+    và chọn dòng chỉ chạy lại phần này và chỉ tải lại trang tickets
+
+    Args:
+        db (SupabaseHelper): Database helper
+        project (str): Project cần lọc (None = tất cả project)
+        filters (TicketFilter): Các filter đang áp dụng
+        snapshot (TicketSnapshot): Snapshot cục bộ nếu đang đồng bộ delta
+    """
+    col1, col2, col3 = st.columns([3, 2, 2])
+    with col1:
+        search_query = st.text_input(
+            "🔍 Tìm kiếm:",
+            key="ticket_search",
+            placeholder="Tìm trong nội dung và ghi chú (không cần gõ dấu)",
+        )
+    with col2:
+        sort_label = st.selectbox(
+            "Sắp xếp:",
+            list(TICKET_SORT_OPTIONS),
+            key="ticket_sort",
+            on_change=set_ticket_page,
+            args=(0,),
+            disabled=bool(search_query.strip()),
+        )
+    with col3:
+        st.radio("Hiển thị:", VIEW_MODES, key="ticket_view_mode", horizontal=True)
+
+    if search_query.strip():
+        show_ticket_search_results(db, search_query, project, filters, snapshot)
+        return
+
+    sort_column, descending = TICKET_SORT_OPTIONS[sort_label]
+    filters = TicketFilter.from_dict(filters).with_sort(sort_column, descending)
+
+    page = st.session_state.get("ticket_page", 0)
+    page_size = st.session_state.get("ticket_page_size", TICKET_PAGE_SIZE)
+    if snapshot is not None:
+        page_result = snapshot.query_page(filters, page, page_size)
+        # Dòng đến từ change feed chưa có tên người tạo -> tra danh bạ users
+        db.attach_creator_names(page_result["data"])
+        st.session_state.identity_map.remember(
+            "tickets", page_result["data"], SNAPSHOT_COLUMNS
+        )
+    else:
+        page_result = db.select_tickets_page(
+            project,
+            filters if filters else None,
+            page=page,
+            page_size=page_size,
+            columns=TICKET_VIEW_COLUMNS["list"],
+        )
+
+    tickets = page_result["data"]
+    st.session_state.ticket_page = page_result["page"]
+    if is_write_queue_enabled():
+        # Thay đổi đang ghi nền của session hiện ngay (cập nhật lạc quan)
+        tickets = apply_pending(
+            tickets,
+            get_write_queue().jobs_for(write_queue_owner()),
+            include_inserts=page_result["page"] == 0,
+            ticket_filter=filters,
+        )
+
+    show_bulk_result()
+    show_write_results()
+
+    if tickets and len(tickets) > 0:
+        if st.session_state.get("ticket_view_mode", VIEW_MODES[0]) == VIEW_MODES[0]:
+            show_tickets_grid(db, tickets)
+        else:
+            show_tickets_rows(tickets)
+
+        show_ticket_pager(page_result)
+
+    else:
+        st.info("Không có ticket nào.")
+
+
+def show_ticket_search_results(db, search_query, project, filters, snapshot=None):
+    """
+    Hiển thị kết quả tìm kiếm (liên quan nhất trước, không phân trang)
+
+    Args:
+        db (SupabaseHelper): Database helper
+        search_query (str): Chuỗi cần tìm
+        project (str): Project cần lọc (None = tất cả project)
+        filters (TicketFilter): Các filter đang áp dụng
+        snapshot (TicketSnapshot): Snapshot cục bộ nếu đang đồng bộ delta
+    """
+    if snapshot is not None and snapshot.supports_search:
+        # Bản sao SQLite: tìm bằng FTS5 cục bộ, không gửi request
+        tickets = snapshot.search(search_query, filters or None)
+        db.attach_creator_names(tickets)
+        st.session_state.identity_map.remember("tickets", tickets, SNAPSHOT_COLUMNS)
+    else:
+        tickets = db.search_tickets(search_query, project, filters or None)
+    if is_write_queue_enabled():
+        jobs = get_write_queue().jobs_for(write_queue_owner())
+        tickets = apply_pending(tickets, jobs)
+
+    show_bulk_result()
+    show_write_results()
+
+    if not tickets:
+        st.info("Không tìm thấy ticket nào.")
+        return
+
+    if len(tickets) >= SEARCH_LIMIT:
+        st.caption(
+            f"Hiển thị {len(tickets)} kết quả liên quan nhất, hãy thêm từ khóa để"
+            " thu hẹp kết quả."
+        )
+    else:
+        st.caption(f"Tìm thấy {len(tickets)} tickets.")
+
+    if st.session_state.get("ticket_view_mode", VIEW_MODES[0]) == VIEW_MODES[0]:
+        show_tickets_grid(db, tickets)
+    else:
+        show_tickets_rows(tickets)
+
+
+def show_ticket_breakdowns(db, project, filters, snapshot=None):
+    """
+    Hiển thị phân bố tickets theo trạng thái, ưu tiên và nền tảng
+
+    Args:
+        db (SupabaseHelper): Database helper
+        project (str): Project cần lọc (None = tất cả project)
+        filters (TicketFilter): Các filter đang áp dụng
+        snapshot (TicketSnapshot): Snapshot cục bộ nếu đang đồng bộ delta
+    """
+    if snapshot is not None:
+        rows = snapshot.select(filters)
+    elif project:
+        rows = db.select_tickets_by_project(
+            project, filters or None, TICKET_VIEW_COLUMNS["analytics"]
+        )
+    else:
+        rows = db.select_data(
+            "tickets", TICKET_VIEW_COLUMNS["analytics"], filters or None
+        )
+
+    # pandas chỉ được import khi cần (khởi động nhanh hơn, xem warmup.py)
+    from ticket_analytics import breakdowns, tickets_to_frame
+
+    frame = tickets_to_frame(
+        rows,
+        categories={
+            "trang_thai": TRANG_THAI_OPTIONS,
+            "uu_tien": UU_TIEN_OPTIONS,
+            "nen_tang": NEN_TANG_OPTIONS,
+        },
+    )
+    titles = {"trang_thai": "Trạng thái", "uu_tien": "Ưu tiên", "nen_tang": "Nền tảng"}
+
+    cols = st.columns(3)
+    for col, (column, table) in zip(cols, breakdowns(frame).items()):
+        with col:
+            st.markdown(f"**Theo {titles[column].lower()}**")
+            st.dataframe(
+                table.rename(
+                    columns={"so_luong": "Số lượng", "tg_ht_trung_binh": "TG HT TB"}
+                ).rename_axis(titles[column]),
+                use_container_width=True,
             )
 
-            # Tính thời gian hoàn thành trung bình
-            completion_times = []
-            if tickets:
-                completed_tickets = [
-                    t for t in tickets if t.get("trang_thai") == "Hoàn thành"
-                ]
-                for ticket in completed_tickets:
-                    try:
-                        days = calculate_completion_days(
-                            ticket.get("ngay_yeu_cau"), ticket.get("ngay_hoan_thanh")
-                        )
-                        if days is not None and isinstance(days, (int, float)):
-                            completion_times.append(days)
-                    except Exception:
-                        continue
-
-            # Tính thời gian trung bình
-            if completion_times and len(completion_times) > 0:
-                avg_completion_time = round(
-                    sum(completion_times) / len(completion_times), 1
-                )
-                avg_display = f"{avg_completion_time} ngày"
-            else:
-                avg_display = "Chưa có dữ liệu"
-
-            # Hiển thị thống kê
-            col1, col2, col3, col4, col5 = st.columns(5)
-            with col1:
-                st.metric("Tổng tickets", total_tickets)
-            with col2:
-                st.metric("Chờ xử lý", cho_xu_ly)
-            with col3:
-                st.metric("Đang xử lý", dang_xu_ly)
-            with col4:
-                st.metric("Hoàn thành", hoan_thanh)
-            with col5:
-                st.metric("TG HT trung bình", avg_display)
-
-        except Exception as e:
-            st.error(f"Lỗi khi tính toán thống kê: {e}")
-            # Hiển thị thống kê cơ bản
-            col1, col2, col3, col4, col5 = st.columns(5)
-            with col1:
-                st.metric("Tổng tickets", 0)
-            with col2:
-                st.metric("Chờ xử lý", 0)
-            with col3:
-                st.metric("Đang xử lý", 0)
-            with col4:
-                st.metric("Hoàn thành", 0)
-            with col5:
-                st.metric("TG HT trung bình", "Lỗi tính toán")
-
-        if tickets and len(tickets) > 0:
-            # Header cho bảng
-            header_cols = st.columns(
-                [0.4, 2, 0.7, 0.5, 0.9, 0.9, 0.9, 0.9, 0.9, 1.5, 0.7, 1.2]
+
+def format_uu_tien(priority):
+    """Định dạng ưu tiên kèm biểu tượng màu sắc"""
+    priority = str(priority or "")
+    if priority == "Khẩn cấp":
+        return f"🔴 {priority}"
+    elif priority == "Cao":
+        return f"🟠 {priority}"
+    elif priority == "Trung bình":
+        return f"🟡 {priority}"
+    else:
+        return f"🟢 {priority}"
+
+
+def format_trang_thai(status):
+    """Định dạng trạng thái kèm biểu tượng màu sắc"""
+    status = str(status or "")
+    if status == "Hoàn thành":
+        return f"✅ {status}"
+    elif status == "Đang xử lý":
+        return f"🔄 {status}"
+    elif status == "Chờ phản hồi":
+        return f"⏳ {status}"
+    else:
+        return f"⏸️ {status}"
+
+
+def format_date(value, empty=""):
+    """Định dạng ngày đã parse (date) để hiển thị"""
+    return value.isoformat() if value else empty
+
+
+def format_thoi_han(ticket):
+    """Định dạng thời hạn, đánh dấu ticket quá hạn (tính theo ngày hiện tại)"""
+    deadline = format_date(ticket.get("thoi_han_mong_muon_date"))
+    return f"⚠️ {deadline}" if is_overdue(ticket) else deadline
+
+
+def truncate_text(text, length, empty=""):
+    """Cắt ngắn văn bản để hiển thị trong bảng"""
+    text = str(text or "")
+    if not text:
+        return empty
+    return text[:length] + "..." if len(text) > length else text
+
+
+def ticket_preview(ticket, column, length, empty=""):
+    """Lấy bản preview do server tạo, nếu không có thì tự cắt ngắn"""
+    preview_column = f"{column}_preview"
+    if preview_column in ticket:
+        return ticket.get(preview_column) or empty
+    return truncate_text(ticket.get(column), length, empty)
+
+
+def format_noi_dung(ticket):
+    """Preview nội dung, có dấu ⏳ khi ticket đang được ghi nền"""
+    preview = ticket_preview(ticket, "noi_dung", 30)
+    return f"⏳ {preview}" if ticket.get("dang_luu") else preview
+
+
+# Formatter cho từng cột của bảng lưới tickets (áp dụng theo cột, không theo widget)
+TICKET_GRID_COLUMNS = {
+    "ID": lambda t: t.get("id"),
+    "Nội dung": format_noi_dung,
+    "Phân loại": lambda t: str(t.get("phan_loai") or ""),
+    "Nền tảng": lambda t: str(t.get("nen_tang") or ""),
+    "Ưu tiên": lambda t: format_uu_tien(t.get("uu_tien")),
+    "Trạng thái": lambda t: format_trang_thai(t.get("trang_thai")),
+    "Thời hạn": format_thoi_han,
+    "Ngày tạo": lambda t: format_date(t.get("ngay_yeu_cau_date")),
+    "Người tạo": lambda t: t.get("nguoi_tao") or "-",
+    "Ngày HT": lambda t: format_date(t.get("ngay_hoan_thanh_date"), "-"),
+    "Ghi chú": lambda t: ticket_preview(t, "ghi_chu", 25, "-"),
+}
+
+
+# Độ rộng các cột của chế độ chi tiết (TICKET_GRID_COLUMNS, Số ngày HT, Thao tác)
+TICKET_ROW_WIDTHS = [0.4, 2, 0.7, 0.5, 0.9, 0.9, 0.9, 0.9, 1, 0.9, 1.5, 0.7, 1.2]
+
+
+def build_ticket_display_frame(tickets):
+    """
+    Tạo bảng hiển thị cho một trang tickets
+
+    Số ngày hoàn thành lấy từ cột so_ngay_hoan_thanh đã tính sẵn khi chuẩn hóa
+    (qua DataFrame của ticket_analytics), các cột còn lại dùng formatter trong
+    TICKET_GRID_COLUMNS. Phần hiển thị không parse lại ngày.
+
+    Args:
+        tickets (list): Các tickets hợp lệ (dict)
+
+    Returns:
+        pd.DataFrame: Các cột hiển thị, theo đúng thứ tự tickets
+    """
+    import pandas as pd
+    from ticket_analytics import tickets_to_frame
+
+    df = pd.DataFrame(
+        {
+            column: [formatter(t) for t in tickets]
+            for column, formatter in TICKET_GRID_COLUMNS.items()
+        }
+    )
+    days = tickets_to_frame(tickets)["completion_days"]
+    df["Số ngày HT"] = days.map(lambda d: "-" if pd.isna(d) else f"{d} ngày")
+    return df
+
+
+def show_tickets_grid(db, tickets):
+    """
+    Hiển thị tickets dạng bảng lưới (một widget st.dataframe duy nhất)
+
+    Chọn một dòng để hiện các nút sửa/xóa, mở đúng các dialog hiện có.
+    Chọn nhiều dòng để cập nhật hoặc xóa hàng loạt.
+
+    Lựa chọn của st.dataframe là chỉ số dòng: khi các dòng hiển thị đổi (trang,
+    bộ lọc, sắp xếp, xóa, ticket mới) lựa chọn cũ bị bỏ để không trỏ sang
+    ticket khác.
+    """
+    tickets = [t for t in tickets if isinstance(t, dict) and t]
+    df = build_ticket_display_frame(tickets)
+
+    shown_ids = [ticket.get("id") for ticket in tickets]
+    if st.session_state.get("tickets_grid_ids") != shown_ids:
+        st.session_state.pop("tickets_grid", None)
+        st.session_state.tickets_grid_ids = shown_ids
+
+    event = st.dataframe(
+        df,
+        hide_index=True,
+        use_container_width=True,
+        on_select="rerun",
+        selection_mode="multi-row",
+        key="tickets_grid",
+        column_config={
+            "ID": st.column_config.NumberColumn("ID", format="%d", width="small"),
+            "Nội dung": st.column_config.TextColumn("Nội dung", width="large"),
+        },
+    )
+
+    selected_rows = [
+        row for row in (event.selection.rows if event else []) if row < len(tickets)
+    ]
+    if not selected_rows:
+        st.caption(
+            "💡 Chọn một dòng để sửa hoặc xóa ticket, chọn nhiều dòng để thao tác"
+            " hàng loạt."
+        )
+        return
+
+    if len(selected_rows) > 1:
+        ticket_ids = [tickets[row].get("id") for row in selected_rows]
+        show_bulk_actions(db, [ticket_id for ticket_id in ticket_ids if ticket_id])
+        return
+
+    ticket_id = tickets[selected_rows[0]].get("id")
+    if ticket_id is None:
+        st.caption("⏳ Ticket đang được lưu, chưa sửa hoặc xóa được.")
+        return
+    col1, col2, col3 = st.columns([1, 1, 3])
+    with col1:
+        if st.button(
+            f"✏️ Sửa ticket #{ticket_id}", key="grid_edit", use_container_width=True
+        ):
+            st.session_state.show_edit_modal = True
+            st.session_state.edit_ticket_id = ticket_id
+            st.rerun()
+    with col2:
+        if st.button(
+            f"🗑️ Xóa ticket #{ticket_id}", key="grid_delete", use_container_width=True
+        ):
+            st.session_state.show_delete_confirm = True
+            st.session_state.delete_ticket_id = ticket_id
+            st.rerun()
+
+
+def show_bulk_actions(db, ticket_ids):
+    """
+    Thanh thao tác hàng loạt cho các tickets đang chọn
+
+    Cập nhật được gửi theo từng nhóm BULK_CHUNK_SIZE ID (filter in_), có thanh
+    tiến độ; nhóm lỗi không làm dừng các nhóm còn lại.
+
+    Args:
+        db (SupabaseHelper): Database helper
+        ticket_ids (list): ID các tickets đang chọn
+    """
+    st.markdown(f"**☑️ Đã chọn {len(ticket_ids)} tickets**")
+    col1, col2, col3, col4, col5 = st.columns([1, 1, 1, 1, 1])
+    with col1:
+        trang_thai = st.selectbox(
+            "Trạng thái:", [BULK_KEEP] + TRANG_THAI_OPTIONS, key="bulk_trang_thai"
+        )
+    with col2:
+        uu_tien = st.selectbox(
+            "Ưu tiên:", [BULK_KEEP] + UU_TIEN_OPTIONS, key="bulk_uu_tien"
+        )
+    with col3:
+        phan_loai = st.selectbox(
+            "Phân loại:", [BULK_KEEP] + PHAN_LOAI_OPTIONS, key="bulk_phan_loai"
+        )
+
+    update_data = {
+        column: value
+        for column, value in [
+            ("trang_thai", trang_thai),
+            ("uu_tien", uu_tien),
+            ("phan_loai", phan_loai),
+        ]
+        if value != BULK_KEEP
+    }
+
+    with col4:
+        st.write("")  # Căn nút với các selectbox
+        apply = st.button(
+            f"💾 Cập nhật {len(ticket_ids)} tickets",
+            type="primary",
+            disabled=not update_data,
+            use_container_width=True,
+        )
+    with col5:
+        st.write("")
+        if st.button(
+            f"🗑️ Xóa {len(ticket_ids)} tickets", use_container_width=True
+        ):
+            st.session_state.show_bulk_delete_confirm = True
+            st.session_state.bulk_delete_ids = ticket_ids
+            st.rerun()
+
+    if apply:
+        update_data["updated_at"] = datetime.now().isoformat()
+        result = db.bulk_update(
+            "tickets",
+            ticket_ids,
+            update_data,
+            on_progress=bulk_progress("Đang cập nhật"),
+        )
+        st.session_state.bulk_result = {"action": "Cập nhật", **result}
+        # Thống kê cũng thay đổi nên chạy lại cả trang
+        st.rerun()
+
+
+def bulk_progress(label):
+    """
+    Tạo thanh tiến độ cho thao tác hàng loạt
+
+    Returns:
+        callable: on_progress(done, total, failed) cho SupabaseHelper.bulk_*
+    """
+    bar = st.progress(0.0, text=label)
+
+    def update(done, total, failed):
+        text = f"{label}: {done}/{total} nhóm"
+        if failed:
+            text += f" · {failed} nhóm lỗi"
+        bar.progress(done / total, text=text)
+
+    return update
+
+
+def show_bulk_result():
+    """Hiển thị (một lần) kết quả của thao tác hàng loạt vừa chạy"""
+    result = st.session_state.pop("bulk_result", None)
+    if not result:
+        return
+
+    done = len(result["rows"])
+    st.success(f"✅ {result['action']} {done}/{result['total']} tickets")
+    if result["failed"]:
+        failed_ids = [
+            ticket_id for chunk in result["failed"] for ticket_id in chunk["items"]
+        ]
+        shown_ids = ", ".join(str(ticket_id) for ticket_id in failed_ids[:20])
+        if len(failed_ids) > 20:
+            shown_ids += ", ..."
+        st.error(
+            f"❌ {len(failed_ids)} tickets lỗi (ID: {shown_ids}): "
+            f"{result['failed'][0]['error']}"
+        )
+
+
+def show_write_results():
+    """Hiển thị (một lần) kết quả của các thao tác ghi nền vừa xong"""
+    for result in st.session_state.pop("write_results", []):
+        if result["error"]:
+            st.error(
+                f"❌ Lỗi khi {result['action']}: {result['error']}. "
+                "Thay đổi trên màn hình đã được hoàn tác."
             )
-            headers = [
-                "ID",
-                "Nội dung",
-                "Phân loại",
-                "Nền tảng",
-                "Ưu tiên",
-                "Trạng thái",
-                "Thời hạn",
-                "Ngày tạo",
-                "Ngày HT",
-                "Ghi chú",
-                "Số ngày HT",
-                "Thao tác",
-            ]
-            for i, header in enumerate(headers):
-                with header_cols[i]:
-                    st.markdown(f"**{header}**")
-
-            st.markdown("---")
-
-            # Hiển thị bảng với cột thao tác và số ngày hoàn thành
-            for i, ticket in enumerate(tickets):
-                # Đảm bảo ticket là dict và có dữ liệu hợp lệ
-                if not isinstance(ticket, dict) or not ticket:
-                    continue
-
-                cols = st.columns(
-                    [0.4, 2, 0.7, 0.5, 0.9, 0.9, 0.9, 0.9, 0.9, 1.5, 0.7, 1.2]
-                )
+        else:
+            st.toast(f"✅ Đã {result['action']}")
 
-                with cols[0]:
-                    st.write(str(ticket.get("id", "")))
-                with cols[1]:
-                    content = str(ticket.get("noi_dung", ""))
-                    display_content = (
-                        content[:30] + "..." if len(content) > 30 else content
-                    )
-                    st.write(display_content)
-                with cols[2]:
-                    st.write(str(ticket.get("phan_loai", "")))
-                with cols[3]:
-                    st.write(str(ticket.get("nen_tang", "")))
-                with cols[4]:
-                    # Ưu tiên với màu sắc
-                    priority = str(ticket.get("uu_tien", ""))
-                    if priority == "Khẩn cấp":
-                        st.markdown(f"🔴 {priority}")
-                    elif priority == "Cao":
-                        st.markdown(f"🟠 {priority}")
-                    elif priority == "Trung bình":
-                        st.markdown(f"🟡 {priority}")
-                    else:
-                        st.markdown(f"🟢 {priority}")
-                with cols[5]:
-                    # Trạng thái với màu sắc
-                    status = str(ticket.get("trang_thai", ""))
-                    if status == "Hoàn thành":
-                        st.markdown(f"✅ {status}")
-                    elif status == "Đang xử lý":
-                        st.markdown(f"🔄 {status}")
-                    elif status == "Chờ phản hồi":
-                        st.markdown(f"⏳ {status}")
-                    else:
-                        st.markdown(f"⏸️ {status}")
-                with cols[6]:
-                    thoi_han = ticket.get("thoi_han_mong_muon", "")
-                    st.write(str(thoi_han)[:10] if thoi_han else "")
-                with cols[7]:
-                    date_str = ticket.get("ngay_yeu_cau", "")
-                    st.write(str(date_str)[:10] if date_str else "")
-                with cols[8]:
-                    # Ngày hoàn thành
-                    completed_date = ticket.get("ngay_hoan_thanh", "")
-                    st.write(str(completed_date)[:10] if completed_date else "-")
-                with cols[9]:
-                    # Ghi chú
-                    note = str(ticket.get("ghi_chu", ""))
-                    display_note = (
-                        note[:25] + "..." if len(note) > 25 else note if note else "-"
-                    )
-                    st.write(display_note)
-                with cols[10]:
-                    # Số ngày hoàn thành
-                    try:
-                        completion_days = calculate_completion_days(
-                            ticket.get("ngay_yeu_cau"), ticket.get("ngay_hoan_thanh")
-                        )
-                        if completion_days is not None and isinstance(
-                            completion_days, (int, float)
+
+def show_tickets_rows(tickets):
+    """Hiển thị tickets dạng chi tiết (mỗi dòng một hàng widget)"""
+    # Header cho bảng
+    # Đảm bảo ticket là dict và có dữ liệu hợp lệ
+    tickets = [t for t in tickets if isinstance(t, dict) and t]
+    df = build_ticket_display_frame(tickets)
+
+    header_cols = st.columns(TICKET_ROW_WIDTHS)
+    headers = list(df.columns) + ["Thao tác"]
+    for i, header in enumerate(headers):
+        with header_cols[i]:
+            st.markdown(f"**{header}**")
+
+    st.markdown("---")
+
+    # Hiển thị bảng với cột thao tác và số ngày hoàn thành
+    for ticket, values in zip(tickets, df.itertuples(index=False)):
+        cols = st.columns(TICKET_ROW_WIDTHS)
+
+        for col, value in zip(cols, values):
+            with col:
+                st.markdown(str(value))
+
+        with cols[-1]:
+            # Cột thao tác
+            try:
+                action_cols = st.columns(2)
+                ticket_id = ticket.get("id")
+                if ticket_id:
+                    with action_cols[0]:
+                        if st.button("✏️", key=f"edit_{ticket_id}", help="Sửa ticket"):
+                            st.session_state.show_edit_modal = True
+                            st.session_state.edit_ticket_id = ticket_id
+                            st.rerun()
+                    with action_cols[1]:
+                        if st.button(
+                            "🗑️", key=f"delete_{ticket_id}", help="Xóa ticket"
                         ):
-                            st.write(f"{completion_days} ngày")
-                        else:
-                            st.write("-")
-                    except Exception:
-                        st.write("-")
-                with cols[11]:
-                    # Cột thao tác
-                    try:
-                        action_cols = st.columns(2)
-                        ticket_id = ticket.get("id")
-                        if ticket_id:
-                            with action_cols[0]:
-                                if st.button(
-                                    "✏️", key=f"edit_{ticket_id}", help="Sửa ticket"
-                                ):
-                                    st.session_state.show_edit_modal = True
-                                    st.session_state.edit_ticket_id = ticket_id
-                                    st.rerun()
-                            with action_cols[1]:
-                                if st.button(
-                                    "🗑️", key=f"delete_{ticket_id}", help="Xóa ticket"
-                                ):
-                                    st.session_state.show_delete_confirm = True
-                                    st.session_state.delete_ticket_id = ticket_id
-                                    st.rerun()
-                    except Exception:
-                        st.write("Lỗi hiển thị")
+                            st.session_state.show_delete_confirm = True
+                            st.session_state.delete_ticket_id = ticket_id
+                            st.rerun()
+            except Exception:
+                st.write("Lỗi hiển thị")
+
+
+def set_ticket_page(page):
+    """Callback chuyển trang (chạy trước khi fragment danh sách chạy lại)"""
+    st.session_state.ticket_page = page
 
-        else:
-            st.info("Không có ticket nào.")
-    except Exception as e:
-        st.error(f"Lỗi khi lấy dữ liệu: {e}")
+
+def set_ticket_page_size():
+    """Callback đổi số dòng mỗi trang, quay về trang đầu"""
+    st.session_state.ticket_page_size = st.session_state.ticket_page_size_select
+    st.session_state.ticket_page = 0
+
+
+def show_ticket_pager(page_result):
+    """
+    Hiển thị thanh phân trang
+
+    Các nút dùng callback thay vì st.rerun() nên chỉ fragment danh sách
+    tickets chạy lại.
+    """
+    total = page_result["total"]
+    page = page_result["page"]
+    page_size = page_result["page_size"]
+    total_pages = max(1, (total + page_size - 1) // page_size)
+
+    st.markdown("---")
+    col1, col2, col3, col4 = st.columns([1, 2, 1, 1])
+    with col1:
+        st.button(
+            "⬅️ Trước",
+            disabled=page <= 0,
+            use_container_width=True,
+            on_click=set_ticket_page,
+            args=(page - 1,),
+        )
+    with col2:
+        first_row = page * page_size + 1 if total else 0
+        last_row = min(total, (page + 1) * page_size)
+        st.caption(
+            f"Trang {page + 1}/{total_pages} · Tickets {first_row}-{last_row} / {total}"
+        )
+    with col3:
+        st.button(
+            "Sau ➡️",
+            disabled=page >= total_pages - 1,
+            use_container_width=True,
+            on_click=set_ticket_page,
+            args=(page + 1,),
+        )
+    with col4:
+        st.selectbox(
+            "Số dòng/trang",
+            TICKET_PAGE_SIZE_OPTIONS,
+            index=TICKET_PAGE_SIZE_OPTIONS.index(page_size)
+            if page_size in TICKET_PAGE_SIZE_OPTIONS
+            else 0,
+            key="ticket_page_size_select",
+            on_change=set_ticket_page_size,
+            label_visibility="collapsed",
+        )
 
 
 @st.dialog("Thêm Ticket Mới")
+@track_round_trips("dialog")
 def show_add_ticket_modal(db):
     with st.form(
         "add_ticket_form",
@@ -715,6 +1596,14 @@ def show_add_ticket_modal(db):
             user_id = st.session_state.get("user_id")
             project = st.session_state.get("project")
 
+            if is_write_queue_enabled():
+                # Ghi nền: đóng dialog ngay, ticket hiện ở đầu danh sách khi đang lưu
+                get_write_queue().submit_insert(
+                    ticket_data, user_id, project, write_queue_owner()
+                )
+                st.session_state.show_add_modal = False
+                st.rerun()
+
             result = db.insert_ticket(ticket_data, user_id, project)
             if result:
                 st.success("✅ Thêm ticket thành công!")
@@ -725,17 +1614,26 @@ def show_add_ticket_modal(db):
 
 
 @st.dialog("Sửa Ticket")
+@track_round_trips("dialog")
 def show_edit_ticket_modal(db):
     if not st.session_state.edit_ticket_id:
         return
 
-    # Lấy thông tin ticket hiện tại
-    tickets = db.select_data("tickets", "*", {"id": st.session_state.edit_ticket_id})
-    if not tickets:
+    # Lấy đầy đủ thông tin ticket (danh sách chỉ có preview; dòng đã tải đầy đủ
+    # trong identity map được dùng lại, không gửi request)
+    ticket = db.get_ticket_by_id(st.session_state.edit_ticket_id)
+    if not ticket:
         st.error("Không tìm thấy ticket!")
         return
 
-    ticket = tickets[0]
+    if is_write_queue_enabled():
+        # Các lần sửa trước chưa ghi xong vẫn hiện trong form
+        jobs = get_write_queue().jobs_for(write_queue_owner())
+        ticket = apply_pending([ticket], jobs)[0]
+
+    db.attach_creator_names([ticket])
+    if ticket.get("nguoi_tao"):
+        st.caption(f"👤 Người tạo: {ticket['nguoi_tao']}")
 
     with st.form("edit_ticket_form"):
         col1, col2 = st.columns(2)
@@ -784,30 +1682,12 @@ def show_edit_ticket_modal(db):
                 ),
             )
 
-            # Handle date fields
-            current_thoi_han = None
-            if ticket.get("thoi_han_mong_muon"):
-                try:
-                    current_thoi_han = datetime.strptime(
-                        ticket.get("thoi_han_mong_muon"), "%Y-%m-%d"
-                    ).date()
-                except:
-                    current_thoi_han = None
-
-            current_ngay_hoan_thanh = None
-            if ticket.get("ngay_hoan_thanh"):
-                try:
-                    current_ngay_hoan_thanh = datetime.strptime(
-                        ticket.get("ngay_hoan_thanh"), "%Y-%m-%d"
-                    ).date()
-                except:
-                    current_ngay_hoan_thanh = None
-
+            # Các cột ngày đã được parse sẵn khi lấy ticket (ticket_normalize)
             thoi_han_mong_muon = st.date_input(
-                "Thời hạn mong muốn:", value=current_thoi_han
+                "Thời hạn mong muốn:", value=ticket.get("thoi_han_mong_muon_date")
             )
             ngay_hoan_thanh = st.date_input(
-                "Ngày hoàn thành:", value=current_ngay_hoan_thanh
+                "Ngày hoàn thành:", value=ticket.get("ngay_hoan_thanh_date")
             )
 
         noi_dung = st.text_area(
@@ -846,6 +1726,15 @@ def show_edit_ticket_modal(db):
             if ngay_hoan_thanh:
                 update_data["ngay_hoan_thanh"] = ngay_hoan_thanh.isoformat()
 
+            if is_write_queue_enabled():
+                # Ghi nền: đóng dialog ngay, danh sách hiện thay đổi khi đang lưu
+                get_write_queue().submit_update(
+                    ticket["id"], update_data, write_queue_owner()
+                )
+                st.session_state.show_edit_modal = False
+                st.session_state.edit_ticket_id = None
+                st.rerun()
+
             result = db.update_data("tickets", update_data, {"id": ticket["id"]})
             if result:
                 st.success("✅ Cập nhật ticket thành công!")
@@ -857,18 +1746,19 @@ def show_edit_ticket_modal(db):
 
 
 @st.dialog("Xác nhận xóa")
+@track_round_trips("dialog")
 def show_delete_confirmation(db):
     if not st.session_state.delete_ticket_id:
         return
 
-    # Lấy thông tin ticket
-    tickets = db.select_data("tickets", "*", {"id": st.session_state.delete_ticket_id})
-    if not tickets:
+    # Lấy thông tin ticket (dòng trong danh sách đã đủ để xác nhận)
+    ticket = db.get_ticket_by_id(
+        st.session_state.delete_ticket_id, required=TICKET_CONFIRM_FIELDS
+    )
+    if not ticket:
         st.error("Không tìm thấy ticket!")
         return
 
-    ticket = tickets[0]
-
     st.warning("⚠️ **Cảnh báo:** Bạn có chắc chắn muốn xóa ticket này?")
 
     # Hiển thị thông tin ticket
@@ -882,7 +1772,9 @@ def show_delete_confirmation(db):
         st.write(f"**Ưu tiên:** {ticket.get('uu_tien', 'N/A')}")
         st.write(f"**Trạng thái:** {ticket.get('trang_thai', 'N/A')}")
 
-    st.write(f"**Nội dung:** {ticket.get('noi_dung', 'N/A')}")
+    st.write(
+        f"**Nội dung:** {ticket.get('noi_dung') or ticket.get('noi_dung_preview') or 'N/A'}"
+    )
 
     col1, col2 = st.columns(2)
     with col1:
@@ -892,6 +1784,8 @@ def show_delete_confirmation(db):
                 st.success("✅ Xóa ticket thành công!")
                 st.session_state.show_delete_confirm = False
                 st.session_state.delete_ticket_id = None
+                # Bỏ các dòng đang chọn (chỉ số dòng không còn đúng sau khi xóa)
+                st.session_state.pop("tickets_grid", None)
                 st.rerun()
             else:
                 st.error("❌ Lỗi khi xóa ticket")
@@ -903,8 +1797,51 @@ def show_delete_confirmation(db):
             st.rerun()
 
 
+@st.dialog("Xác nhận xóa hàng loạt")
+@track_round_trips("dialog")
+def show_bulk_delete_confirmation(db):
+    ticket_ids = st.session_state.get("bulk_delete_ids") or []
+    if not ticket_ids:
+        return
+
+    st.warning(
+        f"⚠️ **Cảnh báo:** Bạn có chắc chắn muốn xóa {len(ticket_ids)} tickets?"
+    )
+    st.write(
+        "**ID:** "
+        + ", ".join(str(ticket_id) for ticket_id in ticket_ids[:50])
+        + (", ..." if len(ticket_ids) > 50 else "")
+    )
+
+    col1, col2 = st.columns(2)
+    with col1:
+        confirmed = st.button(
+            "🗑️ Xác nhận xóa", type="secondary", use_container_width=True
+        )
+    with col2:
+        cancelled = st.button("❌ Hủy bỏ", use_container_width=True)
+
+    if confirmed:
+        result = db.bulk_delete(
+            "tickets", ticket_ids, on_progress=bulk_progress("Đang xóa")
+        )
+        st.session_state.bulk_result = {"action": "Xóa", **result}
+        st.session_state.show_bulk_delete_confirm = False
+        st.session_state.bulk_delete_ids = []
+        # Bỏ các dòng đang chọn (chỉ số dòng không còn đúng sau khi xóa)
+        st.session_state.pop("tickets_grid", None)
+        st.rerun()
+
+    if cancelled:
+        st.session_state.show_bulk_delete_confirm = False
+        st.session_state.bulk_delete_ids = []
+        st.rerun()
+
+
+@st.fragment
+@track_round_trips("users")
 def show_users_management(db):
-    """Hiển thị giao diện quản lý users cho admin"""
+    """Hiển thị giao diện quản lý users cho admin (fragment)"""
 
     # Header với nút thêm user
     col1, col2 = st.columns([4, 1])
@@ -926,7 +1863,76 @@ def show_users_management(db):
 
     # Hiển thị bảng users
     st.write("")  # Spacer
+    st.radio("Hiển thị:", VIEW_MODES, key="user_view_mode", horizontal=True)
+
+    if st.session_state.get("user_view_mode", VIEW_MODES[0]) == VIEW_MODES[0]:
+        show_users_grid(users)
+    else:
+        show_users_rows(users)
+
+
+def show_users_grid(users):
+    """
+    Hiển thị users dạng bảng lưới (một widget st.dataframe duy nhất)
+
+    Chọn một dòng để hiện các nút sửa/xóa, mở đúng các dialog hiện có.
+    """
+    import pandas as pd
+
+    df = pd.DataFrame(
+        {
+            "ID": [u.get("id") for u in users],
+            "Username": [u.get("username", "N/A") for u in users],
+            "Họ tên": [u.get("full_name", "N/A") for u in users],
+            "Project": [u.get("project", "N/A") for u in users],
+            "Admin": ["✅" if u.get("is_admin", False) else "❌" for u in users],
+            "Ngày tạo": [(u.get("created_at") or "N/A")[:10] for u in users],
+        }
+    )
+
+    event = st.dataframe(
+        df,
+        hide_index=True,
+        use_container_width=True,
+        on_select="rerun",
+        selection_mode="single-row",
+        key="users_grid",
+        column_config={
+            "ID": st.column_config.NumberColumn("ID", format="%d", width="small"),
+        },
+    )
+
+    selected_rows = event.selection.rows if event else []
+    if not selected_rows or selected_rows[0] >= len(users):
+        st.caption("💡 Chọn một dòng để sửa hoặc xóa user.")
+        return
 
+    user_id = users[selected_rows[0]].get("id")
+    col1, col2, col3 = st.columns([1, 1, 3])
+    with col1:
+        if st.button(
+            f"✏️ Sửa user #{user_id}", key="grid_edit_user", use_container_width=True
+        ):
+            st.session_state.edit_user_id = user_id
+            st.session_state.show_edit_user_modal = True
+            st.rerun()
+    with col2:
+        # Không cho phép xóa chính mình
+        is_current_user = user_id == st.session_state.get("user_id")
+        if st.button(
+            f"🗑️ Xóa user #{user_id}",
+            key="grid_delete_user",
+            disabled=is_current_user,
+            help="Không thể xóa chính mình" if is_current_user else None,
+            use_container_width=True,
+        ):
+            st.session_state.delete_user_id = user_id
+            st.session_state.show_delete_user_confirm = True
+            st.rerun()
+
+
+def show_users_rows(users):
+    """Hiển thị users dạng chi tiết (mỗi dòng một hàng widget)"""
     # Header cho bảng
     header_cols = st.columns([0.5, 1.5, 2, 1.5, 0.8, 1.2, 1, 1])
     with header_cols[0]:
@@ -983,6 +1989,7 @@ def show_users_management(db):
 
 
 @st.dialog("➕ Thêm User Mới")
+@track_round_trips("dialog")
 def show_add_user_modal(db):
     """Modal để thêm user mới"""
 
@@ -1037,6 +2044,7 @@ def show_add_user_modal(db):
 
 
 @st.dialog("✏️ Sửa User")
+@track_round_trips("dialog")
 def show_edit_user_modal(db):
     """Modal để sửa user"""
 
@@ -1113,6 +2121,7 @@ def show_edit_user_modal(db):
 
 
 @st.dialog("Xác nhận xóa User")
+@track_round_trips("dialog")
 def show_delete_user_confirmation(db):
     """Modal xác nhận xóa user"""
 
@@ -1165,5 +2174,257 @@ def show_delete_user_confirmation(db):
             st.rerun()
 
 
+@st.fragment
+@track_round_trips("performance")
+def show_performance():
+    """
+    Tab hiệu năng cho admin (fragment): thời gian, số dòng, kích thước và lỗi
+    của các request tới Supabase gần nhất trong process
+
+    Tab luôn được vẽ cùng trang admin nên số liệu chỉ được tính khi bật.
+    """
+    st.header("⏱️ Hiệu năng")
+    change_feed_error = get_change_feed_error()
+    if change_feed_error is not None:
+        st.warning(
+            f"⚠️ Change feed ({CHANGE_FEED_MODE}) không nhận được thay đổi: "
+            f"{change_feed_error}. Các session chỉ thấy dữ liệu mới khi tải lại."
+        )
+    if RERUN_PROFILER_ENABLED:
+        st.caption("🧭 Profiler từng lần chạy lại đang bật (RERUN_PROFILER).")
+    else:
+        st.toggle(
+            "🧭 Profiler từng lần chạy lại",
+            key="rerun_profiler",
+            on_change=mark_rerun_profiler_changed,
+        )
+        # Bật/tắt cần chạy lại cả trang để main() vẽ (hoặc bỏ) phần profiler
+        if st.session_state.pop("rerun_profiler_changed", False):
+            st.rerun()
+    if st.toggle("📊 Hiện số liệu request", key="show_performance"):
+        show_performance_metrics()
+
+
+def show_performance_metrics():
+    """Bảng p50/p95/p99 theo method và bảng, histogram thời gian và lỗi gần nhất"""
+    import pandas as pd
+
+    instrumentation = get_instrumentation()
+
+    col1, col2, _ = st.columns([1, 1, 3])
+    with col1:
+        # Bấm nút trong fragment chỉ chạy lại fragment -> số liệu mới nhất
+        st.button("🔄 Làm mới", key="performance_refresh", use_container_width=True)
+    with col2:
+        if st.button(
+            "🗑️ Xóa số liệu", key="performance_clear", use_container_width=True
+        ):
+            instrumentation.clear()
+
+    if not instrumentation.enabled:
+        st.info("📝 Đo hiệu năng đang tắt (SUPABASE_METRICS=false).")
+        return
+
+    records = instrumentation.records()
+    sinks = ", ".join(type(sink).__name__ for sink in instrumentation.sinks)
+    st.caption(
+        f"{len(records)} request gần nhất của process (tổng {instrumentation.total}"
+        f" từ khi khởi động) · Ghi ra: {sinks or 'không'}"
+    )
+    if not records:
+        st.info("📝 Chưa có request nào được ghi lại.")
+        return
+
+    # Bảng tổng hợp theo method và bảng, chậm nhất (p95) trước
+    summary = instrumentation.summary(records)
+    number_columns = [
+        "p50 (ms)", "p95 (ms)", "p99 (ms)", "Max (ms)", "Dòng TB", "KB TB"
+    ]
+    st.dataframe(
+        pd.DataFrame(
+            {
+                "Method": [row["method"] for row in summary],
+                "Bảng": [row["table"] for row in summary],
+                "Số lần": [row["count"] for row in summary],
+                "Lỗi": [row["errors"] for row in summary],
+                "p50 (ms)": [row["p50_ms"] for row in summary],
+                "p95 (ms)": [row["p95_ms"] for row in summary],
+                "p99 (ms)": [row["p99_ms"] for row in summary],
+                "Max (ms)": [row["max_ms"] for row in summary],
+                "Dòng TB": [row["avg_rows"] for row in summary],
+                "KB TB": [row["avg_bytes"] / 1024 for row in summary],
+                "Loại lỗi": [
+                    ", ".join(
+                        f"{name}: {count}"
+                        for name, count in row["error_classes"].items()
+                    )
+                    for row in summary
+                ],
+            }
+        ),
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            column: st.column_config.NumberColumn(column, format="%.1f")
+            for column in number_columns
+        },
+    )
+
+    # Phân bố thời gian của một method/bảng (hoặc tất cả)
+    series = ["Tất cả"] + [f"{row['method']} · {row['table']}" for row in summary]
+    selected = st.selectbox("Phân bố thời gian", series, key="performance_series")
+    if selected in series[1:]:
+        method, table = selected.split(" · ", 1)
+        records = [r for r in records if r["method"] == method and r["table"] == table]
+    durations = sorted(record["duration_ms"] for record in records)
+
+    cols = st.columns(3)
+    for col, q in zip(cols, (50, 95, 99)):
+        with col:
+            st.metric(f"p{q}", f"{percentile(durations, q):.1f} ms")
+
+    import altair as alt
+
+    histogram = pd.DataFrame(
+        bucket_counts(durations), columns=["Thời gian", "Số request"]
+    )
+    st.altair_chart(
+        alt.Chart(histogram)
+        .mark_bar()
+        # Giữ thứ tự bucket (mặc định altair sắp xếp nhãn theo chữ cái)
+        .encode(x=alt.X("Thời gian", sort=None), y="Số request"),
+        use_container_width=True,
+    )
+
+    # Các lỗi gần nhất, mới nhất trước (người dùng chỉ thấy thông báo st.error)
+    errors = [record for record in records if record["error"]][-20:][::-1]
+    if errors:
+        st.markdown("**Lỗi gần nhất**")
+        st.dataframe(
+            pd.DataFrame(
+                {
+                    "Thời điểm": [
+                        datetime.fromtimestamp(r["ts"]).strftime("%H:%M:%S")
+                        for r in errors
+                    ],
+                    "Method": [r["method"] for r in errors],
+                    "Bảng": [r["table"] for r in errors],
+                    "Lỗi": [r["error"] for r in errors],
+                    "Mã": [r["error_code"] for r in errors],
+                    "Thông báo": [r["error_message"] for r in errors],
+                }
+            ),
+            hide_index=True,
+            use_container_width=True,
+        )
+
+
+def mark_rerun_profiler_changed():
+    """Callback bật/tắt profiler: fragment sẽ chạy lại cả trang"""
+    st.session_state.rerun_profiler_changed = True
+
+
+def arm_cprofile_next_rerun():
+    """Callback: chạy cProfile trong lần chạy lại tiếp theo của session"""
+    st.session_state.cprofile_next_rerun = True
+
+
+@st.fragment
+def show_rerun_profiles():
+    """
+    Waterfall từng phần của các lần chạy lại gần nhất trong session (fragment)
+
+    Có thể bật cProfile cho lần chạy tiếp theo rồi tải file pstats về xem bằng
+    python -m pstats hoặc snakeviz.
+    """
+    with st.expander("🧭 Profiler"):
+        col1, col2, _ = st.columns([1, 2, 2])
+        with col1:
+            st.button(
+                "🔄 Làm mới", key="rerun_profile_refresh", use_container_width=True
+            )
+        with col2:
+            st.button(
+                "🎯 cProfile lần chạy tiếp theo",
+                key="rerun_profile_cprofile",
+                use_container_width=True,
+                on_click=arm_cprofile_next_rerun,
+                help="Lần chạy lại kế tiếp (cả trang, fragment hoặc dialog) "
+                "được đo bằng cProfile",
+            )
+
+        profiles = st.session_state.get("rerun_profiles", [])[::-1]
+        if not profiles:
+            st.info("📝 Chưa có lần chạy nào được đo.")
+            return
+
+        def describe(index):
+            profile = profiles[index]
+            started = datetime.fromtimestamp(profile.started_at).strftime("%H:%M:%S")
+            marker = " · cProfile" if profile.has_stats else ""
+            return (
+                f"{started} · {profile.label} · {profile.duration_ms:.0f} ms{marker}"
+            )
+
+        selected = st.selectbox(
+            "Lần chạy",
+            range(len(profiles)),
+            format_func=describe,
+            key="rerun_profile_selected",
+        )
+        profile = profiles[selected if selected is not None else 0]
+
+        import altair as alt
+        import pandas as pd
+
+        # Mỗi span một dòng theo thứ tự bắt đầu, thụt lề theo độ sâu
+        spans = pd.DataFrame(
+            {
+                "Phần": [
+                    f"{'· ' * span['depth']}{span['name']} #{index}"
+                    for index, span in enumerate(profile.spans)
+                ],
+                "Bắt đầu (ms)": [span["start_ms"] for span in profile.spans],
+                "Kết thúc (ms)": [
+                    span["start_ms"] + span["duration_ms"] for span in profile.spans
+                ],
+                "Thời gian (ms)": [span["duration_ms"] for span in profile.spans],
+                "Request": [span["requests"] for span in profile.spans],
+            }
+        )
+        st.altair_chart(
+            alt.Chart(spans)
+            .mark_bar()
+            .encode(
+                x="Bắt đầu (ms)",
+                x2="Kết thúc (ms)",
+                # Giữ thứ tự bắt đầu (mặc định altair sắp xếp nhãn theo chữ cái)
+                y=alt.Y("Phần", sort=None, title=None),
+                tooltip=["Phần", "Thời gian (ms)", "Request"],
+            ),
+            use_container_width=True,
+        )
+        st.dataframe(
+            spans.drop(columns=["Kết thúc (ms)"]),
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                column: st.column_config.NumberColumn(column, format="%.1f")
+                for column in ("Bắt đầu (ms)", "Thời gian (ms)")
+            },
+        )
+
+        if profile.has_stats:
+            st.download_button(
+                "📥 Tải file pstats",
+                data=profile.pstats_bytes(),
+                file_name=rerun_profile_filename(profile),
+                mime="application/octet-stream",
+                key="rerun_profile_download",
+                on_click="ignore",
+            )
+            st.code(profile.top_functions(), language=None)
+
+
 if __name__ == "__main__":
     main()
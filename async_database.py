@@ -0,0 +1,394 @@
+"""
+Truy cập Supabase bất đồng bộ và gọi song song các truy vấn độc lập
+
+Mỗi lần rerun, trang tickets cần một trang dữ liệu, thống kê và (với admin)
+danh sách users. Các truy vấn này không phụ thuộc nhau nên được gửi cùng lúc
+qua AsyncSupabaseHelper trên một event loop chạy nền; trang chỉ phải chờ
+truy vấn chậm nhất thay vì tổng thời gian của tất cả.
+
+AsyncSupabaseHelper dùng chung cache truy vấn và khóa cache với
+SupabaseHelper. Chỉ truy vấn nào lỗi (thiếu RPC, thiếu cột preview, ...) mới
+được gọi lại bằng SupabaseHelper để dùng đúng các nhánh dự phòng và thông báo
+lỗi; cả nhóm quá thời gian chờ thì báo lỗi thay vì chạy lại tuần tự.
+
+Mặc định tắt: với vài truy vấn nhỏ, chi phí event loop có thể lớn hơn phần
+tiết kiệm được (benchmark trên Supabase giả lập chậm hơn gọi tuần tự). Bật
+bằng SUPABASE_ASYNC_FANOUT=true sau khi đo trên backend thật.
+"""
+
+import asyncio
+import concurrent.futures
+import contextvars
+import inspect
+import os
+import sys
+import threading
+import time
+
+from supabase import Client
+
+from database import (
+    TICKET_VIEW_COLUMNS,
+    SupabaseHelper,
+    count_round_trips,
+    get_instrumentation,
+    get_query_cache,
+)
+from instrumentation import query_target
+from ticket_filter import TicketFilter
+from ticket_normalize import normalize_tickets
+
+ASYNC_FANOUT_ENABLED = os.getenv("SUPABASE_ASYNC_FANOUT", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+# Thời gian chờ tối đa cho một nhóm truy vấn song song (giây)
+ASYNC_FANOUT_TIMEOUT = float(os.getenv("SUPABASE_ASYNC_TIMEOUT", "30"))
+
+# Thời gian chờ trước khi thử tạo lại AsyncClient sau một lần lỗi (giây)
+ASYNC_CLIENT_RETRY_SECONDS = float(
+    os.getenv("SUPABASE_ASYNC_RETRY_SECONDS", "60")
+)
+
+# Bộ đếm request của một nhóm truy vấn song song (các task con dùng chung list)
+_fanout_round_trips = contextvars.ContextVar("fanout_round_trips", default=None)
+
+
+class AsyncSupabaseHelper:
+    def __init__(self, client):
+        """
+        Args:
+            client: AsyncClient của Supabase, hoặc client đồng bộ (vd.
+                FakeSupabaseClient) - khi đó mỗi request chạy trong thread riêng
+        """
+        self.supabase = client
+
+    @classmethod
+    async def create(cls, url=None, key=None):
+        """
+        Tạo helper với AsyncClient mới
+
+        Args:
+            url (str): Supabase URL (mặc định: SUPABASE_URL)
+            key (str): Supabase key (mặc định: SUPABASE_ANON_KEY)
+
+        Returns:
+            AsyncSupabaseHelper: Helper dùng AsyncClient
+        """
+        from supabase import acreate_client
+
+        client = await acreate_client(
+            url or os.getenv("SUPABASE_URL"), key or os.getenv("SUPABASE_ANON_KEY")
+        )
+        return cls(client)
+
+    async def _execute(self, query):
+        """Thực thi query builder (await với AsyncClient, thread với client đồng bộ)"""
+        counter = _fanout_round_trips.get()
+        if counter is not None:
+            counter[0] += 1
+        if inspect.iscoroutinefunction(query.execute):
+            request = query.execute()
+        else:
+            request = asyncio.to_thread(query.execute)
+
+        instrumentation = get_instrumentation()
+        if not instrumentation.enabled:
+            return await request
+        method = sys._getframe(1).f_code.co_name
+        started = time.perf_counter()
+        try:
+            response = await request
+        except Exception as e:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            instrumentation.record(method, query_target(query), elapsed_ms, error=e)
+            raise
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        instrumentation.record(method, query_target(query), elapsed_ms, response.data)
+        return response
+
+    async def select_data(self, table_name, columns="*", filters=None):
+        """
+        Lấy dữ liệu từ bảng (cùng kết quả và cache với SupabaseHelper.select_data)
+
+        Args:
+            table_name (str): Tên bảng
+            columns (str): Cột cần lấy (mặc định: "*")
+            filters (dict | TicketFilter): Điều kiện lọc
+
+        Returns:
+            list: Danh sách dòng
+        """
+        cache = get_query_cache()
+        cache_key = SupabaseHelper._cache_key(
+            table_name, SupabaseHelper._filters_project(filters), filters, columns
+        )
+        hit, cached = cache.get(cache_key)
+        if hit:
+            return cached
+
+        query = self.supabase.table(table_name).select(columns)
+        query = SupabaseHelper._apply_filters(query, filters)
+        response = await self._execute(query)
+
+        data = response.data if isinstance(response.data, list) else []
+        if table_name == "tickets":
+            normalize_tickets(data)
+        cache.set(cache_key, data)
+        return data
+
+    async def select_tickets_page(
+        self,
+        project=None,
+        filters=None,
+        page=0,
+        page_size=50,
+        columns="*",
+        count="exact",
+    ):
+        """
+        Lấy một trang tickets (cùng kết quả và cache với
+        SupabaseHelper.select_tickets_page)
+
+        Returns:
+            dict: {"data": list, "total": int, "page": int, "page_size": int}
+        """
+        page = max(0, int(page))
+        page_size = max(1, int(page_size))
+
+        cache = get_query_cache()
+        cache_key = SupabaseHelper._cache_key(
+            "tickets", project, filters, columns, "page", page, page_size, count
+        )
+        hit, cached = cache.get(cache_key)
+        if hit:
+            return cached
+
+        query = self.supabase.table("tickets").select(columns, count=count)
+        if project:
+            query = query.eq("project", project)
+        query = SupabaseHelper._apply_filters(query, filters)
+        query = TicketFilter.from_dict(filters).apply_order(query)
+        start = page * page_size
+        query = query.range(start, start + page_size - 1)
+        response = await self._execute(query)
+
+        data = normalize_tickets(response.data if response.data else [])
+        result = {
+            "data": data,
+            "total": response.count if response.count is not None else len(data),
+            "page": page,
+            "page_size": page_size,
+        }
+        cache.set(cache_key, result)
+        return result
+
+    async def get_ticket_by_id(self, ticket_id, columns=TICKET_VIEW_COLUMNS["detail"]):
+        """
+        Lấy đầy đủ thông tin một ticket
+
+        Returns:
+            dict: Ticket hoặc None
+        """
+        tickets = await self.select_data("tickets", columns, {"id": ticket_id})
+        return tickets[0] if tickets else None
+
+    async def get_ticket_stats(self, project=None, filters=None):
+        """
+        Lấy thống kê tickets qua RPC get_ticket_stats (cùng kết quả và cache với
+        SupabaseHelper.get_ticket_stats)
+
+        Returns:
+            dict: {"total": int, "by_status": dict, "avg_completion_days": float hoặc None}
+        """
+        params = {
+            "p_project": project or None,
+            **TicketFilter.from_dict(filters).rpc_params(),
+        }
+
+        cache = get_query_cache()
+        cache_key = SupabaseHelper._cache_key("tickets", project, filters, "stats")
+        hit, cached = cache.get(cache_key)
+        if hit:
+            return cached
+
+        response = await self._execute(self.supabase.rpc("get_ticket_stats", params))
+        stats = response.data or {}
+        avg_days = stats.get("avg_completion_days")
+        result = {
+            "total": int(stats.get("total") or 0),
+            "by_status": stats.get("by_status") or {},
+            "avg_completion_days": float(avg_days) if avg_days is not None else None,
+        }
+        cache.set(cache_key, result)
+        return result
+
+    async def get_all_users(self):
+        """
+        Lấy danh sách tất cả users (cùng kết quả và cache với
+        SupabaseHelper.get_all_users)
+
+        Returns:
+            list: Danh sách users
+        """
+        cache = get_query_cache()
+        cache_key = SupabaseHelper._cache_key("users", None, None, "*", "order", "id")
+        hit, cached = cache.get(cache_key)
+        if hit:
+            return cached
+
+        response = await self._execute(
+            self.supabase.table("users").select("*").order("id")
+        )
+        data = response.data if response.data else []
+        cache.set(cache_key, data)
+        return data
+
+
+_loop = None
+_loop_lock = threading.Lock()
+_shared_helper = None
+_shared_helper_error = None
+_shared_helper_failed_at = None
+
+
+def _get_loop():
+    """Lấy (và khởi động nếu cần) event loop chạy nền dùng chung trong process"""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_loop.run_forever, name="supabase-async", daemon=True
+            ).start()
+        return _loop
+
+
+def run_async(coro, timeout=ASYNC_FANOUT_TIMEOUT):
+    """
+    Chạy một coroutine trên event loop nền và chờ kết quả
+
+    Args:
+        coro: Coroutine cần chạy
+        timeout (float): Thời gian chờ tối đa (giây)
+
+    Returns:
+        Kết quả của coroutine
+    """
+    future = asyncio.run_coroutine_threadsafe(coro, _get_loop())
+    try:
+        return future.result(timeout)
+    except concurrent.futures.TimeoutError:
+        # Không để coroutine tiếp tục chạy (và giữ kết nối) trên loop nền
+        future.cancel()
+        raise
+
+
+def get_async_helper(db):
+    """
+    Lấy AsyncSupabaseHelper tương ứng với một SupabaseHelper
+
+    Với client Supabase thật, dùng một AsyncClient dùng chung trong process
+    (tạo một lần trên event loop nền). Với client khác (benchmark, test),
+    bọc chính client đó.
+
+    Args:
+        db (SupabaseHelper): Database helper
+
+    Nếu tạo AsyncClient lỗi, các truy vấn chạy tuần tự và chỉ thử tạo lại sau
+    ASYNC_CLIENT_RETRY_SECONDS (lỗi tạm thời không tắt fan-out vĩnh viễn).
+
+    Returns:
+        AsyncSupabaseHelper: Helper, hoặc None nếu chưa tạo được AsyncClient
+    """
+    global _shared_helper, _shared_helper_error, _shared_helper_failed_at
+    if not isinstance(db.supabase, Client):
+        return AsyncSupabaseHelper(db.supabase)
+
+    with _loop_lock:
+        if _shared_helper is not None:
+            return _shared_helper
+        if (
+            _shared_helper_failed_at is not None
+            and time.monotonic() - _shared_helper_failed_at
+            < ASYNC_CLIENT_RETRY_SECONDS
+        ):
+            return None
+    try:
+        helper = run_async(AsyncSupabaseHelper.create())
+    except Exception as e:
+        # Không tạo được AsyncClient -> các truy vấn chạy tuần tự như cũ
+        with _loop_lock:
+            _shared_helper_error = e
+            _shared_helper_failed_at = time.monotonic()
+        return None
+    with _loop_lock:
+        _shared_helper = _shared_helper or helper
+        _shared_helper_error = _shared_helper_failed_at = None
+        return _shared_helper
+
+
+async def _gather(helper, calls):
+    """
+    Gửi đồng thời các truy vấn, giữ lại exception của từng truy vấn
+
+    Returns:
+        tuple: (dict tên -> kết quả hoặc exception, số request đã gửi)
+    """
+    counter = [0]
+    _fanout_round_trips.set(counter)
+    names = list(calls)
+    results = await asyncio.gather(
+        *(getattr(helper, calls[name][0])(*calls[name][1:]) for name in names),
+        return_exceptions=True,
+    )
+    return dict(zip(names, results)), counter[0]
+
+
+def fetch_concurrently(db, **calls):
+    """
+    Gửi song song các truy vấn đọc độc lập của một lần rerun
+
+    Ví dụ:
+        results = fetch_concurrently(
+            db,
+            page=("select_tickets_page", project, filters, 0, 50, columns),
+            stats=("get_ticket_stats", project, filters),
+            users=("get_all_users",),
+        )
+
+    Args:
+        db (SupabaseHelper): Database helper
+        **calls: tên -> (tên method của SupabaseHelper, *tham số theo vị trí)
+
+    Returns:
+        dict: tên -> kết quả (giống khi gọi method của SupabaseHelper)
+
+    Raises:
+        TimeoutError: Nhóm truy vấn song song quá ASYNC_FANOUT_TIMEOUT giây
+    """
+    results = {}
+    if ASYNC_FANOUT_ENABLED and len(calls) > 1:
+        helper = get_async_helper(db)
+        if helper is not None:
+            try:
+                gathered, round_trips = run_async(_gather(helper, calls))
+            except concurrent.futures.TimeoutError as e:
+                # Gọi lại tuần tự sẽ bắt người dùng chờ thêm ít nhất chừng đó
+                raise TimeoutError(
+                    f"Truy vấn song song quá {ASYNC_FANOUT_TIMEOUT:g} giây"
+                ) from e
+            count_round_trips(round_trips)
+            results = {
+                name: value
+                for name, value in gathered.items()
+                if not isinstance(value, BaseException)
+            }
+
+    # Truy vấn lỗi (hoặc không chạy song song) -> gọi bằng SupabaseHelper
+    for name, (method, *args) in calls.items():
+        if name not in results:
+            results[name] = getattr(db, method)(*args)
+    return results
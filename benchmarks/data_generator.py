@@ -0,0 +1,136 @@
+"""
+Sinh dữ liệu tickets/users giả lập cho benchmark
+
+Dữ liệu sinh theo seed cố định nên mỗi lần chạy cho cùng một bộ dữ liệu,
+giúp so sánh kết quả giữa các lần benchmark.
+"""
+
+import hashlib
+import random
+from datetime import date, datetime, time, timedelta, timezone
+
+PHAN_LOAI_OPTIONS = ["Lỗi", "Task"]
+NEN_TANG_OPTIONS = ["Web", "APP", "Tất cả"]
+UU_TIEN_OPTIONS = ["Thấp", "Trung bình", "Cao", "Khẩn cấp"]
+TRANG_THAI_OPTIONS = ["Chờ xử lý", "Đang xử lý", "Hoàn thành", "Hủy bỏ"]
+
+BENCHMARK_PASSWORD = "benchmark"
+
+_WORDS = (
+    "lỗi đăng nhập không hiển thị báo cáo trang chủ thanh toán đơn hàng "
+    "khách hàng cập nhật dữ liệu xuất file giao diện tìm kiếm thông báo"
+).split()
+
+
+def _sentence(rng, min_words, max_words):
+    return " ".join(rng.choice(_WORDS) for _ in range(rng.randint(min_words, max_words)))
+
+
+def project_names(count):
+    """Tên các project: project-01, project-02, ..."""
+    return [f"project-{index:02d}" for index in range(1, count + 1)]
+
+
+def generate_tickets(count, projects=20, seed=42, days=365):
+    """
+    Sinh danh sách tickets
+
+    Args:
+        count (int): Số tickets
+        projects (int): Số project (tickets chia đều ngẫu nhiên)
+        seed (int): Seed cho bộ sinh số ngẫu nhiên
+        days (int): Khoảng thời gian (ngày) tính tới hôm nay của ngay_yeu_cau
+
+    Returns:
+        list: Danh sách tickets (dict) giống bảng tickets, có id từ 1
+    """
+    rng = random.Random(seed)
+    names = project_names(projects)
+    # users id 2.. thuộc các project theo thứ tự (xem generate_users)
+    creators = {name: 2 + index * 3 for index, name in enumerate(names)}
+    today = date.today()
+    tickets = []
+
+    for ticket_id in range(1, count + 1):
+        created = today - timedelta(days=rng.randint(0, days))
+        created_at = datetime.combine(
+            created, time(rng.randint(0, 23), rng.randint(0, 59)), timezone.utc
+        ).isoformat()
+        trang_thai = rng.choice(TRANG_THAI_OPTIONS)
+        completed = None
+        if trang_thai == "Hoàn thành":
+            completed = (created + timedelta(days=rng.randint(0, 30))).isoformat()
+
+        project = rng.choice(names)
+        tickets.append(
+            {
+                "id": ticket_id,
+                "project": project,
+                "phan_loai": rng.choice(PHAN_LOAI_OPTIONS),
+                "nen_tang": rng.choice(NEN_TANG_OPTIONS),
+                "noi_dung": _sentence(rng, 5, 40),
+                "uu_tien": rng.choice(UU_TIEN_OPTIONS),
+                "trang_thai": trang_thai,
+                "thoi_han_mong_muon": (
+                    created + timedelta(days=rng.randint(1, 45))
+                ).isoformat(),
+                "ngay_yeu_cau": created_at,
+                "ngay_hoan_thanh": completed,
+                "ghi_chu": _sentence(rng, 0, 20) or None,
+                "created_by": creators[project],
+                "created_at": created_at,
+                "updated_at": created_at,
+            }
+        )
+
+    return tickets
+
+
+def generate_users(projects=20, per_project=3):
+    """
+    Sinh danh sách users (một admin + per_project user cho mỗi project)
+
+    Args:
+        projects (int): Số project
+        per_project (int): Số user mỗi project
+
+    Returns:
+        list: Danh sách users (password là BENCHMARK_PASSWORD)
+    """
+    password_hash = hashlib.sha256(BENCHMARK_PASSWORD.encode()).hexdigest()
+    users = [
+        {
+            "id": 1,
+            "username": "admin",
+            "password_hash": password_hash,
+            "full_name": "Administrator",
+            "project": "ALL",
+            "is_admin": True,
+        }
+    ]
+    for project in project_names(projects):
+        for index in range(1, per_project + 1):
+            users.append(
+                {
+                    "id": len(users) + 1,
+                    "username": f"{project}-user{index}",
+                    "password_hash": password_hash,
+                    "full_name": f"User {index} ({project})",
+                    "project": project,
+                    "is_admin": False,
+                }
+            )
+    return users
+
+
+def generate_dataset(ticket_count, projects=20, seed=42):
+    """
+    Sinh bộ dữ liệu đầy đủ cho FakeSupabaseClient
+
+    Returns:
+        dict: {"tickets": list, "users": list}
+    """
+    return {
+        "tickets": generate_tickets(ticket_count, projects, seed),
+        "users": generate_users(projects),
+    }
@@ -0,0 +1,534 @@
+"""
+Supabase giả lập trong bộ nhớ (dùng cho benchmark)
+
+Hỗ trợ đúng chuỗi lệnh mà database.py sử dụng:
+
+    client.table("tickets").select("*", count="exact").eq(...).neq(...)
+          .gte(...).in_(...).order(...).range(...).execute()
+    client.table("tickets").insert(data).execute()
+    client.table("tickets").update(data).eq(...).execute()
+    client.table("tickets").delete().eq(...).execute()
+    client.rpc("get_ticket_stats", params).execute()
+    client.rpc("search_tickets", params).select(columns).execute()
+
+Các hành vi phía database cũng được mô phỏng: id tự tăng, giá trị mặc định,
+trigger updated_at và tombstone (migrations/0003_ticket_sync.sql), cột nhúng
+một-một dạng "alias:bảng!khóa_ngoại(cột)", computed column preview
+(migrations/0002_ticket_previews.sql), hàm get_ticket_stats
+(migrations/0006_ticket_stats.sql) và hàm search_tickets
+(migrations/0007_ticket_search.sql, khớp tiền tố không dấu, xếp hạng đơn giản),
+các hàm session (migrations/0010_user_session_functions.sql).
+"""
+
+import copy
+import re
+import threading
+import time
+import unicodedata
+from datetime import date, datetime, timezone
+
+
+def _now_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _preview(column, length):
+    def compute(row):
+        text = row.get(column)
+        if text and len(text) > length:
+            return text[:length] + "..."
+        return text
+
+    return compute
+
+
+def _unaccent(text):
+    """Bỏ dấu tiếng Việt, chữ thường (giống f_unaccent + lower trong SQL)"""
+    text = (text or "").replace("đ", "d").replace("Đ", "D")
+    text = unicodedata.normalize("NFD", text)
+    return "".join(char for char in text if not unicodedata.combining(char)).lower()
+
+
+def _words(text):
+    return [word for word in re.split(r"[^0-9a-z]+", _unaccent(text)) if word]
+
+
+def _ilike(value, pattern):
+    regex = ".*".join(re.escape(part) for part in pattern.split("*"))
+    return re.fullmatch(regex, value or "", re.IGNORECASE | re.DOTALL) is not None
+
+
+def _or_condition(value, operator, operand):
+    """Một điều kiện trong or_ của PostgREST: ilike, is.null, not.in.(...)"""
+    if operator == "ilike":
+        return _ilike(value, operand)
+    if operator == "is":
+        return value is None
+    if operator == "not" and operand.startswith("in."):
+        values = [item.strip('"') for item in operand[4:-1].split(",")]
+        return value is not None and value not in values
+    raise ValueError(f"FakeSupabase không hỗ trợ điều kiện or_: {operator}")
+
+
+# Cột nhúng của PostgREST: "alias:bảng!khóa_ngoại(cột, ...)"
+_EMBED_PATTERN = re.compile(r"^(?:(\w+):)?(\w+)!(\w+)\((.*)\)$")
+
+
+def _split_columns(columns):
+    """Tách danh sách cột "a, b, c" (bỏ qua dấu phẩy trong ngoặc)"""
+    parts, depth, current = [], 0, ""
+    for char in columns:
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        if char == "," and depth == 0:
+            parts.append(current.strip())
+            current = ""
+        else:
+            current += char
+    if current.strip():
+        parts.append(current.strip())
+    return parts
+
+
+class FakeAPIError(Exception):
+    """Lỗi giả lập của PostgREST"""
+
+
+class FakeResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class FakeQuery:
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        # Giống request.path của postgrest (instrumentation.query_target)
+        self.path = table
+        self.operation = "select"
+        self.columns = "*"
+        self.count_method = None
+        self.payload = None
+        self.filters = []
+        self.orders = []
+        self.start = None
+        self.end = None
+        self._negate_next = False
+
+    # --- Các thao tác ---
+
+    def select(self, columns="*", count=None):
+        self.operation = "select"
+        self.columns = columns
+        self.count_method = count
+        return self
+
+    def insert(self, data):
+        self.operation = "insert"
+        self.payload = data
+        return self
+
+    def update(self, data):
+        self.operation = "update"
+        self.payload = data
+        return self
+
+    def delete(self):
+        self.operation = "delete"
+        return self
+
+    # --- Filter ---
+
+    def _add_filter(self, predicate):
+        if self._negate_next:
+            self._negate_next = False
+            self.filters.append(lambda row: not predicate(row))
+        else:
+            self.filters.append(predicate)
+        return self
+
+    @property
+    def not_(self):
+        self._negate_next = True
+        return self
+
+    def eq(self, column, value):
+        return self._add_filter(lambda row: row.get(column) == value)
+
+    def neq(self, column, value):
+        return self._add_filter(lambda row: row.get(column) != value)
+
+    def gt(self, column, value):
+        return self._add_filter(
+            lambda row: row.get(column) is not None and row.get(column) > value
+        )
+
+    def gte(self, column, value):
+        return self._add_filter(
+            lambda row: row.get(column) is not None and row.get(column) >= value
+        )
+
+    def lt(self, column, value):
+        return self._add_filter(
+            lambda row: row.get(column) is not None and row.get(column) < value
+        )
+
+    def lte(self, column, value):
+        return self._add_filter(
+            lambda row: row.get(column) is not None and row.get(column) <= value
+        )
+
+    def in_(self, column, values):
+        values = set(values)
+        return self._add_filter(lambda row: row.get(column) in values)
+
+    def or_(self, conditions):
+        # Chỉ hỗ trợ "cột.ilike.mẫu", "cột.is.null" và "cột.not.in.(...)"
+        parsed = [
+            condition.split(".", 2)
+            for condition in re.split(r",(?![^(]*\))", conditions)
+        ]
+        return self._add_filter(
+            lambda row: any(
+                _or_condition(row.get(column), operator, operand)
+                for column, operator, operand in parsed
+            )
+        )
+
+    def is_(self, column, value):
+        expected = None if str(value).lower() == "null" else value
+        return self._add_filter(lambda row: row.get(column) is expected)
+
+    # --- Sắp xếp, phân trang ---
+
+    def order(self, column, desc=False, nullsfirst=None):
+        # Mặc định của Postgres: NULL xếp đầu khi giảm dần, cuối khi tăng dần
+        self.orders.append((column, desc, desc if nullsfirst is None else nullsfirst))
+        return self
+
+    def range(self, start, end):
+        self.start, self.end = start, end
+        return self
+
+    def limit(self, size):
+        self.start = self.start or 0
+        self.end = self.start + size - 1
+        return self
+
+    # --- Thực thi ---
+
+    def execute(self):
+        return self.client._execute(self)
+
+
+class FakeRpc:
+    def __init__(self, client, name, params):
+        self.client = client
+        self.name = name
+        self.path = f"rpc/{name}"
+        self.params = params or {}
+        self.columns = None
+
+    def select(self, columns="*"):
+        self.columns = columns
+        return self
+
+    def execute(self):
+        return self.client._execute_rpc(self)
+
+
+class FakeSupabaseClient:
+    def __init__(self, tables=None, latency=0.0):
+        """
+        Args:
+            tables (dict): Dữ liệu ban đầu {"tickets": [...], "users": [...]}
+            latency (float): Độ trễ giả lập cho mỗi request (giây)
+        """
+        self.tables = {name: list(rows) for name, rows in (tables or {}).items()}
+        self.tables.setdefault("tickets", [])
+        self.tables.setdefault("users", [])
+        self.tables.setdefault("ticket_tombstones", [])
+        # migrations/0009_user_sessions.sql
+        self.tables.setdefault("user_sessions", [])
+        self.latency = latency
+        self.request_count = 0
+        self._next_ids = {
+            name: max((row.get("id") or 0 for row in rows), default=0) + 1
+            for name, rows in self.tables.items()
+        }
+        self.computed_columns = {
+            "tickets": {
+                "noi_dung_preview": _preview("noi_dung", 30),
+                "ghi_chu_preview": _preview("ghi_chu", 25),
+            }
+        }
+        self.functions = {
+            "get_ticket_stats": self._rpc_get_ticket_stats,
+            "search_tickets": self._rpc_search_tickets,
+            "get_user_session": self._rpc_get_user_session,
+            "create_user_session": self._rpc_create_user_session,
+            "delete_user_session": self._rpc_delete_user_session,
+            "purge_user_sessions": self._rpc_purge_user_sessions,
+        }
+        self._lock = threading.Lock()
+
+    # --- API giống supabase.Client ---
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def rpc(self, name, params=None):
+        return FakeRpc(self, name, params)
+
+    # --- Thực thi ---
+
+    def _round_trip(self):
+        self.request_count += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _matching(self, query):
+        rows = self.tables.setdefault(query.table, [])
+        return [row for row in rows if all(f(row) for f in query.filters)]
+
+    def _project(self, table, row, columns):
+        if columns.strip() == "*":
+            return copy.copy(row)
+        computed = self.computed_columns.get(table, {})
+        result = {}
+        for column in _split_columns(columns):
+            embed = _EMBED_PATTERN.match(column)
+            if embed:
+                alias, target, foreign_key, target_columns = embed.groups()
+                key = row.get(foreign_key)
+                related = next(
+                    (item for item in self.tables.get(target, []) if item["id"] == key),
+                    None,
+                )
+                result[alias or target] = (
+                    self._project(target, related, target_columns)
+                    if related is not None and key is not None
+                    else None
+                )
+            elif column in computed:
+                result[column] = computed[column](row)
+            else:
+                result[column] = row.get(column)
+        return result
+
+    def _execute(self, query):
+        self._round_trip()
+        with self._lock:
+            if query.operation == "select":
+                return self._select(query)
+            if query.operation == "insert":
+                return self._insert(query)
+            if query.operation == "update":
+                return self._update(query)
+            if query.operation == "delete":
+                return self._delete(query)
+        raise FakeAPIError(f"Thao tác không hỗ trợ: {query.operation}")
+
+    def _select(self, query):
+        rows = self._matching(query)
+        # Sắp xếp ổn định theo thứ tự ngược của các khóa
+        for column, desc, nullsfirst in reversed(query.orders):
+            present = [row for row in rows if row.get(column) is not None]
+            missing = [row for row in rows if row.get(column) is None]
+            present.sort(key=lambda row: row[column], reverse=desc)
+            rows = missing + present if nullsfirst else present + missing
+        count = len(rows) if query.count_method else None
+        if query.start is not None:
+            rows = rows[query.start : query.end + 1]
+        data = [self._project(query.table, row, query.columns) for row in rows]
+        return FakeResponse(data, count)
+
+    def _insert(self, query):
+        payload = query.payload
+        records = payload if isinstance(payload, list) else [payload]
+        inserted = []
+        for record in records:
+            row = self._defaults(query.table)
+            row.update(copy.deepcopy(record))
+            row.setdefault("id", self._next_id(query.table))
+            self.tables[query.table].append(row)
+            inserted.append(copy.copy(row))
+        return FakeResponse(inserted)
+
+    def _update(self, query):
+        updated = []
+        for row in self._matching(query):
+            row.update(copy.deepcopy(query.payload))
+            if query.table == "tickets":
+                # Trigger tickets_set_updated_at
+                row["updated_at"] = _now_iso()
+            updated.append(copy.copy(row))
+        return FakeResponse(updated)
+
+    def _delete(self, query):
+        deleted = self._matching(query)
+        deleted_ids = {id(row) for row in deleted}
+        self.tables[query.table] = [
+            row for row in self.tables[query.table] if id(row) not in deleted_ids
+        ]
+        if query.table == "tickets":
+            # Trigger tickets_record_tombstone
+            tombstones = self.tables["ticket_tombstones"]
+            for row in deleted:
+                tombstones.append(
+                    {
+                        "ticket_id": row["id"],
+                        "project": row.get("project"),
+                        "deleted_at": _now_iso(),
+                    }
+                )
+        return FakeResponse([copy.copy(row) for row in deleted])
+
+    def _defaults(self, table):
+        now = _now_iso()
+        if table == "tickets":
+            return {
+                "ngay_yeu_cau": now,
+                "trang_thai": "Chờ xử lý",
+                "created_at": now,
+                "updated_at": now,
+            }
+        if table == "users":
+            return {"is_admin": False, "created_at": now}
+        return {}
+
+    def _next_id(self, table):
+        next_id = self._next_ids.get(table, 1)
+        self._next_ids[table] = next_id + 1
+        return next_id
+
+    def _execute_rpc(self, rpc):
+        self._round_trip()
+        function = self.functions.get(rpc.name)
+        if function is None:
+            raise FakeAPIError(
+                f"PGRST202: Could not find the function public.{rpc.name}"
+            )
+        with self._lock:
+            data = function(**rpc.params)
+            if rpc.columns is not None:
+                # Hàm trả về SETOF tickets -> chọn cột như select thông thường
+                data = [self._project("tickets", row, rpc.columns) for row in data]
+            return FakeResponse(data)
+
+    # --- Hàm RPC ---
+
+    def _filtered_tickets(self, p_project=None, p_overdue=False, **params):
+        """Giống hàm filtered_tickets trong migrations/0005_ticket_filters.sql"""
+        today = date.today().isoformat()
+        rows = []
+        for row in self.tables["tickets"]:
+            if p_project is not None and row.get("project") != p_project:
+                continue
+            if any(
+                values is not None and row.get(column) not in values
+                for column, values in (
+                    (column, params.get(f"p_{column}"))
+                    for column in ("trang_thai", "uu_tien", "phan_loai", "nen_tang")
+                )
+            ):
+                continue
+            in_range = True
+            for column in ("ngay_yeu_cau", "thoi_han_mong_muon", "ngay_hoan_thanh"):
+                start = params.get(f"p_{column}_from")
+                end = params.get(f"p_{column}_to")
+                day = (row.get(column) or "")[:10]
+                if (start or end) and not day:
+                    in_range = False
+                elif (start and day < start) or (end and day > end):
+                    in_range = False
+            if not in_range:
+                continue
+            if p_overdue and not (
+                row.get("thoi_han_mong_muon")
+                and row["thoi_han_mong_muon"][:10] < today
+                and row.get("trang_thai") not in ("Hoàn thành", "Hủy bỏ")
+            ):
+                continue
+            rows.append(row)
+        return rows
+
+    def _rpc_get_ticket_stats(self, **params):
+        rows = self._filtered_tickets(**params)
+        by_status = {}
+        days = []
+        for row in rows:
+            status = row.get("trang_thai") or ""
+            by_status[status] = by_status.get(status, 0) + 1
+            if status == "Hoàn thành" and row.get("ngay_yeu_cau"):
+                if row.get("ngay_hoan_thanh"):
+                    created = date.fromisoformat(row["ngay_yeu_cau"][:10])
+                    completed = date.fromisoformat(row["ngay_hoan_thanh"][:10])
+                    days.append(max(0, (completed - created).days))
+        return {
+            "total": len(rows),
+            "by_status": by_status,
+            "avg_completion_days": round(sum(days) / len(days), 1) if days else None,
+        }
+
+    def _rpc_get_user_session(self, p_id):
+        return [
+            {
+                key: value
+                for key, value in row.items()
+                if key not in ("id", "created_at")
+            }
+            for row in self.tables["user_sessions"]
+            if row["id"] == p_id
+        ]
+
+    def _rpc_create_user_session(self, **params):
+        row = {name[2:]: value for name, value in params.items()}
+        row["created_at"] = _now_iso()
+        self.tables["user_sessions"].append(row)
+
+    def _rpc_delete_user_session(self, p_id):
+        self.tables["user_sessions"] = [
+            row for row in self.tables["user_sessions"] if row["id"] != p_id
+        ]
+
+    def _rpc_purge_user_sessions(self):
+        now = datetime.now(timezone.utc)
+        rows = self.tables["user_sessions"]
+        kept = [
+            row for row in rows if datetime.fromisoformat(row["expires_at"]) >= now
+        ]
+        self.tables["user_sessions"] = kept
+        return len(rows) - len(kept)
+
+    def _rpc_search_tickets(self, p_query, p_limit=50, **params):
+        terms = _words(p_query)
+        if not terms:
+            return []
+        matches = []
+        for row in self._filtered_tickets(**params):
+            # Trọng số giống setweight: noi_dung (A) cao hơn ghi_chu (B)
+            weighted = [(word, 1.0) for word in _words(row.get("noi_dung"))] + [
+                (word, 0.4) for word in _words(row.get("ghi_chu"))
+            ]
+            rank = 0.0
+            for term in terms:
+                hits = [weight for word, weight in weighted if word.startswith(term)]
+                if not hits:
+                    break
+                rank += sum(hits)
+            else:
+                matches.append((rank, row))
+        matches.sort(
+            key=lambda match: (
+                match[0],
+                match[1].get("ngay_yeu_cau") or "",
+                match[1].get("id") or 0,
+            ),
+            reverse=True,
+        )
+        limit = min(max(p_limit or 50, 1), 500)
+        return [copy.copy(row) for _, row in matches[:limit]]
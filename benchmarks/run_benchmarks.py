@@ -0,0 +1,545 @@
+#!/usr/bin/env python3
+"""
+Benchmark các truy vấn tickets trên Supabase giả lập trong bộ nhớ
+
+Sử dụng (chạy từ thư mục gốc của project):
+    python -m benchmarks.run_benchmarks
+    python -m benchmarks.run_benchmarks --sizes 1000 10000 --repeat 10
+    python -m benchmarks.run_benchmarks --compare benchmarks/results/baseline.json
+
+Kết quả được lưu dạng JSON trong benchmarks/results/ để so sánh giữa các lần
+chạy (--compare trả về mã lỗi 1 nếu có benchmark chậm hơn ngưỡng cho phép).
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from streamlit.logger import set_log_level
+
+import async_database
+from async_database import fetch_concurrently
+from benchmarks.data_generator import generate_dataset, project_names
+from benchmarks.fake_supabase import FakeSupabaseClient
+from database import (
+    TICKET_VIEW_COLUMNS,
+    SupabaseHelper,
+    compute_ticket_stats,
+    invalidate_query_cache,
+    use_supabase_client,
+)
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_FILE = os.path.join(ROOT_DIR, "app.py")
+RESULTS_DIR = os.path.join(ROOT_DIR, "benchmarks", "results")
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+# Benchmark bị coi là chậm đi nếu median tăng quá tỷ lệ này
+DEFAULT_REGRESSION_THRESHOLD = 1.2
+
+# Bỏ qua chênh lệch nhỏ hơn mức này (ms), vì nhiễu đo lớn với các thao tác rất nhanh
+DEFAULT_MIN_DELTA_MS = 1.0
+
+
+def measure(func, repeat, setup=None):
+    """
+    Đo thời gian chạy của một hàm
+
+    Args:
+        func (callable): Hàm cần đo
+        repeat (int): Số lần chạy
+        setup (callable): Hàm chạy trước mỗi lần đo (không tính thời gian)
+
+    Returns:
+        dict: Thời gian (ms) min, median, mean, max và số lần chạy
+    """
+    durations = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000)
+    return summarize_durations(durations)
+
+
+def summarize_durations(durations):
+    """
+    Tổng hợp các lần đo
+
+    Args:
+        durations (list): Thời gian (ms) của từng lần chạy
+
+    Returns:
+        dict: Thời gian (ms) min, median, mean, max và số lần chạy
+    """
+    return {
+        "min_ms": round(min(durations), 3),
+        "median_ms": round(statistics.median(durations), 3),
+        "mean_ms": round(statistics.mean(durations), 3),
+        "max_ms": round(max(durations), 3),
+        "runs": len(durations),
+    }
+
+
+def benchmark_helper(db, project, repeat):
+    """Đo các hàm đọc/ghi chính của SupabaseHelper"""
+    results = {}
+    list_columns = TICKET_VIEW_COLUMNS["list"]
+    clear_cache = lambda: db.invalidate_cache("tickets")
+
+    def clear_cache_all():
+        db.invalidate_cache("tickets")
+        db.invalidate_cache("users")
+
+    results["select_tickets_page_cold"] = measure(
+        lambda: db.select_tickets_page(project, columns=list_columns),
+        repeat,
+        setup=clear_cache,
+    )
+    results["select_tickets_page_warm"] = measure(
+        lambda: db.select_tickets_page(project, columns=list_columns), repeat
+    )
+    results["select_tickets_page_admin_cold"] = measure(
+        lambda: db.select_tickets_page(None, columns=list_columns),
+        repeat,
+        setup=clear_cache,
+    )
+    results["select_tickets_page_filtered_cold"] = measure(
+        lambda: db.select_tickets_page(
+            project, filters={"trang_thai": "Đang xử lý"}, columns=list_columns
+        ),
+        repeat,
+        setup=clear_cache,
+    )
+    results["select_tickets_by_project_cold"] = measure(
+        lambda: db.select_tickets_by_project(project), repeat, setup=clear_cache
+    )
+    results["get_ticket_by_id_cold"] = measure(
+        lambda: db.get_ticket_by_id(1), repeat, setup=clear_cache
+    )
+    results["get_ticket_stats_rpc_cold"] = measure(
+        lambda: db.get_ticket_stats(project), repeat, setup=clear_cache
+    )
+    results["get_ticket_stats_admin_rpc_cold"] = measure(
+        lambda: db.get_ticket_stats(None), repeat, setup=clear_cache
+    )
+
+    # Các truy vấn của một lần rerun trang admin: tuần tự và song song
+    admin_calls = {
+        "page": ("select_tickets_page", None, None, 0, 50, list_columns),
+        "stats": ("get_ticket_stats", None, None),
+        "users": ("get_all_users",),
+    }
+    results["admin_reads_sequential_cold"] = measure(
+        lambda: [
+            getattr(db, method)(*args) for method, *args in admin_calls.values()
+        ],
+        repeat,
+        setup=clear_cache_all,
+    )
+    # Fan-out mặc định tắt (SUPABASE_ASYNC_FANOUT); bật riêng cho phép đo này
+    fanout_enabled = async_database.ASYNC_FANOUT_ENABLED
+    async_database.ASYNC_FANOUT_ENABLED = True
+    try:
+        results["admin_reads_fanout_cold"] = measure(
+            lambda: fetch_concurrently(db, **admin_calls),
+            repeat,
+            setup=clear_cache_all,
+        )
+    finally:
+        async_database.ASYNC_FANOUT_ENABLED = fanout_enabled
+
+    state = {}
+
+    def insert_and_update():
+        ticket = db.insert_ticket(
+            {
+                "project": project,
+                "phan_loai": "Task",
+                "nen_tang": "Web",
+                "noi_dung": "Benchmark ticket",
+                "uu_tien": "Thấp",
+            },
+            2,
+            project,
+        )
+        state["id"] = ticket["id"] if ticket else None
+        db.update_data("tickets", {"trang_thai": "Đang xử lý"}, {"id": state["id"]})
+
+    results["insert_update_ticket"] = measure(
+        insert_and_update,
+        repeat,
+        setup=lambda: state.get("id")
+        and db.delete_data("tickets", {"id": state.pop("id")}),
+    )
+
+    # Hàng đợi ghi nền: thời gian dialog bị chặn, và 5 lần sửa cùng ticket
+    # (được gộp) cho tới khi ghi xong
+    from write_queue import WriteQueue
+
+    write_queue = WriteQueue(lambda: db)
+    ticket_id = db.select_tickets_page(project, page_size=1)["data"][0]["id"]
+    results["queued_update_submit"] = measure(
+        lambda: write_queue.submit_update(ticket_id, {"ghi_chu": "Benchmark"}, "b"),
+        repeat,
+        setup=lambda: write_queue.wait(),
+    )
+
+    def queued_edits():
+        for priority in ["Thấp", "Trung bình", "Cao", "Khẩn cấp", "Thấp"]:
+            write_queue.submit_update(ticket_id, {"uu_tien": priority}, "b")
+        write_queue.wait()
+
+    results["queued_update_5_edits"] = measure(queued_edits, repeat)
+    write_queue.take_finished("b")
+    return results
+
+
+def benchmark_stats(db, project, repeat):
+    """Đo phần tính thống kê phía Python (dự phòng khi chưa có RPC)"""
+    project_tickets = db.select_tickets_by_project(
+        project, columns=TICKET_VIEW_COLUMNS["stats"]
+    )
+    all_tickets = db.select_data("tickets", TICKET_VIEW_COLUMNS["stats"])
+    # pandas được import ở lần gọi đầu tiên (không tính vào thời gian tính toán)
+    compute_ticket_stats([])
+    return {
+        "compute_ticket_stats_project": measure(
+            lambda: compute_ticket_stats(project_tickets), repeat
+        ),
+        "compute_ticket_stats_all": measure(
+            lambda: compute_ticket_stats(all_tickets), repeat
+        ),
+    }
+
+
+def benchmark_replica(db, project, repeat):
+    """Đo các truy vấn đọc từ bản sao SQLite (TICKET_SYNC_MODE=replica)"""
+    from ticket_filter import TicketFilter
+    from ticket_replica import TicketReplica
+
+    results = {}
+    replica = TicketReplica(":memory:")
+    results["replica_initial_sync"] = measure(lambda: replica.refresh(db), 1)
+    filtered = TicketFilter(values={"trang_thai": ["Đang xử lý", "Chờ xử lý"]})
+
+    results["replica_query_page"] = measure(
+        lambda: replica.query_page(None, 0, 50, project), repeat
+    )
+    results["replica_query_page_admin_filtered"] = measure(
+        lambda: replica.query_page(filtered, 0, 50), repeat
+    )
+    results["replica_stats_admin"] = measure(lambda: replica.stats(), repeat)
+    results["replica_search_admin"] = measure(
+        lambda: replica.search("loi dang nhap"), repeat
+    )
+    results["replica_incremental_sync"] = measure(
+        lambda: replica.refresh(db), repeat
+    )
+    return results
+
+
+def benchmark_app(project, repeat, timeout):
+    """Đo thời gian render toàn bộ trang tickets bằng Streamlit AppTest"""
+    from streamlit.testing.v1 import AppTest
+
+    results = {}
+    sessions = {
+        "render_tickets_page_user": {
+            "user_id": 2,
+            "username": f"{project}-user1",
+            "full_name": "Benchmark User",
+            "project": project,
+            "is_admin": False,
+        },
+        "render_tickets_page_admin": {
+            "user_id": 1,
+            "username": "admin",
+            "full_name": "Administrator",
+            "project": "ALL",
+            "is_admin": True,
+        },
+    }
+
+    for name, user in sessions.items():
+        errors = []
+
+        def render():
+            app = AppTest.from_file(APP_FILE, default_timeout=timeout)
+            app.session_state["authenticated"] = True
+            for key, value in user.items():
+                app.session_state[key] = value
+            app.run()
+            if app.exception:
+                errors.append(app.exception[0].value)
+
+        results[name] = measure(render, repeat)
+        if errors:
+            results[name]["error"] = str(errors[0])
+    return results
+
+
+def _render_page_part(scope):
+    """Script AppTest chỉ chạy một fragment của app.py (giống khi fragment chạy lại)"""
+    import app
+    from database import SupabaseHelper
+
+    db = SupabaseHelper()
+    if scope == "tickets":
+        app.show_tickets_table(db)
+    elif scope == "ticket_list":
+        app.show_ticket_list(db, None, None)
+    elif scope == "analytics":
+        app.show_ticket_analytics(db, None, None)
+    elif scope == "users":
+        app.show_users_management(db)
+
+
+# Tương tác của admin -> phần trang (fragment) chạy lại
+INTERACTIONS = {
+    "filter_change": "tickets",
+    "page_change": "ticket_list",
+    "ticket_select": "ticket_list",
+    "analytics_toggle": "analytics",
+    "user_view_mode": "users",
+}
+
+
+def benchmark_round_trips(timeout):
+    """
+    Đếm số request tới Supabase của mỗi tương tác khi cache rỗng
+
+    So sánh chạy lại toàn trang (app.py) với chỉ chạy lại fragment bị ảnh
+    hưởng (AppTest.from_function chỉ gọi fragment đó), dựa trên bộ đếm
+    st.session_state.round_trips của app.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    def run(app):
+        app.session_state["authenticated"] = True
+        app.session_state["user_id"] = 1
+        app.session_state["username"] = "admin"
+        app.session_state["project"] = "ALL"
+        app.session_state["is_admin"] = True
+        app.session_state["show_ticket_analytics"] = True
+        # Đánh dấu đây không phải lần chạy toàn trang (xem show_tickets_table)
+        app.session_state["page_run"] = 1
+        app.session_state["tickets_page_run"] = 1
+        invalidate_query_cache("tickets")
+        invalidate_query_cache("users")
+        app.run()
+        return app.session_state["round_trips"]
+
+    full_rerun = run(AppTest.from_file(APP_FILE, default_timeout=timeout))["page"]
+    results = {}
+    for name, scope in INTERACTIONS.items():
+        app = AppTest.from_function(
+            _render_page_part, args=(scope,), default_timeout=timeout
+        )
+        fragment_rerun = run(app)[scope]
+        results[f"round_trips_{name}"] = {
+            "full_rerun": full_rerun,
+            "fragment_rerun": fragment_rerun,
+            "saved": full_rerun - fragment_rerun,
+        }
+    return results
+
+
+def benchmark_startup(size, args):
+    """
+    Đo khởi động của process mới: thời gian import và lần render đầu tiên
+
+    Mỗi lần đo chạy benchmarks.startup_probe trong một process riêng (import
+    chỉ tốn thời gian ở lần đầu). Lần render đầu tiên được đo khi process
+    chưa làm nóng (người dùng đầu tiên chờ cả import) và sau warmup.warm_up()
+    (import và làm nóng xong trước khi server nhận traffic).
+    """
+    runs = {"cold": [], "warm": []}
+    for _ in range(args.app_repeat):
+        for mode in runs:
+            command = [
+                sys.executable,
+                "-m",
+                "benchmarks.startup_probe",
+                "--size",
+                str(size),
+                "--projects",
+                str(args.projects),
+                "--seed",
+                str(args.seed),
+                "--latency",
+                str(args.latency),
+                "--timeout",
+                str(args.app_timeout),
+            ]
+            if mode == "warm":
+                command.append("--warm")
+            output = subprocess.run(
+                command, cwd=ROOT_DIR, capture_output=True, text=True, check=True
+            ).stdout
+            runs[mode].append(json.loads(output.strip().splitlines()[-1]))
+
+    results = {
+        "startup_import": summarize_durations([r["import_ms"] for r in runs["cold"]]),
+        # Người dùng đầu tiên của process chưa làm nóng chờ cả phần import
+        "startup_first_render_cold": summarize_durations(
+            [r["import_ms"] + r["first_render_ms"] for r in runs["cold"]]
+        ),
+        "startup_warmup": summarize_durations([r["warmup_ms"] for r in runs["warm"]]),
+        "startup_first_render_warm": summarize_durations(
+            [r["first_render_ms"] for r in runs["warm"]]
+        ),
+    }
+    errors = [r["error"] for r in runs["cold"] + runs["warm"] if "error" in r]
+    if errors:
+        results["startup_first_render_cold"]["error"] = errors[0]
+    return results
+
+
+def run_size(size, args):
+    """Chạy toàn bộ benchmark cho một kích thước dữ liệu"""
+    print(f"\n📦 {size:,} tickets / {args.projects} projects")
+    dataset = generate_dataset(size, projects=args.projects, seed=args.seed)
+    client = FakeSupabaseClient(dataset, latency=args.latency)
+    use_supabase_client(client)
+    db = SupabaseHelper(client)
+    project = project_names(args.projects)[0]
+
+    results = {}
+    results.update(benchmark_helper(db, project, args.repeat))
+    results.update(benchmark_stats(db, project, args.repeat))
+    results.update(benchmark_replica(db, project, args.repeat))
+    if not args.skip_app:
+        results.update(benchmark_app(project, args.app_repeat, args.app_timeout))
+        results.update(benchmark_round_trips(args.app_timeout))
+    if not args.skip_startup:
+        results.update(benchmark_startup(size, args))
+    results["requests"] = {"count": client.request_count}
+
+    for name, stats in results.items():
+        if "median_ms" in stats:
+            print(f"   {name:<36} {stats['median_ms']:>10.2f} ms")
+        elif "saved" in stats:
+            print(
+                f"   {name:<36} {stats['fragment_rerun']:>4} request"
+                f" (cả trang: {stats['full_rerun']}, tiết kiệm {stats['saved']})"
+            )
+    return results
+
+
+def compare(results, baseline, threshold, min_delta_ms=DEFAULT_MIN_DELTA_MS):
+    """
+    So sánh kết quả với một lần chạy trước
+
+    Returns:
+        list: Các benchmark chậm hơn ngưỡng (size, tên, tỷ lệ)
+    """
+    regressions = []
+    print(f"\n📊 So sánh với baseline (ngưỡng x{threshold})")
+    for size, benchmarks in results.items():
+        for name, stats in benchmarks.items():
+            old = baseline.get(size, {}).get(name, {})
+            if "median_ms" not in stats or not old.get("median_ms"):
+                continue
+            ratio = stats["median_ms"] / old["median_ms"]
+            slower = (
+                ratio > threshold
+                and stats["median_ms"] - old["median_ms"] >= min_delta_ms
+            )
+            marker = "❌" if slower else "✅"
+            print(
+                f"   {marker} {size:>7} {name:<36} "
+                f"{old['median_ms']:>9.2f} → {stats['median_ms']:>9.2f} ms (x{ratio:.2f})"
+            )
+            if slower:
+                regressions.append((size, name, ratio))
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark Ticket Management")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--projects", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--app-repeat", type=int, default=3)
+    parser.add_argument("--app-timeout", type=float, default=60)
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        help="Độ trễ giả lập mỗi request tới Supabase (giây)",
+    )
+    parser.add_argument("--skip-app", action="store_true", help="Bỏ qua AppTest")
+    parser.add_argument(
+        "--skip-startup",
+        action="store_true",
+        help="Bỏ qua benchmark khởi động (process mới cho mỗi lần đo)",
+    )
+    parser.add_argument("--output", help="File JSON lưu kết quả")
+    parser.add_argument("--compare", help="File JSON kết quả trước đó để so sánh")
+    parser.add_argument(
+        "--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD
+    )
+    parser.add_argument("--min-delta-ms", type=float, default=DEFAULT_MIN_DELTA_MS)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    # Ẩn cảnh báo "missing ScriptRunContext" khi gọi SupabaseHelper ngoài Streamlit
+    set_log_level("error")
+    print("⏱️  Benchmark Ticket Management (Supabase giả lập)")
+    print("=" * 50)
+
+    results = {}
+    try:
+        for size in args.sizes:
+            results[str(size)] = run_size(size, args)
+    finally:
+        use_supabase_client(None)
+
+    report = {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "projects": args.projects,
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "latency": args.latency,
+        },
+        "results": results,
+    }
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"benchmark-{stamp}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 Đã lưu kết quả: {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f).get("results", {})
+        regressions = compare(
+            results, baseline, args.threshold, args.min_delta_ms
+        )
+        if regressions:
+            print(f"\n❌ {len(regressions)} benchmark chậm hơn baseline!")
+            sys.exit(1)
+        print("\n✅ Không có benchmark nào chậm hơn baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Đo khởi động của một process mới (được run_benchmarks chạy trong subprocess)
+
+Import chỉ tốn thời gian ở lần đầu trong process, nên mỗi lần đo cần một
+process riêng:
+    python -m benchmarks.startup_probe --size 1000
+    python -m benchmarks.startup_probe --size 1000 --warm
+
+In ra một dòng JSON (ms):
+    - import_ms: import streamlit và các module app.py import lúc khởi động
+    - warmup_ms: warmup.warm_up() (chỉ khi --warm)
+    - first_render_ms: lần chạy đầu tiên của trang tickets (admin)
+"""
+
+import argparse
+import ast
+import importlib
+import json
+import os
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_FILE = os.path.join(ROOT_DIR, "app.py")
+
+
+def app_imports():
+    """Các module app.py import ở đầu file (giữ đồng bộ với app.py)"""
+    with open(APP_FILE, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            modules.append(node.module)
+    return modules
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Đo khởi động một process mới")
+    parser.add_argument("--size", type=int, default=1000)
+    parser.add_argument("--projects", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--warm", action="store_true", help="Chạy warm_up() trước")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    result = {}
+
+    start = time.perf_counter()
+    import streamlit  # noqa: F401
+
+    for module in app_imports():
+        importlib.import_module(module)
+    result["import_ms"] = (time.perf_counter() - start) * 1000
+
+    from streamlit.logger import set_log_level
+    from streamlit.testing.v1 import AppTest
+
+    from benchmarks.data_generator import generate_dataset
+    from benchmarks.fake_supabase import FakeSupabaseClient
+    from database import use_supabase_client
+
+    set_log_level("error")
+    dataset = generate_dataset(args.size, projects=args.projects, seed=args.seed)
+    use_supabase_client(FakeSupabaseClient(dataset, latency=args.latency))
+
+    if args.warm:
+        from warmup import warm_up
+
+        start = time.perf_counter()
+        warm_up([])
+        result["warmup_ms"] = (time.perf_counter() - start) * 1000
+
+    app = AppTest.from_file(APP_FILE, default_timeout=args.timeout)
+    for key, value in {
+        "authenticated": True,
+        "user_id": 1,
+        "username": "admin",
+        "full_name": "Administrator",
+        "project": "ALL",
+        "is_admin": True,
+    }.items():
+        app.session_state[key] = value
+    start = time.perf_counter()
+    app.run()
+    result["first_render_ms"] = (time.perf_counter() - start) * 1000
+    if app.exception:
+        result["error"] = str(app.exception[0].value)
+
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
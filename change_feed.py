@@ -0,0 +1,360 @@
+"""
+Change feed: đẩy các thay đổi của bảng tickets tới mọi session đang mở
+
+Các sự kiện insert/update/delete được đưa vào ChangeStore dùng chung trong
+process theo từng nhóm (mỗi thao tác ghi là một nhóm). ChangeStore vá trực
+tiếp các dòng bị ảnh hưởng trong snapshot (ticket_sync), xóa cache truy vấn
+của đúng project đó và tăng version một lần cho cả nhóm, để các session chỉ
+cần so sánh version (không tốn request) rồi rerun.
+
+Chọn nguồn sự kiện bằng biến môi trường TICKET_CHANGE_FEED:
+    - "realtime": Supabase Realtime (cần chạy migrations/0004_ticket_realtime.sql)
+    - "loopback": phát lại các thao tác ghi trong chính process (dùng khi
+      test hoặc khi chỉ chạy một replica)
+    - để trống: tắt change feed
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from collections import deque
+from itertools import groupby
+
+from database import add_write_listener, invalidate_query_cache
+from ticket_sync import get_ticket_snapshots
+
+CHANGE_FEED_MODE = os.getenv("TICKET_CHANGE_FEED", "").lower()
+
+# Chu kỳ các session kiểm tra version của ChangeStore (giây)
+CHANGE_FEED_POLL_SECONDS = float(os.getenv("TICKET_CHANGE_FEED_POLL_SECONDS", "3"))
+
+EVENT_TYPES = ("INSERT", "UPDATE", "DELETE")
+
+logger = logging.getLogger(__name__)
+
+
+def make_change_event(event_type, table, record=None, old_record=None):
+    """
+    Tạo sự kiện thay đổi theo định dạng chung
+
+    Args:
+        event_type (str): "INSERT", "UPDATE" hoặc "DELETE"
+        table (str): Tên bảng
+        record (dict): Dòng sau khi thay đổi
+        old_record (dict): Dòng trước khi thay đổi (với DELETE)
+
+    Returns:
+        dict: {"type", "table", "record", "old_record"}
+    """
+    return {
+        "type": event_type.upper(),
+        "table": table,
+        "record": record or {},
+        "old_record": old_record or {},
+    }
+
+
+class ChangeStore:
+    def __init__(self, history_size=200):
+        """
+        Args:
+            history_size (int): Số sự kiện gần nhất được giữ lại để hiển thị
+        """
+        self.version = 0
+        self.project_versions = {}
+        self.recent_events = deque(maxlen=history_size)
+        self._lock = threading.Lock()
+
+    def apply(self, events):
+        """
+        Áp dụng một nhóm sự kiện thay đổi vào dữ liệu dùng chung
+
+        Cả nhóm chỉ xóa cache và tăng version một lần (ghi hàng loạt không
+        làm các session rerun theo từng dòng).
+
+        Args:
+            events (list): Các sự kiện tạo bởi make_change_event
+        """
+        events = [
+            event
+            for event in events
+            if event.get("table") == "tickets" and event.get("type") in EVENT_TYPES
+        ]
+        if not events:
+            return
+
+        projects = set()
+        for event in events:
+            event_projects = {
+                (event.get(key) or {}).get("project")
+                for key in ("record", "old_record")
+            } - {None, ""}
+            if not event_projects:
+                # Sự kiện không rõ project ảnh hưởng mọi project
+                projects = None
+                break
+            projects |= event_projects
+
+        # Chỉ xóa cache của project bị ảnh hưởng
+        invalidate_query_cache("tickets", projects)
+
+        # Vá đúng dòng bị ảnh hưởng trong các snapshot, không tải lại cả bảng;
+        # giữ thứ tự giữa các đoạn xóa và ghi liên tiếp
+        snapshots = get_ticket_snapshots(projects)
+        for event_type, group in groupby(events, key=lambda event: event["type"]):
+            group = list(group)
+            if event_type == "DELETE":
+                ids = [
+                    event["old_record"].get("id") or event["record"].get("id")
+                    for event in group
+                ]
+                for snapshot in snapshots:
+                    snapshot.apply_delete(ids)
+            else:
+                records = [
+                    event["record"]
+                    for event in group
+                    if event["record"].get("id") is not None
+                ]
+                for snapshot in snapshots:
+                    snapshot.apply_records(records)
+
+        with self._lock:
+            self.version += 1
+            for project in projects or [None]:
+                self.project_versions[project] = self.version
+            self.recent_events.extend(events)
+
+    def version_for(self, project=None):
+        """
+        Lấy version hiện tại mà một session cần theo dõi
+
+        Args:
+            project (str): Project của session (None = tất cả, dành cho admin)
+
+        Returns:
+            int: Version tăng mỗi khi có thay đổi liên quan
+        """
+        with self._lock:
+            if project is None:
+                return self.version
+            # Sự kiện không rõ project (None) ảnh hưởng mọi session
+            return max(
+                self.project_versions.get(project, 0),
+                self.project_versions.get(None, 0),
+            )
+
+
+class ChangeFeed:
+    """Giao diện chung của nguồn sự kiện thay đổi"""
+
+    def __init__(self):
+        self.error = None
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback):
+        """
+        Đăng ký nhận sự kiện
+
+        Args:
+            callback (callable): callback(events), events là list các sự kiện
+                của một thao tác ghi
+
+        Returns:
+            callable: Hàm hủy đăng ký
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+
+        return unsubscribe
+
+    def _dispatch(self, events):
+        """Gửi một nhóm sự kiện tới mọi subscriber"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(events)
+            except Exception:
+                logger.exception("Lỗi khi xử lý sự kiện change feed")
+                continue
+
+    def start(self):
+        """Bắt đầu nhận sự kiện"""
+
+    def stop(self):
+        """Dừng nhận sự kiện"""
+
+
+class LoopbackChangeFeed(ChangeFeed):
+    """
+    Change feed trong process: phát lại các thao tác ghi của SupabaseHelper
+
+    Dùng cho test (gọi publish trực tiếp) hoặc khi chỉ chạy một replica.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._started = False
+
+    def publish(self, events):
+        """
+        Phát một nhóm sự kiện tới các subscriber
+
+        Args:
+            events (dict | list): Một sự kiện hoặc list sự kiện của một thao tác ghi
+        """
+        self._dispatch([events] if isinstance(events, dict) else list(events))
+
+    def start(self):
+        if not self._started:
+            add_write_listener(self._on_write)
+            self._started = True
+
+    def _on_write(self, table_name, operation, rows, projects):
+        """Chuyển một thao tác ghi (có thể nhiều dòng) thành một nhóm sự kiện"""
+        event_type = operation.upper()
+        if event_type == "DELETE":
+            events = [
+                make_change_event(event_type, table_name, old_record=row)
+                for row in rows
+            ]
+        else:
+            events = [
+                make_change_event(event_type, table_name, record=row) for row in rows
+            ]
+        if events:
+            self.publish(events)
+
+
+class SupabaseRealtimeChangeFeed(ChangeFeed):
+    """
+    Change feed từ Supabase Realtime (postgres_changes trên bảng tickets)
+
+    Client realtime chạy bất đồng bộ nên được đặt trong một event loop
+    riêng ở thread nền.
+    """
+
+    def __init__(self, url=None, key=None, table="tickets"):
+        super().__init__()
+        self.url = url or os.getenv("SUPABASE_URL")
+        self.key = key or os.getenv("SUPABASE_ANON_KEY")
+        self.table = table
+        self._loop = None
+        self._thread = None
+        self._client = None
+        self._channel = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run, name="ticket-change-feed", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._subscribe())
+            self._loop.run_forever()
+        except Exception as e:
+            logger.exception("Không kết nối được Supabase Realtime")
+            self.error = e
+
+    async def _subscribe(self):
+        from supabase import acreate_client
+
+        client = await acreate_client(self.url, self.key)
+        channel = client.channel(f"{self.table}-changes")
+        channel.on_postgres_changes(
+            "*", schema="public", table=self.table, callback=self._on_change
+        )
+        await channel.subscribe(self._on_status)
+        # Giữ tham chiếu để channel không bị thu hồi
+        self._client = client
+        self._channel = channel
+
+    def _on_status(self, state, error=None):
+        """Ghi lại lỗi đăng ký channel (CHANNEL_ERROR, TIMED_OUT, CLOSED)"""
+        state = getattr(state, "value", state)
+        if state == "SUBSCRIBED":
+            self.error = None
+            return
+        self.error = error or RuntimeError(f"Realtime channel: {state}")
+        logger.warning("Supabase Realtime channel %s: %s", state, error or "")
+
+    def _on_change(self, payload):
+        """Chuẩn hóa payload của Supabase Realtime thành sự kiện thay đổi"""
+        data = payload.get("data", payload) if isinstance(payload, dict) else {}
+        event_type = data.get("type") or data.get("eventType") or ""
+        self._dispatch(
+            [
+                make_change_event(
+                    str(event_type),
+                    data.get("table", self.table),
+                    record=data.get("record") or data.get("new"),
+                    old_record=data.get("old_record") or data.get("old"),
+                )
+            ]
+        )
+
+
+_change_store = ChangeStore()
+_change_feed = None
+_change_feed_lock = threading.Lock()
+
+
+def is_change_feed_enabled():
+    """Kiểm tra change feed có được bật không"""
+    return CHANGE_FEED_MODE in ("realtime", "loopback")
+
+
+def get_change_store():
+    """Lấy ChangeStore dùng chung trong process"""
+    return _change_store
+
+
+def get_change_feed_error():
+    """
+    Lấy lỗi gần nhất của change feed (vd. không đăng ký được Realtime)
+
+    Returns:
+        Exception: Lỗi, hoặc None nếu change feed tắt/đang chạy bình thường
+    """
+    feed = _change_feed
+    return feed.error if feed is not None else None
+
+
+def get_change_feed():
+    """
+    Lấy (và khởi động nếu cần) change feed dùng chung trong process
+
+    Returns:
+        ChangeFeed: Change feed theo TICKET_CHANGE_FEED, hoặc None nếu tắt
+    """
+    global _change_feed
+    if not is_change_feed_enabled():
+        return None
+
+    with _change_feed_lock:
+        if _change_feed is None:
+            if CHANGE_FEED_MODE == "realtime":
+                _change_feed = SupabaseRealtimeChangeFeed()
+            else:
+                _change_feed = LoopbackChangeFeed()
+            _change_feed.subscribe(_change_store.apply)
+            _change_feed.start()
+        return _change_feed
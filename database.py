@@ -3,10 +3,94 @@ from supabase import create_client, Client
 from dotenv import load_dotenv
 import streamlit as st
 import hashlib
-
-# Load environment variables
+import re
+import sys
+import threading
+import time
+from instrumentation import create_instrumentation, query_target
+from query_cache import QueryCache, make_filters_key
+from ticket_filter import TicketFilter
+from ticket_normalize import normalize_tickets
+
+# Load environment variables (một lần cho cả app: các module khác đọc cấu hình
+# sau khi import database)
 load_dotenv()
 
+# Cache truy vấn dùng chung cho mọi session trong process (TTL tính bằng giây)
+_query_cache = QueryCache(
+    maxsize=int(os.getenv("QUERY_CACHE_MAXSIZE", "256")),
+    ttl=float(os.getenv("QUERY_CACHE_TTL", "60")),
+)
+
+def invalidate_query_cache(table_name, projects=None):
+    """
+    Xóa cache truy vấn của một bảng (dùng cả ngoài SupabaseHelper, vd. change feed)
+
+    Args:
+        table_name (str): Tên bảng
+        projects (iterable): Các project bị ảnh hưởng (None = cả bảng)
+    """
+    _query_cache.invalidate(table_name, projects)
+
+
+def get_query_cache():
+    """Lấy cache truy vấn dùng chung (dùng cho AsyncSupabaseHelper)"""
+    return _query_cache
+
+
+# Thời gian, số dòng, kích thước và lỗi của từng request tới Supabase, dùng
+# chung cho mọi session trong process (tab "Hiệu năng" của admin)
+_instrumentation = create_instrumentation()
+
+
+def get_instrumentation():
+    """Lấy bộ đo hiệu năng request dùng chung (dùng cho AsyncSupabaseHelper, app)"""
+    return _instrumentation
+
+
+# Số request tới Supabase theo từng thread (mỗi session Streamlit chạy script
+# trong thread riêng), dùng để đo số round trip của mỗi lần rerun/tương tác
+_round_trips = threading.local()
+
+
+def count_round_trips(count=1):
+    """Cộng thêm số request tới Supabase của thread hiện tại"""
+    _round_trips.count = get_round_trip_count() + count
+
+
+def get_round_trip_count():
+    """
+    Lấy tổng số request tới Supabase của thread hiện tại
+
+    Returns:
+        int: Số request (so sánh hai lần gọi để biết số round trip của một đoạn code)
+    """
+    return getattr(_round_trips, "count", 0)
+
+
+# Các hàm được gọi sau mỗi thao tác ghi thành công (snapshot, change feed, ...)
+_write_listeners = []
+
+
+def add_write_listener(listener):
+    """
+    Đăng ký hàm được gọi sau mỗi thao tác ghi thành công của SupabaseHelper
+
+    Args:
+        listener (callable): listener(table_name, operation, rows, projects)
+            - operation: "insert", "update" hoặc "delete"
+            - rows: các dòng Supabase trả về
+            - projects: tập project bị ảnh hưởng (None = không xác định)
+    """
+    if listener not in _write_listeners:
+        _write_listeners.append(listener)
+
+
+def remove_write_listener(listener):
+    """Hủy đăng ký listener đã thêm bằng add_write_listener"""
+    if listener in _write_listeners:
+        _write_listeners.remove(listener)
+
 
 @st.cache_resource
 def init_connection():
@@ -29,10 +113,35 @@ def init_connection():
         st.stop()
 
 
+# Client thay thế (vd. FakeSupabaseClient khi benchmark/test), None = Supabase thật
+_client_override = None
+
+
+def use_supabase_client(client):
+    """
+    Thay client Supabase dùng cho mọi SupabaseHelper (benchmark, test)
+
+    Args:
+        client: Client có cùng giao diện table()/rpc(), None để dùng lại Supabase thật
+    """
+    global _client_override
+    _client_override = client
+    _query_cache.clear()
+
+
+def is_supabase_configured():
+    """Đã có client Supabase (cấu hình trong .env hoặc client thay thế) chưa"""
+    if _client_override is not None:
+        return True
+    return bool(os.getenv("SUPABASE_URL") and os.getenv("SUPABASE_ANON_KEY"))
+
+
 def get_supabase_client():
     """
     Lấy client Supabase đã được cache
     """
+    if _client_override is not None:
+        return _client_override
     return init_connection()
 
 
@@ -41,10 +150,121 @@ def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
 
 
+# Tên người tạo lấy bằng embedded select của PostgREST (tickets.created_by ->
+# users.id) trong cùng request với danh sách, không phải tra từng user
+TICKET_CREATOR_COLUMN = "nguoi_tao:users!created_by(full_name)"
+
+# Cột cần lấy cho từng màn hình: danh sách chỉ lấy cột hiển thị + bản preview
+# (computed column trong migrations/0002_ticket_previews.sql), dialog sửa mới
+# lấy toàn bộ dòng
+TICKET_VIEW_COLUMNS = {
+    "list": (
+        "id, project, phan_loai, nen_tang, uu_tien, trang_thai, "
+        "thoi_han_mong_muon, ngay_yeu_cau, ngay_hoan_thanh, "
+        "noi_dung_preview, ghi_chu_preview, created_by, " + TICKET_CREATOR_COLUMN
+    ),
+    "stats": "trang_thai, ngay_yeu_cau, ngay_hoan_thanh",
+    "analytics": "trang_thai, uu_tien, nen_tang, ngay_yeu_cau, ngay_hoan_thanh",
+    "detail": "*",
+}
+
+# Số dòng mỗi request của thao tác hàng loạt (giữ URL của filter in_ đủ ngắn)
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "200"))
+
+# Số tickets mỗi trang mặc định của danh sách
+TICKET_PAGE_SIZE = 50
+
+# Số dòng mỗi request khi xuất toàn bộ tickets
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "1000"))
+
+# Số kết quả tìm kiếm tối đa (hàm search_tickets giới hạn 500)
+SEARCH_LIMIT = int(os.getenv("SEARCH_LIMIT", "50"))
+
+# Độ dài bản preview (khớp với migrations/0002_ticket_previews.sql)
+TICKET_PREVIEW_LENGTHS = {"noi_dung": 30, "ghi_chu": 25}
+
+
+def column_names(columns):
+    """
+    Lấy tên các cột trong kết quả của một chuỗi select
+
+    Cột nhúng dạng "alias:bảng!khóa(cột)" được đặt tên theo alias.
+
+    Args:
+        columns (str): Chuỗi cột của select, vd. "id, nguoi_tao:users(full_name)"
+
+    Returns:
+        list: Tên cột, vd. ["id", "nguoi_tao"]
+    """
+    names, depth, current = [], 0, ""
+    for char in columns + ",":
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        if char == "," and depth == 0:
+            name = current.strip().split("(")[0].split("!")[0]
+            if name:
+                names.append(name.split(":")[0])
+            current = ""
+        else:
+            current += char
+    return names
+
+
+def without_creator_column(columns):
+    """Bỏ cột nhúng người tạo khỏi chuỗi select (dự phòng khi chưa có khóa ngoại)"""
+    return columns.replace(", " + TICKET_CREATOR_COLUMN, "").replace(
+        TICKET_CREATOR_COLUMN, ""
+    )
+
+
+def add_ticket_previews(tickets):
+    """
+    Tạo bản preview phía client (dùng khi chưa có computed column preview)
+
+    Args:
+        tickets (list): Danh sách tickets có noi_dung/ghi_chu đầy đủ
+
+    Returns:
+        list: Chính danh sách tickets, đã thêm các cột *_preview
+    """
+    for ticket in tickets:
+        for column, length in TICKET_PREVIEW_LENGTHS.items():
+            text = ticket.get(column)
+            if text and len(text) > length:
+                text = text[:length] + "..."
+            ticket[f"{column}_preview"] = text
+    return tickets
+
+
+def compute_ticket_stats(tickets):
+    """
+    Tính thống kê tickets phía client (dùng khi chưa có hàm get_ticket_stats)
+
+    Args:
+        tickets (list): Danh sách tickets (cần trang_thai, ngay_yeu_cau, ngay_hoan_thanh)
+
+    Returns:
+        dict: {"total": int, "by_status": dict, "avg_completion_days": float hoặc None}
+    """
+    # pandas chỉ được import khi cần
+    from ticket_analytics import summarize_tickets, tickets_to_frame
+
+    return summarize_tickets(tickets_to_frame(tickets))
+
+
 # Các hàm tiện ích để làm việc với Supabase
 class SupabaseHelper:
-    def __init__(self):
-        self.supabase = get_supabase_client()
+    def __init__(self, client=None, identity_map=None):
+        """
+        Args:
+            client: Client Supabase dùng riêng (mặc định: client dùng chung)
+            identity_map (IdentityMap): Các dòng đã tải của session (tùy chọn),
+                dùng để mở dialog mà không phải hỏi lại Supabase
+        """
+        self.supabase = client or get_supabase_client()
+        self.identity_map = identity_map
 
     def authenticate_user(self, username, password):
         """
@@ -60,12 +280,11 @@ class SupabaseHelper:
         try:
             password_hash = hash_password(password)
 
-            response = (
+            response = self._execute(
                 self.supabase.table("users")
                 .select("*")
                 .eq("username", username)
                 .eq("password_hash", password_hash)
-                .execute()
             )
 
             if response.data and len(response.data) > 0:
@@ -87,11 +306,8 @@ class SupabaseHelper:
             dict: Thông tin user hoặc None
         """
         try:
-            response = (
-                self.supabase.table("users")
-                .select("*")
-                .eq("username", username)
-                .execute()
+            response = self._execute(
+                self.supabase.table("users").select("*").eq("username", username)
             )
             return response.data[0] if response.data else None
         except Exception as e:
@@ -105,9 +321,20 @@ class SupabaseHelper:
         Returns:
             list: Danh sách users
         """
+        cache_key = self._cache_key("users", None, None, "*", "order", "id")
+        hit, cached = _query_cache.get(cache_key)
+        if hit:
+            self._remember("users", cached)
+            return cached
+
         try:
-            response = self.supabase.table("users").select("*").order("id").execute()
-            return response.data if response.data else []
+            response = self._execute(
+                self.supabase.table("users").select("*").order("id")
+            )
+            data = response.data if response.data else []
+            _query_cache.set(cache_key, data)
+            self._remember("users", data)
+            return data
         except Exception as e:
             st.error(f"Lỗi khi lấy danh sách users: {e}")
             return []
@@ -122,15 +349,75 @@ class SupabaseHelper:
         Returns:
             dict: Thông tin user hoặc None
         """
+        if self.identity_map is not None:
+            user = self.identity_map.get("users", user_id)
+            if user is not None:
+                return user
+
         try:
-            response = (
-                self.supabase.table("users").select("*").eq("id", user_id).execute()
+            response = self._execute(
+                self.supabase.table("users").select("*").eq("id", user_id)
             )
+            self._remember("users", response.data)
             return response.data[0] if response.data else None
         except Exception as e:
             st.error(f"Lỗi khi lấy thông tin user: {e}")
             return None
 
+    def get_user_names(self):
+        """
+        Lấy danh bạ users: id -> họ tên (cache dùng chung trong process)
+
+        Dùng cho các chỗ cần đổi id thành tên mà không có cột nhúng, thay vì
+        gọi get_user_by_id cho từng dòng.
+
+        Returns:
+            dict: {user_id: full_name (hoặc username nếu chưa có họ tên)}
+        """
+        cache_key = self._cache_key("users", None, None, "directory")
+        hit, cached = _query_cache.get(cache_key)
+        if hit:
+            return cached
+
+        try:
+            response = self._execute(
+                self.supabase.table("users").select("id, username, full_name")
+            )
+            names = {
+                user["id"]: user.get("full_name") or user.get("username")
+                for user in response.data or []
+            }
+            _query_cache.set(cache_key, names)
+            return names
+
+        except Exception as e:
+            st.error(f"Lỗi khi lấy danh bạ users: {e}")
+            return {}
+
+    def attach_creator_names(self, tickets):
+        """
+        Gán cột nguoi_tao cho các tickets chưa có (từ danh bạ users)
+
+        Chỉ gửi tối đa một request (danh bạ được cache), và không gửi request
+        nào nếu mọi ticket đã có tên người tạo.
+
+        Args:
+            tickets (list): Danh sách tickets (cần created_by)
+
+        Returns:
+            list: Chính danh sách đó
+        """
+        missing = [
+            ticket
+            for ticket in tickets or []
+            if ticket.get("nguoi_tao") is None and ticket.get("created_by") is not None
+        ]
+        if missing:
+            names = self.get_user_names()
+            for ticket in missing:
+                ticket["nguoi_tao"] = names.get(ticket["created_by"])
+        return tickets
+
     def update_user(self, user_id, user_data):
         """
         Cập nhật thông tin user
@@ -143,12 +430,10 @@ class SupabaseHelper:
             dict: User đã cập nhật hoặc None
         """
         try:
-            response = (
-                self.supabase.table("users")
-                .update(user_data)
-                .eq("id", user_id)
-                .execute()
+            response = self._execute(
+                self.supabase.table("users").update(user_data).eq("id", user_id)
             )
+            self._after_write("users", "update", response.data)
             return response.data[0] if response.data else None
         except Exception as e:
             st.error(f"Lỗi khi cập nhật user: {e}")
@@ -165,7 +450,10 @@ class SupabaseHelper:
             bool: True nếu xóa thành công
         """
         try:
-            response = self.supabase.table("users").delete().eq("id", user_id).execute()
+            response = self._execute(
+                self.supabase.table("users").delete().eq("id", user_id)
+            )
+            self._after_write("users", "delete", response.data)
             return True
         except Exception as e:
             st.error(f"Lỗi khi xóa user: {e}")
@@ -188,7 +476,7 @@ class SupabaseHelper:
             if exclude_user_id:
                 query = query.neq("id", exclude_user_id)
 
-            response = query.execute()
+            response = self._execute(query)
             return len(response.data) > 0
         except Exception as e:
             st.error(f"Lỗi khi kiểm tra username: {e}")
@@ -219,13 +507,154 @@ class SupabaseHelper:
                 "is_admin": is_admin,
             }
 
-            response = self.supabase.table("users").insert(user_data).execute()
+            response = self._execute(self.supabase.table("users").insert(user_data))
+            self._after_write("users", "insert", response.data)
             return response.data[0] if response.data else None
 
         except Exception as e:
             st.error(f"Lỗi tạo user: {e}")
             return None
 
+    @staticmethod
+    def _execute(query):
+        """
+        Gửi một request tới Supabase (mọi truy vấn của helper đều đi qua đây)
+
+        Args:
+            query: Query builder hoặc RPC của Supabase
+
+        Returns:
+            Response của Supabase
+        """
+        count_round_trips()
+        if not _instrumentation.enabled:
+            return query.execute()
+
+        # Method của helper đã gửi request (vd. select_tickets_page)
+        method = sys._getframe(1).f_code.co_name
+        started = time.perf_counter()
+        try:
+            response = query.execute()
+        except Exception as e:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            _instrumentation.record(method, query_target(query), elapsed_ms, error=e)
+            raise
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        _instrumentation.record(method, query_target(query), elapsed_ms, response.data)
+        return response
+
+    @staticmethod
+    def _cache_key(table_name, project, filters, columns, *extra):
+        """Tạo khóa cache cho một truy vấn đọc"""
+        return (table_name, project, make_filters_key(filters), columns, extra)
+
+    @staticmethod
+    def _affected_projects(rows, data=None):
+        """
+        Xác định các project bị ảnh hưởng từ response của thao tác ghi
+
+        Args:
+            rows (list): Các dòng trả về từ Supabase
+            data (dict): Dữ liệu đã ghi (nếu có)
+
+        Returns:
+            set: Tập project, hoặc None nếu không xác định được (xóa cache cả bảng)
+        """
+        if not rows or any("project" not in row for row in rows):
+            return None
+        # Đổi project của ticket: không biết project cũ -> xóa cache cả bảng
+        if data and "project" in data:
+            return None
+        return {row.get("project") for row in rows}
+
+    @staticmethod
+    def _missing_creator_relation(error_msg, columns):
+        """Lỗi do chưa có quan hệ tickets.created_by -> users (PGRST200)"""
+        return TICKET_CREATOR_COLUMN in columns and (
+            "pgrst200" in error_msg or "relationship" in error_msg
+        )
+
+    def _remember(self, table_name, rows, columns="*"):
+        """Ghi nhận các dòng vừa tải vào identity map của session (nếu có)"""
+        if self.identity_map is not None:
+            self.identity_map.remember(table_name, rows, columns)
+
+    def invalidate_cache(self, table_name, projects=None):
+        """
+        Xóa cache của bảng sau khi ghi dữ liệu
+
+        Args:
+            table_name (str): Tên bảng
+            projects (iterable): Các project bị ảnh hưởng (None = cả bảng)
+        """
+        invalidate_query_cache(table_name, projects)
+
+    def _after_write(self, table_name, operation, rows, projects=None):
+        """
+        Xử lý sau khi ghi thành công: xóa cache và báo cho các listener
+
+        Args:
+            table_name (str): Tên bảng
+            operation (str): "insert", "update" hoặc "delete"
+            rows (list): Các dòng Supabase trả về
+            projects (iterable): Các project bị ảnh hưởng (None = cả bảng)
+        """
+        if table_name == "tickets":
+            normalize_tickets(rows)
+        self.invalidate_cache(table_name, projects)
+        if table_name == "users" and operation != "insert":
+            # Tên người tạo được nhúng trong các truy vấn tickets đã cache
+            self.invalidate_cache("tickets")
+        # Response của thao tác ghi là dòng đầy đủ mới nhất
+        if self.identity_map is not None:
+            if operation == "delete":
+                self.identity_map.forget(
+                    table_name, [row.get("id") for row in rows or []]
+                )
+            else:
+                self._remember(table_name, rows)
+        for listener in list(_write_listeners):
+            try:
+                listener(table_name, operation, rows or [], projects)
+            except Exception:
+                # Listener lỗi không được làm hỏng thao tác ghi
+                continue
+
+    def get_cache_stats(self):
+        """
+        Lấy bộ đếm hit/miss của cache truy vấn
+
+        Returns:
+            dict: hits, misses, evictions, invalidations, size, hit_rate
+        """
+        return _query_cache.stats()
+
+    @staticmethod
+    def _apply_filters(query, filters):
+        """
+        Áp dụng các điều kiện lọc lên query
+
+        Args:
+            query: Query builder của Supabase
+            filters (dict | TicketFilter): Điều kiện lọc bằng (eq), bỏ qua giá
+                trị None hoặc rỗng; hoặc bộ lọc tickets đầy đủ
+
+        Returns:
+            Query builder đã áp dụng filter
+        """
+        if isinstance(filters, TicketFilter):
+            return filters.apply(query)
+        if filters:
+            for column, value in filters.items():
+                if value is not None and value != "":
+                    query = query.eq(column, value)
+        return query
+
+    @staticmethod
+    def _filters_project(filters):
+        """Project trong filters kiểu dict (dùng làm phạm vi của khóa cache)"""
+        return filters.get("project") if isinstance(filters, dict) else None
+
     def select_data(self, table_name, columns="*", filters=None):
         """
         Lấy dữ liệu từ bảng
@@ -233,49 +662,443 @@ class SupabaseHelper:
         Args:
             table_name (str): Tên bảng
             columns (str): Cột cần lấy (mặc định: "*")
-            filters (dict): Điều kiện lọc
+            filters (dict | TicketFilter): Điều kiện lọc
         """
+        cache_key = self._cache_key(
+            table_name, self._filters_project(filters), filters, columns
+        )
+        hit, cached = _query_cache.get(cache_key)
+        if hit:
+            self._remember(table_name, cached, columns)
+            return cached
+
         try:
             query = self.supabase.table(table_name).select(columns)
+            query = self._apply_filters(query, filters)
 
-            if filters:
-                for column, value in filters.items():
-                    if value is not None and value != "":
-                        query = query.eq(column, value)
-
-            response = query.execute()
+            response = self._execute(query)
 
             # Đảm bảo luôn trả về list
             if response and hasattr(response, "data") and response.data is not None:
-                return response.data if isinstance(response.data, list) else []
+                data = response.data if isinstance(response.data, list) else []
             else:
-                return []
+                data = []
+            if table_name == "tickets":
+                normalize_tickets(data)
+            _query_cache.set(cache_key, data)
+            self._remember(table_name, data, columns)
+            return data
 
         except Exception as e:
             st.error(f"Lỗi khi lấy dữ liệu từ {table_name}: {e}")
             return []
 
-    def select_tickets_by_project(self, project, additional_filters=None):
+    def select_tickets_page(
+        self,
+        project=None,
+        filters=None,
+        page=0,
+        page_size=50,
+        columns="*",
+        count="exact",
+    ):
+        """
+        Lấy một trang tickets (phân trang phía server)
+
+        Thứ tự sắp xếp ổn định: theo sort của bộ lọc (mặc định ngay_yeu_cau
+        giảm dần), sau đó theo id, để các trang không bị trùng/lệch dòng giữa
+        các lần rerun.
+
+        Args:
+            project (str): Project cần lọc (None = tất cả project, dành cho admin)
+            filters (dict | TicketFilter): Các filter bổ sung
+            page (int): Chỉ số trang, bắt đầu từ 0
+            page_size (int): Số ticket mỗi trang
+            columns (str): Cột cần lấy (mặc định: "*")
+            count (str): Cách đếm tổng: "exact", "planned" hoặc "estimated"
+
+        Returns:
+            dict: {"data": list, "total": int, "page": int, "page_size": int}
+        """
+        page = max(0, int(page))
+        page_size = max(1, int(page_size))
+
+        cache_key = self._cache_key(
+            "tickets", project, filters, columns, "page", page, page_size, count
+        )
+        hit, cached = _query_cache.get(cache_key)
+        if hit:
+            self._remember("tickets", cached["data"], columns)
+            return cached
+
+        def build_query(with_project):
+            query = self.supabase.table("tickets").select(columns, count=count)
+            if with_project and project:
+                query = query.eq("project", project)
+            query = self._apply_filters(query, filters)
+            query = TicketFilter.from_dict(filters).apply_order(query)
+            start = page * page_size
+            return query.range(start, start + page_size - 1)
+
+        try:
+            try:
+                response = self._execute(build_query(True))
+            except Exception as e:
+                error_msg = str(e).lower()
+                # Trang vượt quá tổng số dòng (HTTP 416) -> quay về trang đầu
+                if page > 0 and ("range" in error_msg or "pgrst103" in error_msg):
+                    return self.select_tickets_page(
+                        project, filters, 0, page_size, columns, count
+                    )
+                # Chưa có computed column preview -> lấy cột đầy đủ rồi cắt ở client
+                if "_preview" in error_msg and "_preview" in columns:
+                    st.warning(
+                        "⚠️ Chưa có cột preview. Vui lòng chạy python migrate_database.py (migrations/0002_ticket_previews.sql)"
+                    )
+                    result = self.select_tickets_page(
+                        project,
+                        filters,
+                        page,
+                        page_size,
+                        columns.replace("_preview", ""),
+                        count,
+                    )
+                    add_ticket_previews(result["data"])
+                    _query_cache.set(cache_key, result)
+                    return result
+                # Chưa có khóa ngoại created_by -> users: lấy tên từ danh bạ users
+                if self._missing_creator_relation(error_msg, columns):
+                    result = self.select_tickets_page(
+                        project,
+                        filters,
+                        page,
+                        page_size,
+                        without_creator_column(columns),
+                        count,
+                    )
+                    self.attach_creator_names(result["data"])
+                    _query_cache.set(cache_key, result)
+                    return result
+                # Nếu lỗi do thiếu cột project, fallback về tất cả tickets
+                if project and "project" in error_msg:
+                    st.warning(
+                        "⚠️ Bảng tickets chưa có cột project. Hiển thị tất cả tickets."
+                    )
+                    response = self._execute(build_query(False))
+                else:
+                    raise
+
+            data = normalize_tickets(response.data if response.data else [])
+            total = response.count if response.count is not None else len(data)
+            result = {
+                "data": data,
+                "total": total,
+                "page": page,
+                "page_size": page_size,
+            }
+            _query_cache.set(cache_key, result)
+            self._remember("tickets", data, columns)
+            return result
+
+        except Exception as e:
+            st.error(f"Lỗi khi lấy trang tickets: {e}")
+            return {"data": [], "total": 0, "page": page, "page_size": page_size}
+
+    def get_ticket_by_id(
+        self, ticket_id, columns=TICKET_VIEW_COLUMNS["detail"], required=None
+    ):
+        """
+        Lấy đầy đủ thông tin một ticket (dùng khi mở dialog)
+
+        Ticket đã có trong identity map của session (đủ cột, còn mới) được
+        dùng luôn, không gửi request.
+
+        Args:
+            ticket_id (int): ID của ticket
+            columns (str): Cột cần lấy (mặc định: toàn bộ dòng)
+            required (iterable): Các cột đủ dùng nếu lấy từ identity map
+                (mặc định: các cột trong columns)
+
+        Returns:
+            dict: Ticket hoặc None
+        """
+        if self.identity_map is not None:
+            if required is None and columns.strip() != "*":
+                required = column_names(columns)
+            ticket = self.identity_map.get("tickets", ticket_id, required)
+            if ticket is not None:
+                return ticket
+
+        tickets = self.select_data("tickets", columns, {"id": ticket_id})
+        return tickets[0] if tickets else None
+
+    def get_ticket_stats(self, project=None, filters=None):
+        """
+        Lấy thống kê tickets bằng một truy vấn tổng hợp (RPC get_ticket_stats)
+
+        Kết quả chỉ gồm vài con số nên kích thước response không phụ thuộc
+        số lượng tickets, và luôn đúng cho toàn bộ dữ liệu dù danh sách
+        đang được phân trang.
+
+        Args:
+            project (str): Project cần lọc (None = tất cả project)
+            filters (dict | TicketFilter): Các filter bổ sung
+
+        Returns:
+            dict: {"total": int, "by_status": dict, "avg_completion_days": float hoặc None}
+                  hoặc None nếu lỗi
+        """
+        params = {
+            "p_project": project or None,
+            **TicketFilter.from_dict(filters).rpc_params(),
+        }
+
+        cache_key = self._cache_key("tickets", project, filters, "stats")
+        hit, cached = _query_cache.get(cache_key)
+        if hit:
+            return cached
+
+        try:
+            response = self._execute(self.supabase.rpc("get_ticket_stats", params))
+            stats = response.data or {}
+            avg_days = stats.get("avg_completion_days")
+            result = {
+                "total": int(stats.get("total") or 0),
+                "by_status": stats.get("by_status") or {},
+                "avg_completion_days": (
+                    float(avg_days) if avg_days is not None else None
+                ),
+            }
+            _query_cache.set(cache_key, result)
+            return result
+
+        except Exception as e:
+            # Nếu chưa tạo hàm RPC, fallback tính phía client với vài cột nhỏ
+            error_msg = str(e).lower()
+            if "get_ticket_stats" in error_msg or "pgrst202" in error_msg:
+                st.warning(
+                    "⚠️ Chưa có hàm get_ticket_stats. Vui lòng chạy python migrate_database.py (migrations/0006_ticket_stats.sql)"
+                )
+                stats_columns = TICKET_VIEW_COLUMNS["stats"]
+                if project:
+                    rows = self.select_tickets_by_project(
+                        project, filters, stats_columns
+                    )
+                else:
+                    rows = self.select_data("tickets", stats_columns, filters)
+                return compute_ticket_stats(rows)
+            else:
+                st.error(f"Lỗi khi lấy thống kê tickets: {e}")
+                return None
+
+    def search_tickets(
+        self,
+        query,
+        project=None,
+        filters=None,
+        limit=SEARCH_LIMIT,
+        columns=TICKET_VIEW_COLUMNS["list"],
+    ):
+        """
+        Tìm tickets theo nội dung và ghi chú (RPC search_tickets)
+
+        Tìm kiếm toàn văn trên cột search_vector (index GIN,
+        migrations/0007_ticket_search.sql): không phân biệt dấu, khớp tiền tố
+        từng từ, kết quả xếp theo độ liên quan.
+
+        Args:
+            query (str): Chuỗi cần tìm
+            project (str): Project cần lọc (None = tất cả project)
+            filters (dict | TicketFilter): Các filter bổ sung
+            limit (int): Số kết quả tối đa
+            columns (str): Cột cần lấy (mặc định: cột của danh sách)
+
+        Returns:
+            list: Danh sách tickets, liên quan nhất trước
+        """
+        query = (query or "").strip()
+        if not query:
+            return []
+
+        params = {
+            "p_query": query,
+            "p_project": project or None,
+            "p_limit": limit,
+            **TicketFilter.from_dict(filters).rpc_params(),
+        }
+
+        cache_key = self._cache_key(
+            "tickets", project, filters, columns, "search", query, limit
+        )
+        hit, cached = _query_cache.get(cache_key)
+        if hit:
+            self._remember("tickets", cached, columns)
+            return cached
+
+        try:
+            response = self._execute(
+                self.supabase.rpc("search_tickets", params).select(columns)
+            )
+            data = normalize_tickets(response.data if response.data else [])
+
+        except Exception as e:
+            # Chưa tạo hàm RPC -> tìm bằng ilike (phân biệt dấu, không xếp hạng)
+            error_msg = str(e).lower()
+            if self._missing_creator_relation(error_msg, columns):
+                data = self.search_tickets(
+                    query, project, filters, limit, without_creator_column(columns)
+                )
+                self.attach_creator_names(data)
+            elif "search_tickets" in error_msg or "pgrst202" in error_msg:
+                st.warning(
+                    "⚠️ Chưa có hàm search_tickets. Vui lòng chạy python migrate_database.py (migrations/0007_ticket_search.sql)"
+                )
+                data = self._search_tickets_ilike(
+                    query, project, filters, limit, columns
+                )
+                if data is None:
+                    return []
+            else:
+                st.error(f"Lỗi khi tìm kiếm tickets: {e}")
+                return []
+
+        _query_cache.set(cache_key, data)
+        self._remember("tickets", data, columns)
+        return data
+
+    def _search_tickets_ilike(self, query, project, filters, limit, columns):
+        """Tìm tickets bằng ilike trên noi_dung/ghi_chu (dự phòng cho search_tickets)"""
+        # Bỏ các ký tự đặc biệt của cú pháp or_ trong PostgREST
+        pattern = "*" + re.sub(r'[,()"*%\\]', " ", query).strip() + "*"
+        try:
+            request = self.supabase.table("tickets").select(columns)
+            if project:
+                request = request.eq("project", project)
+            request = self._apply_filters(request, filters)
+            request = (
+                request.or_(f"noi_dung.ilike.{pattern},ghi_chu.ilike.{pattern}")
+                .order("ngay_yeu_cau", desc=True)
+                .order("id", desc=True)
+                .limit(limit)
+            )
+            response = self._execute(request)
+            return normalize_tickets(response.data if response.data else [])
+        except Exception as e:
+            st.error(f"Lỗi khi tìm kiếm tickets: {e}")
+            return None
+
+    def select_tickets_changed_since(
+        self, project=None, since=None, columns="*", chunk_size=1000
+    ):
+        """
+        Lấy các tickets có updated_at >= since (đồng bộ delta)
+
+        Dữ liệu được lấy theo từng đoạn chunk_size dòng (giới hạn max-rows của
+        PostgREST), sắp xếp theo updated_at rồi id. Không dùng cache vì mỗi
+        lần gọi có watermark khác nhau.
+
+        Args:
+            project (str): Project cần lọc (None = tất cả project)
+            since (str): Watermark dạng ISO (None = lấy toàn bộ)
+            columns (str): Cột cần lấy, phải có updated_at
+            chunk_size (int): Số dòng mỗi request
+
+        Returns:
+            list: Danh sách tickets đã thay đổi, hoặc None nếu lỗi
+        """
+        rows = []
+        start = 0
+        try:
+            while True:
+                query = self.supabase.table("tickets").select(columns)
+                if project:
+                    query = query.eq("project", project)
+                if since:
+                    query = query.gte("updated_at", since)
+                try:
+                    response = self._execute(
+                        query.order("updated_at")
+                        .order("id")
+                        .range(start, start + chunk_size - 1)
+                    )
+                except Exception as e:
+                    # Chưa có computed column preview -> lấy cột đầy đủ
+                    if "_preview" in str(e).lower() and "_preview" in columns:
+                        changed = self.select_tickets_changed_since(
+                            project, since, columns.replace("_preview", ""), chunk_size
+                        )
+                        return add_ticket_previews(changed) if changed else changed
+                    if self._missing_creator_relation(str(e).lower(), columns):
+                        changed = self.select_tickets_changed_since(
+                            project, since, without_creator_column(columns), chunk_size
+                        )
+                        return self.attach_creator_names(changed)
+                    raise
+
+                chunk = normalize_tickets(response.data or [])
+                rows.extend(chunk)
+                if len(chunk) < chunk_size:
+                    return rows
+                start += chunk_size
+
+        except Exception as e:
+            st.error(f"Lỗi khi đồng bộ tickets: {e}")
+            return None
+
+    def select_ticket_tombstones_since(self, project=None, since=None):
+        """
+        Lấy danh sách tickets đã bị xóa từ sau watermark (bảng ticket_tombstones)
+
+        Args:
+            project (str): Project cần lọc (None = tất cả project)
+            since (str): Watermark dạng ISO (None = lấy toàn bộ)
+
+        Returns:
+            list: Các dòng {ticket_id, project, deleted_at}, hoặc None nếu lỗi
+        """
+        try:
+            query = self.supabase.table("ticket_tombstones").select(
+                "ticket_id, project, deleted_at"
+            )
+            if project:
+                query = query.eq("project", project)
+            if since:
+                query = query.gte("deleted_at", since)
+            response = self._execute(query.order("deleted_at"))
+            return response.data if response.data else []
+        except Exception as e:
+            st.error(f"Lỗi khi đồng bộ tickets đã xóa: {e}")
+            return None
+
+    def select_tickets_by_project(self, project, additional_filters=None, columns="*"):
         """
         Lấy tickets theo project
 
         Args:
             project (str): Tên project
-            additional_filters (dict): Các filter bổ sung
+            additional_filters (dict | TicketFilter): Các filter bổ sung
+            columns (str): Cột cần lấy (mặc định: "*")
 
         Returns:
             list: Danh sách tickets
         """
-        try:
-            query = self.supabase.table("tickets").select("*").eq("project", project)
+        cache_key = self._cache_key("tickets", project, additional_filters, columns)
+        hit, cached = _query_cache.get(cache_key)
+        if hit:
+            self._remember("tickets", cached, columns)
+            return cached
 
-            if additional_filters:
-                for column, value in additional_filters.items():
-                    if value is not None and value != "":
-                        query = query.eq(column, value)
+        try:
+            query = (
+                self.supabase.table("tickets").select(columns).eq("project", project)
+            )
+            query = self._apply_filters(query, additional_filters)
 
-            response = query.execute()
-            return response.data if response.data else []
+            response = self._execute(query)
+            data = normalize_tickets(response.data if response.data else [])
+            _query_cache.set(cache_key, data)
+            self._remember("tickets", data, columns)
+            return data
 
         except Exception as e:
             # Nếu lỗi do thiếu cột project, fallback về select_data thông thường
@@ -284,11 +1107,52 @@ class SupabaseHelper:
                 st.warning(
                     "⚠️ Bảng tickets chưa có cột project. Hiển thị tất cả tickets."
                 )
-                return self.select_data("tickets", "*", additional_filters)
+                return self.select_data("tickets", columns, additional_filters)
             else:
                 st.error(f"Lỗi khi lấy tickets theo project: {e}")
                 return []
 
+    def iter_ticket_pages(
+        self, project=None, filters=None, page_size=EXPORT_PAGE_SIZE, columns="*"
+    ):
+        """
+        Duyệt toàn bộ tickets theo từng trang cố định (dùng cho xuất dữ liệu)
+
+        Mỗi trang là một request lấy tối đa page_size dòng có id lớn hơn id
+        cuối của trang trước (sắp xếp theo id), nên chi phí mỗi trang không
+        tăng theo vị trí và dòng bị xóa giữa chừng không làm lệch các trang
+        sau. Kết quả không đi qua cache truy vấn hay identity map.
+
+        Args:
+            project (str): Project cần lọc (None = tất cả project, dành cho admin)
+            filters (dict | TicketFilter): Các filter bổ sung
+            page_size (int): Số ticket mỗi request
+            columns (str): Cột cần lấy (phải có id)
+
+        Yields:
+            list: Từng trang tickets đã chuẩn hóa
+
+        Raises:
+            Exception: Lỗi từ Supabase (người gọi quyết định cách báo lỗi)
+        """
+        page_size = max(1, int(page_size))
+        last_id = None
+        while True:
+            query = self.supabase.table("tickets").select(columns)
+            if project:
+                query = query.eq("project", project)
+            query = self._apply_filters(query, filters)
+            if last_id is not None:
+                query = query.gt("id", last_id)
+            response = self._execute(query.order("id").limit(page_size))
+
+            data = normalize_tickets(response.data if response.data else [])
+            if data:
+                yield data
+            if len(data) < page_size:
+                return
+            last_id = data[-1]["id"]
+
     def insert_data(self, table_name, data):
         """
         Thêm dữ liệu vào bảng
@@ -298,7 +1162,13 @@ class SupabaseHelper:
             data (dict or list): Dữ liệu cần thêm
         """
         try:
-            response = self.supabase.table(table_name).insert(data).execute()
+            response = self._execute(self.supabase.table(table_name).insert(data))
+            self._after_write(
+                table_name,
+                "insert",
+                response.data,
+                self._affected_projects(response.data),
+            )
             return response.data
         except Exception as e:
             st.error(f"Lỗi khi thêm dữ liệu vào {table_name}: {e}")
@@ -321,7 +1191,10 @@ class SupabaseHelper:
             ticket_data["created_by"] = created_by_user_id
             ticket_data["project"] = project
 
-            response = self.supabase.table("tickets").insert(ticket_data).execute()
+            response = self._execute(
+                self.supabase.table("tickets").insert(ticket_data)
+            )
+            self._after_write("tickets", "insert", response.data, {project})
             return response.data[0] if response.data else None
 
         except Exception as e:
@@ -329,7 +1202,7 @@ class SupabaseHelper:
             error_msg = str(e).lower()
             if "created_by" in error_msg or "project" in error_msg:
                 st.warning(
-                    "⚠️ Bảng tickets chưa được cập nhật với cột created_by và project. Vui lòng chạy script update_tickets_table.sql"
+                    "⚠️ Bảng tickets chưa được cập nhật với cột created_by và project. Vui lòng chạy python migrate_database.py (migrations/0001_update_tickets_table.sql)"
                 )
 
                 # Fallback: insert ticket mà không có created_by và project
@@ -338,9 +1211,10 @@ class SupabaseHelper:
                 fallback_data.pop("project", None)
 
                 try:
-                    response = (
-                        self.supabase.table("tickets").insert(fallback_data).execute()
+                    response = self._execute(
+                        self.supabase.table("tickets").insert(fallback_data)
                     )
+                    self._after_write("tickets", "insert", response.data)
                     return response.data[0] if response.data else None
                 except Exception as fallback_error:
                     st.error(f"Lỗi khi tạo ticket (fallback): {fallback_error}")
@@ -364,7 +1238,13 @@ class SupabaseHelper:
             for column, value in filters.items():
                 query = query.eq(column, value)
 
-            response = query.execute()
+            response = self._execute(query)
+            self._after_write(
+                table_name,
+                "update",
+                response.data,
+                self._affected_projects(response.data, data),
+            )
             return response.data
         except Exception as e:
             st.error(f"Lỗi khi cập nhật dữ liệu trong {table_name}: {e}")
@@ -384,8 +1264,130 @@ class SupabaseHelper:
             for column, value in filters.items():
                 query = query.eq(column, value)
 
-            response = query.execute()
+            response = self._execute(query)
+            self._after_write(
+                table_name,
+                "delete",
+                response.data,
+                self._affected_projects(response.data),
+            )
             return response.data
         except Exception as e:
             st.error(f"Lỗi khi xóa dữ liệu từ {table_name}: {e}")
             return None
+
+    def _run_bulk(
+        self, table_name, operation, items, build_query, chunk_size, on_progress
+    ):
+        """
+        Chạy một thao tác ghi hàng loạt theo từng nhóm chunk_size phần tử
+
+        Nhóm nào lỗi được ghi lại và bỏ qua, các nhóm sau vẫn chạy. Cache và
+        các listener được cập nhật một lần cho mọi dòng đã ghi thành công.
+
+        Args:
+            table_name (str): Tên bảng
+            operation (str): "insert", "update" hoặc "delete"
+            items (list): ID hoặc dòng cần ghi
+            build_query (callable): build_query(chunk) -> query builder
+            chunk_size (int): Số phần tử mỗi request
+            on_progress (callable): on_progress(done, total, failed) sau mỗi nhóm
+
+        Returns:
+            dict: {"rows": các dòng Supabase trả về,
+                   "failed": [{"items": list, "error": str}],
+                   "total": số phần tử}
+        """
+        items = list(items or [])
+        chunk_size = max(1, int(chunk_size))
+        chunks = [items[i : i + chunk_size] for i in range(0, len(items), chunk_size)]
+        rows = []
+        failed = []
+
+        for index, chunk in enumerate(chunks, start=1):
+            try:
+                response = self._execute(build_query(chunk))
+                rows.extend(response.data or [])
+            except Exception as e:
+                failed.append({"items": chunk, "error": str(e)})
+            if on_progress:
+                on_progress(index, len(chunks), len(failed))
+
+        if rows:
+            self._after_write(
+                table_name, operation, rows, self._affected_projects(rows)
+            )
+        return {"rows": rows, "failed": failed, "total": len(items)}
+
+    def bulk_insert(
+        self, table_name, rows, chunk_size=BULK_CHUNK_SIZE, on_progress=None
+    ):
+        """
+        Thêm nhiều dòng, mỗi request chèn một danh sách chunk_size dòng
+
+        Args:
+            table_name (str): Tên bảng
+            rows (list): Các dòng cần thêm
+            chunk_size (int): Số dòng mỗi request
+            on_progress (callable): on_progress(done, total, failed) sau mỗi nhóm
+
+        Returns:
+            dict: {"rows": list, "failed": list, "total": int} (xem _run_bulk)
+        """
+        return self._run_bulk(
+            table_name,
+            "insert",
+            rows,
+            lambda chunk: self.supabase.table(table_name).insert(chunk),
+            chunk_size,
+            on_progress,
+        )
+
+    def bulk_update(
+        self, table_name, ids, data, chunk_size=BULK_CHUNK_SIZE, on_progress=None
+    ):
+        """
+        Cập nhật cùng dữ liệu cho nhiều dòng bằng filter in_("id", [...])
+
+        Args:
+            table_name (str): Tên bảng
+            ids (list): ID các dòng cần cập nhật
+            data (dict): Dữ liệu cần cập nhật
+            chunk_size (int): Số ID mỗi request
+            on_progress (callable): on_progress(done, total, failed) sau mỗi nhóm
+
+        Returns:
+            dict: {"rows": list, "failed": list, "total": int} (xem _run_bulk)
+        """
+        return self._run_bulk(
+            table_name,
+            "update",
+            ids,
+            lambda chunk: self.supabase.table(table_name).update(data).in_("id", chunk),
+            chunk_size,
+            on_progress,
+        )
+
+    def bulk_delete(
+        self, table_name, ids, chunk_size=BULK_CHUNK_SIZE, on_progress=None
+    ):
+        """
+        Xóa nhiều dòng bằng filter in_("id", [...])
+
+        Args:
+            table_name (str): Tên bảng
+            ids (list): ID các dòng cần xóa
+            chunk_size (int): Số ID mỗi request
+            on_progress (callable): on_progress(done, total, failed) sau mỗi nhóm
+
+        Returns:
+            dict: {"rows": list, "failed": list, "total": int} (xem _run_bulk)
+        """
+        return self._run_bulk(
+            table_name,
+            "delete",
+            ids,
+            lambda chunk: self.supabase.table(table_name).delete().in_("id", chunk),
+            chunk_size,
+            on_progress,
+        )
@@ -0,0 +1,144 @@
+"""
+Identity map theo session: giữ các dòng đã tải, đánh khóa theo (bảng, id)
+
+Mỗi dòng được ghi nhận khi tải danh sách (thường chỉ một số cột, có bản
+preview) hoặc tải đầy đủ (select "*", response của thao tác ghi). Dialog sửa/
+xóa lấy dòng từ đây thay vì hỏi lại Supabase, trừ khi dòng chưa đủ cột hoặc đã
+quá hạn.
+
+Map không dùng chung giữa các session (lưu trong st.session_state) nên không
+cần khóa; dữ liệu chỉ đọc, được cập nhật từ response của các thao tác ghi.
+"""
+
+import os
+import time
+from collections import OrderedDict
+
+# Thời gian một dòng được coi là còn mới (giây), mặc định bằng TTL của cache
+IDENTITY_MAP_TTL = float(
+    os.getenv("IDENTITY_MAP_TTL", os.getenv("QUERY_CACHE_TTL", "60"))
+)
+
+# Số dòng tối đa giữ trong một session (loại dòng ít dùng nhất)
+IDENTITY_MAP_MAXSIZE = int(os.getenv("IDENTITY_MAP_MAXSIZE", "2000"))
+
+
+class IdentityMap:
+    def __init__(self, ttl=IDENTITY_MAP_TTL, maxsize=IDENTITY_MAP_MAXSIZE):
+        """
+        Args:
+            ttl (float): Thời gian một dòng còn mới (giây)
+            maxsize (int): Số dòng tối đa
+        """
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def remember(self, table_name, rows, columns="*"):
+        """
+        Ghi nhận các dòng vừa tải hoặc vừa ghi
+
+        Dòng tải đầy đủ (columns="*") thay thế dòng cũ. Dòng tải một phần được
+        gộp vào dòng cũ; các cột không được tải lại có thể đã đổi trên server
+        (kể cả khi các cột chung không đổi), nên dòng bị đánh dấu chưa đầy đủ,
+        trừ khi mọi cột được tải lại hoặc updated_at trùng với dòng cũ.
+
+        Args:
+            table_name (str): Tên bảng
+            rows (list): Các dòng (phải có id)
+            columns (str): Cột đã select ("*" = đầy đủ)
+        """
+        complete = columns.strip() == "*"
+        now = time.monotonic()
+        for row in rows or []:
+            if not isinstance(row, dict) or row.get("id") is None:
+                continue
+            key = (table_name, row["id"])
+            entry = self._entries.get(key)
+
+            if complete or entry is None:
+                self._entries[key] = {
+                    "row": dict(row),
+                    "complete": complete,
+                    "loaded_at": now,
+                }
+            else:
+                old_row = entry["row"]
+                refreshed = all(column in row for column in old_row) or (
+                    row.get("updated_at") is not None
+                    and row.get("updated_at") == old_row.get("updated_at")
+                )
+                entry["row"] = {**old_row, **row}
+                if refreshed:
+                    entry["loaded_at"] = now
+                else:
+                    entry["complete"] = False
+            self._entries.move_to_end(key)
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def get(self, table_name, row_id, required=None):
+        """
+        Lấy một dòng đã tải
+
+        Args:
+            table_name (str): Tên bảng
+            row_id: ID của dòng
+            required (iterable): Các cột cần có (None = cần dòng đầy đủ)
+
+        Returns:
+            dict: Bản sao của dòng, hoặc None nếu chưa có/chưa đủ cột/quá hạn
+        """
+        entry = self._entries.get((table_name, row_id))
+        if entry is not None and time.monotonic() - entry["loaded_at"] > self.ttl:
+            del self._entries[(table_name, row_id)]
+            entry = None
+
+        if entry is not None:
+            if required is None:
+                usable = entry["complete"]
+            else:
+                usable = all(column in entry["row"] for column in required)
+            if usable:
+                self._entries.move_to_end((table_name, row_id))
+                self.hits += 1
+                return dict(entry["row"])
+
+        self.misses += 1
+        return None
+
+    def forget(self, table_name, row_ids):
+        """
+        Bỏ các dòng (sau khi xóa)
+
+        Args:
+            table_name (str): Tên bảng
+            row_ids (iterable): ID các dòng
+        """
+        for row_id in row_ids or []:
+            self._entries.pop((table_name, row_id), None)
+
+    def clear(self, table_name=None):
+        """
+        Xóa toàn bộ map hoặc các dòng của một bảng
+
+        Args:
+            table_name (str): Tên bảng (None = tất cả)
+        """
+        if table_name is None:
+            self._entries.clear()
+            return
+        for key in [key for key in self._entries if key[0] == table_name]:
+            del self._entries[key]
+
+    def stats(self):
+        """
+        Lấy bộ đếm của map
+
+        Returns:
+            dict: hits, misses, size
+        """
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
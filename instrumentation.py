@@ -0,0 +1,417 @@
+"""
+Đo hiệu năng từng request tới Supabase
+
+Mọi request của SupabaseHelper/AsyncSupabaseHelper đều đi qua _execute, nơi
+ghi lại một bản ghi cho mỗi lần gọi:
+
+    {"ts", "method", "table", "duration_ms", "rows", "bytes", "error",
+     "error_code", "error_message"}
+
+trong đó method là method của helper đã gửi request, table là bảng hoặc
+"rpc/<tên hàm>", bytes là kích thước JSON của dữ liệu trả về (ước tính phía
+client từ tối đa SIZE_SAMPLE_ROWS dòng, vì response của postgrest không giữ
+lại HTTP response) và error là tên lớp exception (None nếu thành công).
+
+Các bản ghi gần nhất được giữ trong bộ nhớ của process (tab "Hiệu năng" của
+admin tính p50/p95/p99 từ đây) và có thể ghi thêm ra:
+    - file JSON lines xoay vòng theo kích thước (SUPABASE_METRICS_LOG)
+    - file text của Prometheus cho node_exporter textfile collector
+      (SUPABASE_METRICS_PROM_FILE)
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import math
+import os
+import threading
+import time
+from collections import deque
+
+# Biên các bucket thời gian (ms) cho histogram, dùng chung cho tab Hiệu năng
+# và Prometheus (le tính bằng giây)
+DURATION_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Độ dài tối đa của thông báo lỗi được ghi lại
+ERROR_MESSAGE_MAX_LENGTH = 300
+
+# Số dòng được encode để ước tính kích thước response (lấy đều trong kết quả)
+SIZE_SAMPLE_ROWS = 16
+
+
+def query_target(query):
+    """
+    Lấy bảng hoặc hàm RPC của một query builder
+
+    Args:
+        query: Query builder/RPC của Supabase (hoặc client giả lập có .path)
+
+    Returns:
+        str: Tên bảng (vd. "tickets") hoặc "rpc/<tên hàm>"
+    """
+    request = getattr(query, "request", query)
+    path = str(getattr(request, "path", "") or "")
+    return path.rsplit("/rest/v1/", 1)[-1].strip("/") or "?"
+
+
+def response_size(data):
+    """
+    Số dòng và kích thước JSON (bytes) của dữ liệu Supabase trả về
+
+    Kết quả nhiều hơn SIZE_SAMPLE_ROWS dòng chỉ encode các dòng mẫu lấy đều
+    rồi nhân theo số dòng, để việc đo không tốn thời gian theo cỡ kết quả.
+
+    Returns:
+        tuple: (rows, bytes)
+    """
+    if data is None:
+        return 0, 0
+    rows = len(data) if isinstance(data, list) else 1
+    if rows <= SIZE_SAMPLE_ROWS:
+        return rows, _json_size(data)
+
+    step = rows / SIZE_SAMPLE_ROWS
+    sample = [data[int(i * step)] for i in range(SIZE_SAMPLE_ROWS)]
+    # Dấu phẩy giữa các dòng và cặp ngoặc [] của mảng
+    per_row = (_json_size(sample) - 2) / SIZE_SAMPLE_ROWS
+    return rows, round(per_row * rows) + 2
+
+
+def _json_size(data):
+    """Kích thước JSON (bytes, UTF-8) của dữ liệu"""
+    return len(json.dumps(data, ensure_ascii=False, default=str).encode("utf-8"))
+
+
+def percentile(sorted_values, q):
+    """
+    Phân vị theo nearest-rank
+
+    Args:
+        sorted_values (list): Dãy số đã sắp xếp tăng dần
+        q (float): Phân vị trong khoảng [0, 100]
+
+    Returns:
+        float: Giá trị phân vị (None nếu dãy rỗng)
+    """
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def bucket_counts(durations_ms, buckets=DURATION_BUCKETS_MS):
+    """
+    Đếm số request trong từng bucket thời gian (không cộng dồn)
+
+    Returns:
+        list: [(nhãn bucket, số request)], bucket cuối là "> biên lớn nhất"
+    """
+    counts = [0] * (len(buckets) + 1)
+    for duration in durations_ms:
+        index = len(buckets)
+        for i, bound in enumerate(buckets):
+            if duration <= bound:
+                index = i
+                break
+        counts[index] += 1
+    labels = [f"≤ {bound} ms" for bound in buckets] + [f"> {buckets[-1]} ms"]
+    return list(zip(labels, counts))
+
+
+def _escape_label(value):
+    """Escape giá trị label của Prometheus (\\, " và xuống dòng)"""
+    return (
+        str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    )
+
+
+class JsonLinesSink:
+    def __init__(self, path, max_bytes=10_000_000, backups=5):
+        """
+        Ghi mỗi bản ghi thành một dòng JSON, xoay vòng file theo kích thước
+
+        Args:
+            path (str): Đường dẫn file log
+            max_bytes (int): Kích thước tối đa của một file trước khi xoay vòng
+            backups (int): Số file cũ được giữ lại (path.1, path.2, ...)
+        """
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8"
+        )
+        self._handler.setFormatter(logging.Formatter("%(message)s"))
+        self._logger = logging.getLogger(f"supabase_metrics.{path}")
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        self._logger.addHandler(self._handler)
+
+    def write(self, record):
+        self._logger.info(json.dumps(record, ensure_ascii=False))
+
+    def flush(self):
+        self._handler.flush()
+
+
+class PrometheusTextfileSink:
+    def __init__(self, path, interval=15.0, buckets=DURATION_BUCKETS_MS):
+        """
+        Cộng dồn số liệu và ghi ra file định dạng text của Prometheus
+
+        File được ghi lại toàn bộ (ghi file tạm rồi đổi tên) tối đa mỗi
+        interval giây và khi process kết thúc.
+
+        Args:
+            path (str): Đường dẫn file .prom
+            interval (float): Khoảng thời gian tối thiểu giữa hai lần ghi (giây)
+            buckets (tuple): Biên các bucket thời gian (ms)
+        """
+        self.path = path
+        self.interval = interval
+        self.buckets = buckets
+        self._series = {}
+        self._errors = {}
+        self._last_write = 0.0
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        key = (record["method"], record["table"])
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {
+                    "buckets": [0] * len(self.buckets),
+                    "sum": 0.0,
+                    "count": 0,
+                    "rows": 0,
+                    "bytes": 0,
+                }
+            for i, bound in enumerate(self.buckets):
+                if record["duration_ms"] <= bound:
+                    series["buckets"][i] += 1
+            series["sum"] += record["duration_ms"] / 1000
+            series["count"] += 1
+            series["rows"] += record["rows"]
+            series["bytes"] += record["bytes"]
+            if record["error"]:
+                error_key = key + (record["error"],)
+                self._errors[error_key] = self._errors.get(error_key, 0) + 1
+            due = time.monotonic() - self._last_write >= self.interval
+        if due:
+            self.flush()
+
+    @staticmethod
+    def _labels(method, table, **extra):
+        labels = {"method": method, "table": table, **extra}
+        return ",".join(
+            f'{name}="{_escape_label(value)}"' for name, value in labels.items()
+        )
+
+    def render(self):
+        """
+        Nội dung file Prometheus hiện tại
+
+        Returns:
+            str: Các metric supabase_request_* dạng text exposition
+        """
+        with self._lock:
+            series = {
+                key: {**value, "buckets": list(value["buckets"])}
+                for key, value in self._series.items()
+            }
+            errors = dict(self._errors)
+
+        histogram = "supabase_request_duration_seconds"
+        lines = [
+            f"# HELP {histogram} Thời gian request tới Supabase",
+            f"# TYPE {histogram} histogram",
+        ]
+        for (method, table), value in sorted(series.items()):
+            for bound, count in zip(self.buckets, value["buckets"]):
+                labels = self._labels(method, table, le=bound / 1000)
+                lines.append(f"{histogram}_bucket{{{labels}}} {count}")
+            labels = self._labels(method, table, le="+Inf")
+            lines.append(f"{histogram}_bucket{{{labels}}} {value['count']}")
+            labels = self._labels(method, table)
+            lines.append(f"{histogram}_sum{{{labels}}} {value['sum']}")
+            lines.append(f"{histogram}_count{{{labels}}} {value['count']}")
+
+        for name, field, description in (
+            ("supabase_response_rows_total", "rows", "Số dòng Supabase trả về"),
+            ("supabase_response_bytes_total", "bytes", "Kích thước JSON trả về"),
+        ):
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} counter")
+            for (method, table), value in sorted(series.items()):
+                lines.append(f"{name}{{{self._labels(method, table)}}} {value[field]}")
+
+        lines.append("# HELP supabase_request_errors_total Số request lỗi theo lớp lỗi")
+        lines.append("# TYPE supabase_request_errors_total counter")
+        for (method, table, error), count in sorted(errors.items()):
+            labels = self._labels(method, table, error=error)
+            lines.append(f"supabase_request_errors_total{{{labels}}} {count}")
+        return "\n".join(lines) + "\n"
+
+    def flush(self):
+        content = self.render()
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            file.write(content)
+        os.replace(temp_path, self.path)
+        with self._lock:
+            self._last_write = time.monotonic()
+
+
+class Instrumentation:
+    def __init__(self, maxsize=5000, sinks=(), enabled=True):
+        """
+        Args:
+            maxsize (int): Số bản ghi gần nhất giữ trong bộ nhớ
+            sinks (iterable): Các nơi ghi thêm (JsonLinesSink, PrometheusTextfileSink)
+            enabled (bool): False = không ghi gì (bỏ qua cả việc đo kích thước)
+        """
+        self.enabled = enabled
+        self.sinks = list(sinks)
+        self._records = deque(maxlen=maxsize)
+        self._lock = threading.Lock()
+        self.total = 0
+
+    def record(self, method, table, duration_ms, data=None, error=None):
+        """
+        Ghi lại một request
+
+        Args:
+            method (str): Method của helper đã gửi request
+            table (str): Bảng hoặc "rpc/<tên hàm>"
+            duration_ms (float): Thời gian request (ms)
+            data: response.data (None nếu lỗi)
+            error (Exception): Lỗi của request (nếu có)
+
+        Returns:
+            dict: Bản ghi đã lưu (None nếu đang tắt)
+        """
+        if not self.enabled:
+            return None
+        rows, size = response_size(data)
+        record = {
+            "ts": round(time.time(), 3),
+            "method": method,
+            "table": table,
+            "duration_ms": round(duration_ms, 3),
+            "rows": rows,
+            "bytes": size,
+            "error": type(error).__name__ if error is not None else None,
+            "error_code": getattr(error, "code", None) if error is not None else None,
+            "error_message": (
+                str(error)[:ERROR_MESSAGE_MAX_LENGTH] if error is not None else None
+            ),
+        }
+        with self._lock:
+            self._records.append(record)
+            self.total += 1
+        for sink in self.sinks:
+            try:
+                sink.write(record)
+            except OSError:
+                # Lỗi ghi log không được làm hỏng request của người dùng
+                pass
+        return record
+
+    def records(self):
+        """Bản sao các bản ghi đang giữ trong bộ nhớ (cũ trước, mới sau)"""
+        with self._lock:
+            return list(self._records)
+
+    def clear(self):
+        """Xóa các bản ghi trong bộ nhớ (không ảnh hưởng file log)"""
+        with self._lock:
+            self._records.clear()
+
+    def flush(self):
+        """Ghi ngay dữ liệu đang chờ của các sink"""
+        for sink in self.sinks:
+            try:
+                sink.flush()
+            except OSError:
+                pass
+
+    def summary(self, records=None):
+        """
+        Tổng hợp theo (method, table)
+
+        Args:
+            records (list): Các bản ghi cần tổng hợp (mặc định: toàn bộ trong bộ nhớ)
+
+        Returns:
+            list: Các dict {method, table, count, errors, p50_ms, p95_ms, p99_ms,
+                max_ms, avg_rows, avg_bytes, error_classes}, chậm nhất (p95) trước
+        """
+        groups = {}
+        for record in self.records() if records is None else records:
+            groups.setdefault((record["method"], record["table"]), []).append(record)
+
+        rows = []
+        for (method, table), items in groups.items():
+            durations = sorted(item["duration_ms"] for item in items)
+            error_classes = {}
+            for item in items:
+                error = item["error"]
+                if error:
+                    error_classes[error] = error_classes.get(error, 0) + 1
+            rows.append(
+                {
+                    "method": method,
+                    "table": table,
+                    "count": len(items),
+                    "errors": sum(error_classes.values()),
+                    "p50_ms": percentile(durations, 50),
+                    "p95_ms": percentile(durations, 95),
+                    "p99_ms": percentile(durations, 99),
+                    "max_ms": durations[-1],
+                    "avg_rows": sum(item["rows"] for item in items) / len(items),
+                    "avg_bytes": sum(item["bytes"] for item in items) / len(items),
+                    "error_classes": error_classes,
+                }
+            )
+        rows.sort(key=lambda row: row["p95_ms"], reverse=True)
+        return rows
+
+
+def create_instrumentation():
+    """
+    Tạo Instrumentation theo biến môi trường
+
+    SUPABASE_METRICS (true/false), SUPABASE_METRICS_BUFFER, SUPABASE_METRICS_LOG
+    (+ _MAX_BYTES, _BACKUPS), SUPABASE_METRICS_PROM_FILE (+ _INTERVAL)
+
+    Returns:
+        Instrumentation: Đã đăng ký flush các sink khi process kết thúc
+    """
+    enabled = os.getenv("SUPABASE_METRICS", "true").lower() in ("1", "true", "yes")
+    sinks = []
+    if enabled and os.getenv("SUPABASE_METRICS_LOG"):
+        sinks.append(
+            JsonLinesSink(
+                os.getenv("SUPABASE_METRICS_LOG"),
+                max_bytes=int(os.getenv("SUPABASE_METRICS_LOG_MAX_BYTES", "10000000")),
+                backups=int(os.getenv("SUPABASE_METRICS_LOG_BACKUPS", "5")),
+            )
+        )
+    if enabled and os.getenv("SUPABASE_METRICS_PROM_FILE"):
+        sinks.append(
+            PrometheusTextfileSink(
+                os.getenv("SUPABASE_METRICS_PROM_FILE"),
+                interval=float(os.getenv("SUPABASE_METRICS_PROM_INTERVAL", "15")),
+            )
+        )
+    instrumentation = Instrumentation(
+        maxsize=int(os.getenv("SUPABASE_METRICS_BUFFER", "5000")),
+        sinks=sinks,
+        enabled=enabled,
+    )
+    if sinks:
+        atexit.register(instrumentation.flush)
+    return instrumentation
+
@@ -1,148 +1,567 @@
 #!/usr/bin/env python3
 """
-Script để migrate database - thêm các cột cần thiết vào bảng tickets
-Sử dụng: python migrate_database.py
+Script migration database theo phiên bản
+
+Các file migrations/NNNN_tên.sql được áp dụng theo thứ tự số, mỗi file trong
+một transaction. Phiên bản đã áp dụng (kèm checksum nội dung) được ghi vào
+bảng schema_migrations nên mỗi file chỉ chạy một lần; file đã áp dụng mà bị
+sửa sẽ được báo lại.
+
+PostgREST không chạy được DDL nên việc áp dụng migration cần kết nối Postgres
+trực tiếp: biến môi trường DATABASE_URL (Supabase → Settings → Database →
+Connection string) và thư viện psycopg (pip install "psycopg[binary]").
+Chế độ check vẫn chạy được chỉ với SUPABASE_URL/SUPABASE_ANON_KEY (đọc bảng
+schema_migrations qua PostgREST).
+
+Sử dụng:
+    python migrate_database.py            # áp dụng các migration chưa chạy
+    python migrate_database.py check      # báo migration chưa chạy/bị sửa
+    python migrate_database.py explain    # kế hoạch truy vấn của các truy vấn chính
 """
 
-from database import SupabaseHelper
+import argparse
+import hashlib
+import os
+import re
 import sys
+import time
 
+from dotenv import load_dotenv
 
-def migrate_database():
-    """Migrate database - thêm cột created_by và project vào bảng tickets"""
-    print("🔄 Database Migration - Cập nhật bảng tickets")
-    print("=" * 50)
+load_dotenv()
 
-    try:
-        # Khởi tạo database helper
-        db = SupabaseHelper()
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
 
-        print("📋 Đang kiểm tra cấu trúc bảng hiện tại...")
+# Tên file migration: 0001_update_tickets_table.sql
+MIGRATION_FILE_PATTERN = re.compile(r"^(\d{4})_(\w+)\.sql$")
 
-        # Kiểm tra xem các cột đã tồn tại chưa
-        try:
-            # Thử select với cột created_by và project
-            test_result = (
-                db.supabase.table("tickets")
-                .select("id, created_by, project")
-                .limit(1)
-                .execute()
-            )
-            print("✅ Bảng tickets đã có đầy đủ cột created_by và project!")
-            return True
-        except Exception as e:
-            print("🔄 Cần cập nhật cấu trúc bảng...")
+SCHEMA_MIGRATIONS_SQL = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    checksum TEXT NOT NULL,
+    applied_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    duration_ms INTEGER
+);
 
-        # Thực hiện migration
-        migration_sql = """
-        -- Thêm cột created_by (references users.id)
-        ALTER TABLE tickets 
-        ADD COLUMN IF NOT EXISTS created_by INTEGER REFERENCES users(id) ON DELETE SET NULL;
+-- Chỉ cho đọc qua PostgREST (python migrate_database.py check dùng anon key)
+REVOKE ALL ON schema_migrations FROM anon, authenticated;
+GRANT SELECT ON schema_migrations TO anon, authenticated;
+"""
 
-        -- Thêm cột project 
-        ALTER TABLE tickets 
-        ADD COLUMN IF NOT EXISTS project TEXT;
+# Khóa advisory để hai lần chạy migration cùng lúc không chồng lên nhau
+MIGRATION_LOCK_SQL = "SELECT pg_advisory_lock(hashtext('schema_migrations'))"
+MIGRATION_UNLOCK_SQL = "SELECT pg_advisory_unlock(hashtext('schema_migrations'))"
+
+# Các truy vấn chính của ứng dụng (viết lại bằng SQL giống truy vấn PostgREST
+# mà database.py gửi) để xem kế hoạch truy vấn: (tên, mô tả, SQL)
+QUERY_PLANS = [
+    (
+        "ticket_list",
+        "Danh sách tickets của một project (trang đầu)",
+        """
+        SELECT * FROM tickets
+        WHERE project = %(project)s
+        ORDER BY ngay_yeu_cau DESC NULLS LAST, id DESC
+        LIMIT %(page_size)s
+        """,
+    ),
+    (
+        "ticket_list_count",
+        "Đếm tickets của project (count=exact của danh sách)",
+        "SELECT COUNT(*) FROM tickets WHERE project = %(project)s",
+    ),
+    (
+        "ticket_list_status",
+        "Danh sách lọc theo trạng thái",
         """
+        SELECT * FROM tickets
+        WHERE project = %(project)s AND trang_thai = %(status)s
+        ORDER BY ngay_yeu_cau DESC NULLS LAST, id DESC
+        LIMIT %(page_size)s
+        """,
+    ),
+    (
+        "ticket_list_admin",
+        "Danh sách tất cả project (admin)",
+        """
+        SELECT * FROM tickets
+        ORDER BY ngay_yeu_cau DESC NULLS LAST, id DESC
+        LIMIT %(page_size)s
+        """,
+    ),
+    (
+        "ticket_list_overdue",
+        "Tickets quá hạn của project",
+        """
+        SELECT * FROM filtered_tickets(p_project => %(project)s, p_overdue => TRUE)
+        ORDER BY thoi_han_mong_muon, id
+        LIMIT %(page_size)s
+        """,
+    ),
+    (
+        "ticket_stats",
+        "Phần lọc + đếm theo trạng thái của get_ticket_stats",
+        """
+        SELECT trang_thai, COUNT(*)
+        FROM filtered_tickets(p_project => %(project)s)
+        GROUP BY trang_thai
+        """,
+    ),
+    (
+        "ticket_search",
+        "Tìm kiếm toàn văn (search_tickets)",
+        "SELECT id FROM search_tickets(%(search)s, %(project)s)",
+    ),
+    (
+        "ticket_sync",
+        "Đồng bộ delta: tickets thay đổi trong 1 giờ qua",
+        """
+        SELECT * FROM tickets
+        WHERE project = %(project)s AND updated_at >= NOW() - INTERVAL '1 hour'
+        ORDER BY updated_at, id
+        LIMIT 1000
+        """,
+    ),
+    (
+        "ticket_tombstones",
+        "Đồng bộ delta: tickets đã xóa trong 1 giờ qua",
+        """
+        SELECT ticket_id, project, deleted_at FROM ticket_tombstones
+        WHERE project = %(project)s AND deleted_at >= NOW() - INTERVAL '1 hour'
+        ORDER BY deleted_at
+        """,
+    ),
+]
 
-        print("🔨 Đang thực hiện migration...")
+_SEQ_SCAN_PATTERN = re.compile(r"Seq Scan on (\w+)")
+_INDEX_SCAN_PATTERN = re.compile(
+    r"(?:Index Only Scan|Index Scan|Bitmap Index Scan)(?: Backward)? (?:using|on) (\w+)"
+)
+_COST_PATTERN = re.compile(r"cost=[\d.]+\.\.([\d.]+)")
+_EXECUTION_TIME_PATTERN = re.compile(r"Execution Time: ([\d.]+) ms")
 
-        # Thực hiện từng câu lệnh
-        try:
-            # Thêm cột created_by
-            db.supabase.rpc(
-                "exec_sql",
-                {
-                    "sql": "ALTER TABLE tickets ADD COLUMN IF NOT EXISTS created_by INTEGER REFERENCES users(id) ON DELETE SET NULL;"
-                },
-            ).execute()
-            print("✅ Đã thêm cột created_by")
-        except Exception as e:
-            if "already exists" not in str(e).lower():
-                print(f"⚠️ Lỗi khi thêm cột created_by: {e}")
 
-        try:
-            # Thêm cột project
-            db.supabase.rpc(
-                "exec_sql",
-                {"sql": "ALTER TABLE tickets ADD COLUMN IF NOT EXISTS project TEXT;"},
-            ).execute()
-            print("✅ Đã thêm cột project")
-        except Exception as e:
-            if "already exists" not in str(e).lower():
-                print(f"⚠️ Lỗi khi thêm cột project: {e}")
+def load_migrations(directory=MIGRATIONS_DIR):
+    """
+    Đọc các file migration theo thứ tự phiên bản
 
-        # Cập nhật project cho tickets hiện tại
-        try:
-            result = (
-                db.supabase.table("tickets")
-                .update({"project": "DEFAULT_PROJECT"})
-                .is_("project", "null")
-                .execute()
+    Args:
+        directory (str): Thư mục chứa các file NNNN_tên.sql
+
+    Returns:
+        list: Các dict {version, name, path, sql, checksum}
+
+    Raises:
+        ValueError: Hai file trùng số phiên bản
+    """
+    migrations = {}
+    for filename in sorted(os.listdir(directory)):
+        match = MIGRATION_FILE_PATTERN.match(filename)
+        if not match:
+            continue
+        version, name = match.groups()
+        if version in migrations:
+            raise ValueError(
+                f"Trùng phiên bản migration {version}: "
+                f"{migrations[version]['path']} và {filename}"
             )
-            if result.data:
-                print(f"✅ Đã cập nhật project cho {len(result.data)} tickets hiện tại")
-        except Exception as e:
-            print(f"⚠️ Lỗi khi cập nhật project: {e}")
+        path = os.path.join(directory, filename)
+        with open(path, encoding="utf-8") as file:
+            sql = file.read()
+        migrations[version] = {
+            "version": version,
+            "name": name,
+            "path": path,
+            "sql": sql,
+            # Bỏ khác biệt xuống dòng Windows/Unix khi so checksum
+            "checksum": hashlib.sha256(
+                sql.replace("\r\n", "\n").encode("utf-8")
+            ).hexdigest(),
+        }
+    return [migrations[version] for version in sorted(migrations)]
 
-        print("\n✅ Migration hoàn thành!")
-        print("🎉 Bạn có thể sử dụng đầy đủ tính năng quản lý project và user!")
 
-        return True
+def compare_migrations(migrations, applied):
+    """
+    So sánh file migration với các phiên bản đã áp dụng
 
-    except Exception as e:
-        print(f"❌ Lỗi migration: {e}")
-        print("\n💡 Hướng dẫn thay thế:")
-        print("1. Vào Supabase Dashboard")
-        print("2. Mở SQL Editor")
-        print("3. Chạy nội dung file update_tickets_table.sql")
-        return False
+    Args:
+        migrations (list): Kết quả của load_migrations()
+        applied (dict): version -> checksum đã ghi trong schema_migrations
+
+    Returns:
+        tuple: (chưa áp dụng, đã áp dụng nhưng file bị sửa, phiên bản không có file)
+    """
+    pending = [m for m in migrations if m["version"] not in applied]
+    modified = [
+        m
+        for m in migrations
+        if m["version"] in applied and applied[m["version"]] != m["checksum"]
+    ]
+    known = {m["version"] for m in migrations}
+    unknown = sorted(version for version in applied if version not in known)
+    return pending, modified, unknown
 
 
-def check_database_structure():
-    """Kiểm tra cấu trúc database"""
+def connect(database_url=None):
+    """
+    Mở kết nối Postgres trực tiếp (cần psycopg)
+
+    Args:
+        database_url (str): Connection string (mặc định: biến môi trường DATABASE_URL)
+
+    Returns:
+        psycopg.Connection: Kết nối ở chế độ autocommit
+
+    Raises:
+        RuntimeError: Chưa cấu hình DATABASE_URL, chưa cài psycopg hoặc không
+            kết nối được (sai connection string, máy chủ không truy cập được)
+    """
+    database_url = database_url or os.getenv("DATABASE_URL")
+    if not database_url:
+        raise RuntimeError(
+            "Chưa cấu hình DATABASE_URL (Supabase → Settings → Database → "
+            "Connection string)"
+        )
+    try:
+        import psycopg
+    except ImportError as e:
+        raise RuntimeError(
+            'Cần cài psycopg để chạy migration (pip install "psycopg[binary]")'
+        ) from e
+
+    # ClientCursor: gửi tham số dạng literal để chạy được nhiều câu lệnh trong
+    # một file và để EXPLAIN thấy đúng giá trị; không dùng prepared statement
+    # để chạy được qua connection pooler của Supabase
     try:
-        db = SupabaseHelper()
+        return psycopg.connect(
+            database_url,
+            autocommit=True,
+            prepare_threshold=None,
+            cursor_factory=psycopg.ClientCursor,
+        )
+    except psycopg.Error as e:
+        raise RuntimeError(
+            f"Không kết nối được Postgres qua DATABASE_URL: {str(e).strip()}"
+        ) from e
+
+
+def fetch_applied(conn):
+    """
+    Lấy các phiên bản đã áp dụng từ schema_migrations (qua kết nối Postgres)
+
+    Returns:
+        dict: version -> checksum
+    """
+    rows = conn.execute("SELECT version, checksum FROM schema_migrations").fetchall()
+    return {version: checksum for version, checksum in rows}
+
+
+def fetch_applied_rest():
+    """
+    Lấy các phiên bản đã áp dụng qua PostgREST (chỉ cần anon key)
+
+    Dùng client Supabase trực tiếp (không qua SupabaseHelper, vốn báo lỗi bằng
+    st.error/st.stop của Streamlit).
+
+    Returns:
+        dict: version -> checksum ({} nếu chưa có bảng schema_migrations),
+            hoặc None nếu chưa cấu hình Supabase
+    """
+    url = os.getenv("SUPABASE_URL")
+    key = os.getenv("SUPABASE_ANON_KEY")
+    if not url or not key:
+        return None
+    try:
+        from supabase import create_client
+
+        response = (
+            create_client(url, key)
+            .table("schema_migrations")
+            .select("version, checksum")
+            .execute()
+        )
+    except Exception as e:
+        print(f"⚠️ Không đọc được bảng schema_migrations: {e}")
+        return {}
+    return {row["version"]: row["checksum"] for row in response.data or []}
 
-        print("🔍 Kiểm tra cấu trúc database...")
 
-        # Kiểm tra bảng users
+def _print_differences(pending, modified, unknown):
+    for migration in modified:
+        print(
+            f"⚠️ {migration['version']}_{migration['name']}.sql đã áp dụng nhưng "
+            "nội dung file đã bị sửa (hãy tạo migration mới thay vì sửa file cũ)"
+        )
+    for version in unknown:
+        print(f"⚠️ Phiên bản {version} có trong database nhưng không có file")
+    for migration in pending:
+        print(f"⏳ Chưa áp dụng: {migration['version']}_{migration['name']}.sql")
+
+
+def migrate_database(database_url=None, directory=MIGRATIONS_DIR):
+    """
+    Áp dụng các migration chưa chạy theo thứ tự
+
+    Args:
+        database_url (str): Connection string (mặc định: DATABASE_URL)
+        directory (str): Thư mục migration
+
+    Returns:
+        bool: True nếu database đã ở phiên bản mới nhất
+    """
+    print("🔄 Database Migration")
+    print("=" * 50)
+
+    try:
+        migrations = load_migrations(directory)
+        conn = connect(database_url)
+    except (RuntimeError, ValueError) as e:
+        print(f"❌ {e}")
+        return False
+
+    with conn:
         try:
-            users = (
-                db.supabase.table("users")
-                .select("id, username, full_name, project, is_admin")
-                .limit(1)
-                .execute()
-            )
-            print("✅ Bảng users: OK")
+            conn.execute(SCHEMA_MIGRATIONS_SQL)
+            conn.execute(MIGRATION_LOCK_SQL)
         except Exception as e:
-            print(f"❌ Bảng users: {e}")
+            print(f"❌ Không tạo/khóa được bảng schema_migrations: {e}")
             return False
+        try:
+            try:
+                applied = fetch_applied(conn)
+            except Exception as e:
+                print(f"❌ Không đọc được bảng schema_migrations: {e}")
+                return False
+            pending, modified, unknown = compare_migrations(migrations, applied)
+            _print_differences([], modified, unknown)
+            if not pending:
+                print("✅ Database đã ở phiên bản mới nhất!")
+                return True
 
-        # Kiểm tra bảng tickets
+            for migration in pending:
+                label = f"{migration['version']}_{migration['name']}.sql"
+                print(f"🔨 Đang áp dụng {label}...")
+                started = time.perf_counter()
+                try:
+                    # File migration và bản ghi schema_migrations cùng một transaction
+                    with conn.transaction():
+                        conn.execute(migration["sql"])
+                        conn.execute(
+                            "INSERT INTO schema_migrations "
+                            "(version, name, checksum, duration_ms) "
+                            "VALUES (%s, %s, %s, %s)",
+                            (
+                                migration["version"],
+                                migration["name"],
+                                migration["checksum"],
+                                int((time.perf_counter() - started) * 1000),
+                            ),
+                        )
+                except Exception as e:
+                    print(f"❌ Lỗi khi áp dụng {label}: {e}")
+                    print("   Các migration sau đó chưa được áp dụng.")
+                    return False
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                print(f"✅ {label} ({elapsed_ms:.0f} ms)")
+        finally:
+            conn.execute(MIGRATION_UNLOCK_SQL)
+
+    print(f"\n✅ Đã áp dụng {len(pending)} migration!")
+    return True
+
+
+def check_database_structure(database_url=None, directory=MIGRATIONS_DIR):
+    """
+    Kiểm tra database đã áp dụng đủ migration chưa (không thay đổi database)
+
+    Dùng kết nối Postgres nếu có DATABASE_URL, ngược lại đọc schema_migrations
+    qua PostgREST.
+
+    Returns:
+        bool: True nếu không có migration chưa chạy hoặc bị sửa
+    """
+    print("🔍 Kiểm tra phiên bản database...")
+
+    try:
+        migrations = load_migrations(directory)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return False
+
+    if database_url or os.getenv("DATABASE_URL"):
         try:
-            tickets = (
-                db.supabase.table("tickets")
-                .select("id, created_by, project")
-                .limit(1)
-                .execute()
-            )
-            print("✅ Bảng tickets: OK (có đầy đủ cột)")
+            with connect(database_url) as conn:
+                exists = conn.execute(
+                    "SELECT to_regclass('schema_migrations') IS NOT NULL"
+                ).fetchone()[0]
+                applied = fetch_applied(conn) if exists else {}
         except Exception as e:
-            print(f"⚠️ Bảng tickets: Thiếu cột (cần migration)")
+            # RuntimeError của connect() hoặc lỗi psycopg khi đọc bảng
+            print(f"❌ {e}")
             return False
+    else:
+        applied = fetch_applied_rest()
+        if applied is None:
+            print("❌ Chưa cấu hình DATABASE_URL hoặc SUPABASE_URL/SUPABASE_ANON_KEY")
+            return False
+
+    pending, modified, unknown = compare_migrations(migrations, applied)
+    _print_differences(pending, modified, unknown)
+    if pending or modified:
+        print(f"\n💡 Chạy: python migrate_database.py ({len(pending)} migration chờ)")
+        return False
+    print(f"✅ Đã áp dụng đủ {len(migrations)} migration")
+    return True
 
-        return True
 
-    except Exception as e:
-        print(f"❌ Lỗi kiểm tra: {e}")
+def summarize_plan(plan):
+    """
+    Tóm tắt một kế hoạch truy vấn dạng text của EXPLAIN
+
+    Args:
+        plan (str): Kết quả EXPLAIN (mỗi node một dòng)
+
+    Returns:
+        dict: {indexes, seq_scans, cost, execution_ms}
+    """
+    cost = _COST_PATTERN.search(plan)
+    execution = _EXECUTION_TIME_PATTERN.search(plan)
+    return {
+        "indexes": list(dict.fromkeys(_INDEX_SCAN_PATTERN.findall(plan))),
+        "seq_scans": list(dict.fromkeys(_SEQ_SCAN_PATTERN.findall(plan))),
+        "cost": float(cost.group(1)) if cost else None,
+        "execution_ms": float(execution.group(1)) if execution else None,
+    }
+
+
+def explain_queries(
+    database_url=None,
+    project=None,
+    status="Chờ xử lý",
+    search="ticket",
+    analyze=False,
+    no_seqscan=False,
+    verbose=False,
+):
+    """
+    In kế hoạch truy vấn của các truy vấn chính (QUERY_PLANS)
+
+    Với bảng nhỏ Postgres có thể chọn Seq Scan dù có index; dùng no_seqscan để
+    kiểm tra mỗi truy vấn vẫn dùng được index (Seq Scan khi đó là lỗi).
+
+    Args:
+        database_url (str): Connection string (mặc định: DATABASE_URL)
+        project (str): Project dùng trong truy vấn (mặc định: project nhiều tickets nhất)
+        status (str): Trạng thái dùng cho ticket_list_status
+        search (str): Chuỗi tìm kiếm cho ticket_search
+        analyze (bool): EXPLAIN ANALYZE (chạy thật truy vấn, chỉ đọc)
+        no_seqscan (bool): SET enable_seqscan = off khi lập kế hoạch
+        verbose (bool): In toàn bộ kế hoạch thay vì chỉ tóm tắt
+
+    Returns:
+        bool: False nếu có truy vấn lỗi, hoặc Seq Scan khi no_seqscan
+    """
+    try:
+        conn = connect(database_url)
+    except RuntimeError as e:
+        print(f"❌ {e}")
         return False
 
+    ok = True
+    options = "ANALYZE, BUFFERS" if analyze else "COSTS"
+    with conn:
+        if project is None:
+            try:
+                row = conn.execute(
+                    "SELECT project FROM tickets GROUP BY project "
+                    "ORDER BY COUNT(*) DESC LIMIT 1"
+                ).fetchone()
+            except Exception as e:
+                print(f"❌ Không đọc được bảng tickets: {e}")
+                return False
+            project = row[0] if row else ""
+        params = {
+            "project": project,
+            "status": status,
+            "search": search,
+            "page_size": 50,
+        }
+        print(f"📋 Kế hoạch truy vấn (project = {project!r})")
+        print("=" * 50)
+
+        for name, description, sql in QUERY_PLANS:
+            try:
+                # Rollback sau mỗi truy vấn: bỏ SET LOCAL và mọi tác động của ANALYZE
+                with conn.transaction(force_rollback=True):
+                    if no_seqscan:
+                        conn.execute("SET LOCAL enable_seqscan = off")
+                    rows = conn.execute(f"EXPLAIN ({options}) {sql}", params)
+                    plan = "\n".join(row[0] for row in rows.fetchall())
+            except Exception as e:
+                print(f"❌ {name}: {e}")
+                ok = False
+                continue
+
+            summary = summarize_plan(plan)
+            details = f"cost={summary['cost']}"
+            if summary["execution_ms"] is not None:
+                details += f", {summary['execution_ms']:.2f} ms"
+            indexes = ", ".join(summary["indexes"]) or "không dùng index"
+            if summary["seq_scans"]:
+                icon = "❌" if no_seqscan else "⚠️"
+                indexes += f" | Seq Scan: {', '.join(summary['seq_scans'])}"
+                ok = ok and not no_seqscan
+            else:
+                icon = "✅"
+            print(f"{icon} {name} - {description}")
+            print(f"   {indexes} ({details})")
+            if verbose:
+                print("   " + plan.replace("\n", "\n   "))
+    return ok
 
-if __name__ == "__main__":
-    print("🗃️ Database Management Tool")
-    print("=" * 40)
 
-    if len(sys.argv) > 1 and sys.argv[1] == "check":
-        check_database_structure()
+def parse_args():
+    parser = argparse.ArgumentParser(description="Migration database Ticket Management")
+    parser.add_argument(
+        "command",
+        nargs="?",
+        default="migrate",
+        choices=["migrate", "check", "explain"],
+    )
+    parser.add_argument("--database-url", help="Mặc định: DATABASE_URL")
+    parser.add_argument("--project", help="Project dùng cho explain")
+    parser.add_argument("--status", default="Chờ xử lý", help="Trạng thái cho explain")
+    parser.add_argument("--search", default="ticket", help="Chuỗi tìm cho explain")
+    parser.add_argument("--analyze", action="store_true", help="EXPLAIN ANALYZE")
+    parser.add_argument(
+        "--no-seqscan",
+        action="store_true",
+        help="Tắt Seq Scan, báo lỗi nếu truy vấn không dùng được index",
+    )
+    parser.add_argument("--verbose", action="store_true", help="In toàn bộ kế hoạch")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.command == "check":
+        ok = check_database_structure(args.database_url)
+    elif args.command == "explain":
+        ok = explain_queries(
+            args.database_url,
+            project=args.project,
+            status=args.status,
+            search=args.search,
+            analyze=args.analyze,
+            no_seqscan=args.no_seqscan,
+            verbose=args.verbose,
+        )
     else:
-        migrate_database()
+        ok = migrate_database(args.database_url)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
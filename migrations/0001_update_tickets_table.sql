@@ -1,5 +1,5 @@
 -- Script để cập nhật bảng tickets với các cột mới
--- Chạy script này trong SQL Editor của Supabase
+-- Áp dụng bằng: python migrate_database.py (hoặc chạy trong SQL Editor theo thứ tự số)
 
 -- Thêm cột created_by (references users.id)
 ALTER TABLE tickets 
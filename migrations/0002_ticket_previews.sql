@@ -0,0 +1,30 @@
+-- Script tạo các cột preview (computed column của PostgREST) cho bảng tickets
+-- Áp dụng bằng: python migrate_database.py (hoặc chạy trong SQL Editor theo thứ tự số)
+-- Danh sách tickets chỉ lấy bản rút gọn của noi_dung và ghi_chu, nên không
+-- phải tải toàn bộ nội dung dài chỉ để cắt còn 30/25 ký tự khi hiển thị.
+-- Cách dùng: select=id,noi_dung_preview,ghi_chu_preview,...
+
+CREATE OR REPLACE FUNCTION noi_dung_preview(tickets)
+RETURNS TEXT
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT CASE
+        WHEN char_length($1.noi_dung) > 30 THEN left($1.noi_dung, 30) || '...'
+        ELSE $1.noi_dung
+    END;
+$$;
+
+CREATE OR REPLACE FUNCTION ghi_chu_preview(tickets)
+RETURNS TEXT
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT CASE
+        WHEN char_length($1.ghi_chu) > 25 THEN left($1.ghi_chu, 25) || '...'
+        ELSE $1.ghi_chu
+    END;
+$$;
+
+GRANT EXECUTE ON FUNCTION noi_dung_preview(tickets) TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION ghi_chu_preview(tickets) TO anon, authenticated;
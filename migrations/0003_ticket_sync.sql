@@ -0,0 +1,53 @@
+-- Script hỗ trợ đồng bộ delta cho bảng tickets
+-- Áp dụng bằng: python migrate_database.py (hoặc chạy trong SQL Editor theo thứ tự số)
+
+-- updated_at luôn do database gán (không phụ thuộc đồng hồ của client)
+CREATE OR REPLACE FUNCTION set_tickets_updated_at()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    NEW.updated_at = NOW();
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS tickets_set_updated_at ON tickets;
+CREATE TRIGGER tickets_set_updated_at
+BEFORE INSERT OR UPDATE ON tickets
+FOR EACH ROW EXECUTE FUNCTION set_tickets_updated_at();
+
+CREATE INDEX IF NOT EXISTS idx_tickets_updated_at ON tickets(updated_at, id);
+
+-- Tombstone: ghi lại các tickets đã bị xóa để client xóa khỏi snapshot
+CREATE TABLE IF NOT EXISTS ticket_tombstones (
+    ticket_id INTEGER PRIMARY KEY,
+    project TEXT,
+    deleted_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_ticket_tombstones_deleted_at
+ON ticket_tombstones(deleted_at);
+
+CREATE OR REPLACE FUNCTION record_ticket_tombstone()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO ticket_tombstones (ticket_id, project, deleted_at)
+    VALUES (OLD.id, OLD.project, NOW())
+    ON CONFLICT (ticket_id) DO UPDATE
+    SET project = EXCLUDED.project, deleted_at = EXCLUDED.deleted_at;
+    RETURN OLD;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS tickets_record_tombstone ON tickets;
+CREATE TRIGGER tickets_record_tombstone
+AFTER DELETE ON tickets
+FOR EACH ROW EXECUTE FUNCTION record_ticket_tombstone();
+
+GRANT SELECT ON ticket_tombstones TO anon, authenticated;
+
+-- Dọn tombstone cũ (tùy chọn, ví dụ chạy định kỳ):
+-- DELETE FROM ticket_tombstones WHERE deleted_at < NOW() - INTERVAL '30 days';
@@ -0,0 +1,21 @@
+-- Script bật Supabase Realtime cho bảng tickets (dùng với TICKET_CHANGE_FEED=realtime)
+-- Áp dụng bằng: python migrate_database.py (hoặc chạy trong SQL Editor theo thứ tự số)
+
+-- Gửi đầy đủ dòng cũ khi UPDATE/DELETE để client biết project bị ảnh hưởng
+ALTER TABLE tickets REPLICA IDENTITY FULL;
+
+-- Thêm bảng tickets vào publication của Supabase Realtime (bỏ qua nếu đã có,
+-- hoặc nếu database không có publication này, vd. Postgres chạy local)
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_publication WHERE pubname = 'supabase_realtime')
+       AND NOT EXISTS (
+           SELECT 1 FROM pg_publication_tables
+           WHERE pubname = 'supabase_realtime'
+             AND schemaname = 'public'
+             AND tablename = 'tickets'
+       ) THEN
+        ALTER PUBLICATION supabase_realtime ADD TABLE tickets;
+    END IF;
+END;
+$$;
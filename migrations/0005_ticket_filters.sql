@@ -0,0 +1,80 @@
+-- Script tạo bộ lọc tickets dùng chung và các index cho bộ lọc
+-- Áp dụng bằng: python migrate_database.py (hoặc chạy trong SQL Editor theo thứ tự số)
+-- Hàm filtered_tickets được 0006_ticket_stats.sql và 0007_ticket_search.sql dùng
+-- Danh sách tickets lọc trực tiếp qua PostgREST (TicketFilter.apply); các hàm
+-- RPC dùng filtered_tickets() để có đúng cùng điều kiện lọc.
+
+-- Bộ lọc: nhiều giá trị (mảng), khoảng ngày (mỗi đầu có thể NULL), quá hạn
+-- Hàm SQL một câu SELECT, STABLE nên được inline vào truy vấn gọi nó và vẫn
+-- dùng được các index bên dưới
+CREATE OR REPLACE FUNCTION filtered_tickets(
+    p_project TEXT DEFAULT NULL,
+    p_trang_thai TEXT[] DEFAULT NULL,
+    p_uu_tien TEXT[] DEFAULT NULL,
+    p_phan_loai TEXT[] DEFAULT NULL,
+    p_nen_tang TEXT[] DEFAULT NULL,
+    p_ngay_yeu_cau_from DATE DEFAULT NULL,
+    p_ngay_yeu_cau_to DATE DEFAULT NULL,
+    p_thoi_han_mong_muon_from DATE DEFAULT NULL,
+    p_thoi_han_mong_muon_to DATE DEFAULT NULL,
+    p_ngay_hoan_thanh_from DATE DEFAULT NULL,
+    p_ngay_hoan_thanh_to DATE DEFAULT NULL,
+    p_overdue BOOLEAN DEFAULT FALSE
+)
+RETURNS SETOF tickets
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT *
+    FROM tickets t
+    WHERE (p_project IS NULL OR t.project = p_project)
+      AND (p_trang_thai IS NULL OR t.trang_thai = ANY(p_trang_thai))
+      AND (p_uu_tien IS NULL OR t.uu_tien = ANY(p_uu_tien))
+      AND (p_phan_loai IS NULL OR t.phan_loai = ANY(p_phan_loai))
+      AND (p_nen_tang IS NULL OR t.nen_tang = ANY(p_nen_tang))
+      -- ngay_yeu_cau là timestamp: lấy hết ngày cuối của khoảng
+      AND (p_ngay_yeu_cau_from IS NULL OR t.ngay_yeu_cau >= p_ngay_yeu_cau_from)
+      AND (p_ngay_yeu_cau_to IS NULL OR t.ngay_yeu_cau < p_ngay_yeu_cau_to + 1)
+      AND (p_thoi_han_mong_muon_from IS NULL
+           OR t.thoi_han_mong_muon >= p_thoi_han_mong_muon_from)
+      AND (p_thoi_han_mong_muon_to IS NULL
+           OR t.thoi_han_mong_muon <= p_thoi_han_mong_muon_to)
+      AND (p_ngay_hoan_thanh_from IS NULL
+           OR t.ngay_hoan_thanh >= p_ngay_hoan_thanh_from)
+      AND (p_ngay_hoan_thanh_to IS NULL OR t.ngay_hoan_thanh <= p_ngay_hoan_thanh_to)
+      AND (p_overdue IS NOT TRUE OR (
+          t.thoi_han_mong_muon < CURRENT_DATE
+          AND t.trang_thai NOT IN ('Hoàn thành', 'Hủy bỏ')
+      ));
+$$;
+
+GRANT EXECUTE ON FUNCTION filtered_tickets(
+    TEXT, TEXT[], TEXT[], TEXT[], TEXT[], DATE, DATE, DATE, DATE, DATE, DATE, BOOLEAN
+) TO anon, authenticated;
+
+-- Index kép theo thứ tự của các truy vấn danh sách (project trước, rồi cột
+-- lọc/sắp xếp, id để phân trang ổn định). Danh sách luôn xếp NULL cuối
+-- (TicketFilter.apply_order) nên các index giảm dần khai báo NULLS LAST.
+-- Danh sách mặc định của một project: ngay_yeu_cau giảm dần
+CREATE INDEX IF NOT EXISTS idx_tickets_project_ngay_yeu_cau
+ON tickets (project, ngay_yeu_cau DESC NULLS LAST, id DESC);
+
+-- Admin xem tất cả project
+CREATE INDEX IF NOT EXISTS idx_tickets_ngay_yeu_cau
+ON tickets (ngay_yeu_cau DESC NULLS LAST, id DESC);
+
+-- Lọc theo trạng thái (bộ lọc dùng nhiều nhất) trong một project
+CREATE INDEX IF NOT EXISTS idx_tickets_project_trang_thai
+ON tickets (project, trang_thai, ngay_yeu_cau DESC NULLS LAST, id DESC);
+
+-- Lọc/sắp xếp theo thời hạn (gần nhất trước) và ngày hoàn thành (mới nhất trước)
+CREATE INDEX IF NOT EXISTS idx_tickets_project_thoi_han
+ON tickets (project, thoi_han_mong_muon, id);
+
+CREATE INDEX IF NOT EXISTS idx_tickets_project_ngay_hoan_thanh
+ON tickets (project, ngay_hoan_thanh DESC NULLS LAST, id DESC);
+
+-- Tickets quá hạn: chỉ index các ticket còn mở (index nhỏ, đúng điều kiện lọc)
+CREATE INDEX IF NOT EXISTS idx_tickets_open_thoi_han
+ON tickets (project, thoi_han_mong_muon)
+WHERE trang_thai NOT IN ('Hoàn thành', 'Hủy bỏ');
@@ -0,0 +1,67 @@
+-- Script tạo hàm thống kê tickets
+-- Áp dụng bằng: python migrate_database.py (hoặc chạy trong SQL Editor theo thứ tự số)
+-- Hàm trả về một object JSON nhỏ, không phụ thuộc số lượng tickets:
+--   {"total": 120, "by_status": {"Chờ xử lý": 40, ...}, "avg_completion_days": 3.5}
+-- Dùng hàm filtered_tickets của 0005_ticket_filters.sql
+
+-- Bỏ phiên bản cũ (chỉ lọc một giá trị mỗi cột)
+DROP FUNCTION IF EXISTS get_ticket_stats(TEXT, TEXT, TEXT, TEXT);
+
+CREATE OR REPLACE FUNCTION get_ticket_stats(
+    p_project TEXT DEFAULT NULL,
+    p_trang_thai TEXT[] DEFAULT NULL,
+    p_uu_tien TEXT[] DEFAULT NULL,
+    p_phan_loai TEXT[] DEFAULT NULL,
+    p_nen_tang TEXT[] DEFAULT NULL,
+    p_ngay_yeu_cau_from DATE DEFAULT NULL,
+    p_ngay_yeu_cau_to DATE DEFAULT NULL,
+    p_thoi_han_mong_muon_from DATE DEFAULT NULL,
+    p_thoi_han_mong_muon_to DATE DEFAULT NULL,
+    p_ngay_hoan_thanh_from DATE DEFAULT NULL,
+    p_ngay_hoan_thanh_to DATE DEFAULT NULL,
+    p_overdue BOOLEAN DEFAULT FALSE
+)
+RETURNS JSON
+LANGUAGE sql
+STABLE
+AS $$
+    WITH filtered AS (
+        SELECT trang_thai, ngay_yeu_cau, ngay_hoan_thanh
+        FROM filtered_tickets(
+            p_project, p_trang_thai, p_uu_tien, p_phan_loai, p_nen_tang,
+            p_ngay_yeu_cau_from, p_ngay_yeu_cau_to,
+            p_thoi_han_mong_muon_from, p_thoi_han_mong_muon_to,
+            p_ngay_hoan_thanh_from, p_ngay_hoan_thanh_to, p_overdue
+        )
+    ),
+    by_status AS (
+        SELECT COALESCE(trang_thai, '') AS trang_thai, COUNT(*) AS so_luong
+        FROM filtered
+        GROUP BY 1
+    )
+    SELECT json_build_object(
+        'total', (SELECT COUNT(*) FROM filtered),
+        'by_status', COALESCE(
+            (SELECT json_object_agg(trang_thai, so_luong) FROM by_status),
+            '{}'::json
+        ),
+        -- Số ngày hoàn thành = ngay_hoan_thanh - ngày tạo (không âm)
+        'avg_completion_days', (
+            SELECT ROUND(
+                AVG(GREATEST(
+                    ngay_hoan_thanh - (ngay_yeu_cau AT TIME ZONE 'UTC')::date, 0
+                ))::numeric,
+                1
+            )
+            FROM filtered
+            WHERE trang_thai = 'Hoàn thành'
+              AND ngay_yeu_cau IS NOT NULL
+              AND ngay_hoan_thanh IS NOT NULL
+        )
+    );
+$$;
+
+-- Cho phép client (anon key) gọi hàm qua RPC
+GRANT EXECUTE ON FUNCTION get_ticket_stats(
+    TEXT, TEXT[], TEXT[], TEXT[], TEXT[], DATE, DATE, DATE, DATE, DATE, DATE, BOOLEAN
+) TO anon, authenticated;
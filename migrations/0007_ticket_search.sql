@@ -0,0 +1,91 @@
+-- Script tạo tìm kiếm toàn văn (full-text search) cho tickets
+-- Áp dụng bằng: python migrate_database.py (hoặc chạy trong SQL Editor theo thứ tự số)
+-- Tìm trong noi_dung và ghi_chu, không phân biệt dấu tiếng Việt
+-- ("dang nhap" khớp "đăng nhập") và khớp tiền tố ("thanh to" khớp "thanh toán").
+-- Cách dùng: rpc("search_tickets", {"p_query": "đăng nhập", "p_limit": 50})
+
+CREATE EXTENSION IF NOT EXISTS unaccent WITH SCHEMA extensions;
+
+-- unaccent() chỉ là STABLE nên không dùng được trong cột generated/index;
+-- bản bọc này cố định dictionary nên có thể khai báo IMMUTABLE
+CREATE OR REPLACE FUNCTION f_unaccent(TEXT)
+RETURNS TEXT
+LANGUAGE sql
+IMMUTABLE
+PARALLEL SAFE
+STRICT
+AS $$
+    SELECT extensions.unaccent('extensions.unaccent'::regdictionary, $1);
+$$;
+
+-- Cột tsvector tự cập nhật khi ghi: noi_dung (trọng số A) và ghi_chu (B)
+-- Dùng cấu hình 'simple' (không stemming) vì Postgres không có cấu hình tiếng Việt
+ALTER TABLE tickets
+ADD COLUMN IF NOT EXISTS search_vector TSVECTOR
+GENERATED ALWAYS AS (
+    setweight(to_tsvector('simple', f_unaccent(COALESCE(noi_dung, ''))), 'A')
+    || setweight(to_tsvector('simple', f_unaccent(COALESCE(ghi_chu, ''))), 'B')
+) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_tickets_search_vector
+ON tickets USING GIN (search_vector);
+
+COMMENT ON COLUMN tickets.search_vector IS 'Nội dung + ghi chú (bỏ dấu) cho tìm kiếm toàn văn';
+
+-- Chuỗi người dùng nhập -> tsquery: bỏ dấu, tách từ, mọi từ phải khớp (tiền tố)
+CREATE OR REPLACE FUNCTION ticket_search_query(p_query TEXT)
+RETURNS TSQUERY
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT to_tsquery('simple', string_agg(quote_literal(word) || ':*', ' & '))
+    FROM regexp_split_to_table(
+        lower(f_unaccent(COALESCE(p_query, ''))), '[^[:alnum:]]+'
+    ) AS word
+    WHERE word <> '';
+$$;
+
+-- Bỏ phiên bản cũ (chỉ lọc một giá trị mỗi cột)
+DROP FUNCTION IF EXISTS search_tickets(TEXT, TEXT, TEXT, TEXT, TEXT, INTEGER);
+
+-- Trả về tickets (kiểu bảng tickets, nên client chọn được cột và cột preview)
+-- theo độ liên quan giảm dần, cùng bộ lọc với get_ticket_stats (filtered_tickets)
+CREATE OR REPLACE FUNCTION search_tickets(
+    p_query TEXT,
+    p_project TEXT DEFAULT NULL,
+    p_trang_thai TEXT[] DEFAULT NULL,
+    p_uu_tien TEXT[] DEFAULT NULL,
+    p_phan_loai TEXT[] DEFAULT NULL,
+    p_nen_tang TEXT[] DEFAULT NULL,
+    p_ngay_yeu_cau_from DATE DEFAULT NULL,
+    p_ngay_yeu_cau_to DATE DEFAULT NULL,
+    p_thoi_han_mong_muon_from DATE DEFAULT NULL,
+    p_thoi_han_mong_muon_to DATE DEFAULT NULL,
+    p_ngay_hoan_thanh_from DATE DEFAULT NULL,
+    p_ngay_hoan_thanh_to DATE DEFAULT NULL,
+    p_overdue BOOLEAN DEFAULT FALSE,
+    p_limit INTEGER DEFAULT 50
+)
+RETURNS SETOF tickets
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT t.*
+    FROM filtered_tickets(
+        p_project, p_trang_thai, p_uu_tien, p_phan_loai, p_nen_tang,
+        p_ngay_yeu_cau_from, p_ngay_yeu_cau_to,
+        p_thoi_han_mong_muon_from, p_thoi_han_mong_muon_to,
+        p_ngay_hoan_thanh_from, p_ngay_hoan_thanh_to, p_overdue
+    ) t, ticket_search_query(p_query) AS q
+    WHERE t.search_vector @@ q
+    ORDER BY ts_rank_cd(t.search_vector, q) DESC, t.ngay_yeu_cau DESC, t.id DESC
+    LIMIT LEAST(GREATEST(COALESCE(p_limit, 50), 1), 500);
+$$;
+
+-- Cho phép client (anon key) gọi hàm qua RPC
+GRANT EXECUTE ON FUNCTION f_unaccent(TEXT) TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION ticket_search_query(TEXT) TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION search_tickets(
+    TEXT, TEXT, TEXT[], TEXT[], TEXT[], TEXT[], DATE, DATE, DATE, DATE, DATE, DATE,
+    BOOLEAN, INTEGER
+) TO anon, authenticated;
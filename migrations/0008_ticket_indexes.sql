@@ -0,0 +1,26 @@
+-- Index cho các truy vấn còn lại của ứng dụng
+-- Áp dụng bằng: python migrate_database.py (hoặc chạy trong SQL Editor theo thứ tự số)
+-- Danh sách/bộ lọc đã có index kép trong 0005_ticket_filters.sql
+-- (project + ngay_yeu_cau, project + trang_thai, ...) và đồng bộ delta của
+-- admin có idx_tickets_updated_at trong 0003_ticket_sync.sql.
+-- Kiểm tra kế hoạch truy vấn: python migrate_database.py explain
+
+-- Đồng bộ delta của một project:
+--   WHERE project = ? AND updated_at >= ? ORDER BY updated_at, id
+CREATE INDEX IF NOT EXISTS idx_tickets_project_updated_at
+ON tickets (project, updated_at, id);
+
+-- Tombstone của một project: WHERE project = ? AND deleted_at >= ? ORDER BY deleted_at
+CREATE INDEX IF NOT EXISTS idx_ticket_tombstones_project_deleted_at
+ON ticket_tombstones (project, deleted_at);
+
+-- Khóa ngoại user_id (ON DELETE CASCADE): xóa user không phải quét cả bảng tickets
+CREATE INDEX IF NOT EXISTS idx_tickets_user_id ON tickets (user_id);
+
+-- idx_tickets_project (0001) trùng với phần đầu của các index kép theo project,
+-- chỉ làm chậm thao tác ghi nên bỏ đi
+DROP INDEX IF EXISTS idx_tickets_project;
+
+-- Cập nhật thống kê để planner chọn đúng index mới
+ANALYZE tickets;
+ANALYZE ticket_tombstones;
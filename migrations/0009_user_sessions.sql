@@ -0,0 +1,24 @@
+-- Session "Ghi nhớ đăng nhập" dùng chung cho mọi replica của app (session_store.py)
+-- Áp dụng bằng: python migrate_database.py (hoặc chạy trong SQL Editor theo thứ tự số)
+-- id là SHA-256 của session id; token (session id + chữ ký) chỉ nằm trong URL
+-- của trình duyệt, không được lưu.
+
+CREATE TABLE IF NOT EXISTS user_sessions (
+    id TEXT PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    username TEXT NOT NULL,
+    full_name TEXT,
+    project TEXT,
+    is_admin BOOLEAN NOT NULL DEFAULT FALSE,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+-- Xóa session hết hạn: DELETE ... WHERE expires_at < NOW()
+CREATE INDEX IF NOT EXISTS idx_user_sessions_expires_at
+ON user_sessions (expires_at);
+
+-- Khóa ngoại user_id (ON DELETE CASCADE): xóa user không phải quét cả bảng
+CREATE INDEX IF NOT EXISTS idx_user_sessions_user_id ON user_sessions (user_id);
+
+GRANT SELECT, INSERT, DELETE ON user_sessions TO anon, authenticated;
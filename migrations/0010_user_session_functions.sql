@@ -0,0 +1,84 @@
+-- Chỉ truy cập user_sessions qua các hàm SECURITY DEFINER (session_store.py)
+-- Áp dụng bằng: python migrate_database.py (hoặc chạy trong SQL Editor theo thứ tự số)
+-- 0009 cấp SELECT/DELETE trên cả bảng cho anon: ai có anon key cũng liệt kê
+-- hoặc xóa được mọi session. Các hàm dưới đây chỉ đọc/xóa đúng session có id
+-- (SHA-256 của session id ngẫu nhiên) do người gọi đưa vào.
+
+REVOKE ALL ON user_sessions FROM anon, authenticated;
+
+CREATE OR REPLACE FUNCTION get_user_session(p_id TEXT)
+RETURNS TABLE (
+    user_id INTEGER,
+    username TEXT,
+    full_name TEXT,
+    project TEXT,
+    is_admin BOOLEAN,
+    expires_at TIMESTAMP WITH TIME ZONE
+)
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    SELECT s.user_id, s.username, s.full_name, s.project, s.is_admin, s.expires_at
+    FROM user_sessions s
+    WHERE s.id = p_id;
+$$;
+
+CREATE OR REPLACE FUNCTION create_user_session(
+    p_id TEXT,
+    p_user_id INTEGER,
+    p_username TEXT,
+    p_full_name TEXT,
+    p_project TEXT,
+    p_is_admin BOOLEAN,
+    p_expires_at TIMESTAMP WITH TIME ZONE
+)
+RETURNS VOID
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    INSERT INTO user_sessions (
+        id, user_id, username, full_name, project, is_admin, expires_at
+    )
+    VALUES (
+        p_id, p_user_id, p_username, p_full_name, p_project, p_is_admin, p_expires_at
+    );
+$$;
+
+CREATE OR REPLACE FUNCTION delete_user_session(p_id TEXT)
+RETURNS VOID
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    DELETE FROM user_sessions WHERE id = p_id;
+$$;
+
+-- Chỉ xóa session đã hết hạn theo giờ của database
+CREATE OR REPLACE FUNCTION purge_user_sessions()
+RETURNS INTEGER
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    WITH deleted AS (
+        DELETE FROM user_sessions WHERE expires_at < NOW() RETURNING 1
+    )
+    SELECT COUNT(*)::INTEGER FROM deleted;
+$$;
+
+REVOKE EXECUTE ON FUNCTION get_user_session(TEXT) FROM PUBLIC;
+REVOKE EXECUTE ON FUNCTION create_user_session(
+    TEXT, INTEGER, TEXT, TEXT, TEXT, BOOLEAN, TIMESTAMP WITH TIME ZONE
+) FROM PUBLIC;
+REVOKE EXECUTE ON FUNCTION delete_user_session(TEXT) FROM PUBLIC;
+REVOKE EXECUTE ON FUNCTION purge_user_sessions() FROM PUBLIC;
+
+GRANT EXECUTE ON FUNCTION get_user_session(TEXT) TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION create_user_session(
+    TEXT, INTEGER, TEXT, TEXT, TEXT, BOOLEAN, TIMESTAMP WITH TIME ZONE
+) TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION delete_user_session(TEXT) TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION purge_user_sessions() TO anon, authenticated;
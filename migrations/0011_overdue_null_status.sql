@@ -0,0 +1,54 @@
+-- Tickets chưa có trạng thái (trang_thai NULL) được coi là còn mở khi lọc quá hạn
+-- Áp dụng bằng: python migrate_database.py (hoặc chạy trong SQL Editor theo thứ tự số)
+-- 0005 dùng trang_thai NOT IN (...), loại cả các ticket có trang_thai NULL, trong
+-- khi is_overdue() và bộ lọc SQLite (coalesce) coi chúng là quá hạn. Hàm lọc,
+-- index và bộ lọc PostgREST (TicketFilter.apply) giờ cùng dùng điều kiện
+-- (trang_thai IS NULL OR trang_thai NOT IN (...)); viết giống hệt nhau để
+-- planner dùng được index một phần cho cả hai đường truy vấn.
+
+CREATE OR REPLACE FUNCTION filtered_tickets(
+    p_project TEXT DEFAULT NULL,
+    p_trang_thai TEXT[] DEFAULT NULL,
+    p_uu_tien TEXT[] DEFAULT NULL,
+    p_phan_loai TEXT[] DEFAULT NULL,
+    p_nen_tang TEXT[] DEFAULT NULL,
+    p_ngay_yeu_cau_from DATE DEFAULT NULL,
+    p_ngay_yeu_cau_to DATE DEFAULT NULL,
+    p_thoi_han_mong_muon_from DATE DEFAULT NULL,
+    p_thoi_han_mong_muon_to DATE DEFAULT NULL,
+    p_ngay_hoan_thanh_from DATE DEFAULT NULL,
+    p_ngay_hoan_thanh_to DATE DEFAULT NULL,
+    p_overdue BOOLEAN DEFAULT FALSE
+)
+RETURNS SETOF tickets
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT *
+    FROM tickets t
+    WHERE (p_project IS NULL OR t.project = p_project)
+      AND (p_trang_thai IS NULL OR t.trang_thai = ANY(p_trang_thai))
+      AND (p_uu_tien IS NULL OR t.uu_tien = ANY(p_uu_tien))
+      AND (p_phan_loai IS NULL OR t.phan_loai = ANY(p_phan_loai))
+      AND (p_nen_tang IS NULL OR t.nen_tang = ANY(p_nen_tang))
+      -- ngay_yeu_cau là timestamp: lấy hết ngày cuối của khoảng
+      AND (p_ngay_yeu_cau_from IS NULL OR t.ngay_yeu_cau >= p_ngay_yeu_cau_from)
+      AND (p_ngay_yeu_cau_to IS NULL OR t.ngay_yeu_cau < p_ngay_yeu_cau_to + 1)
+      AND (p_thoi_han_mong_muon_from IS NULL
+           OR t.thoi_han_mong_muon >= p_thoi_han_mong_muon_from)
+      AND (p_thoi_han_mong_muon_to IS NULL
+           OR t.thoi_han_mong_muon <= p_thoi_han_mong_muon_to)
+      AND (p_ngay_hoan_thanh_from IS NULL
+           OR t.ngay_hoan_thanh >= p_ngay_hoan_thanh_from)
+      AND (p_ngay_hoan_thanh_to IS NULL OR t.ngay_hoan_thanh <= p_ngay_hoan_thanh_to)
+      AND (p_overdue IS NOT TRUE OR (
+          t.thoi_han_mong_muon < CURRENT_DATE
+          AND (t.trang_thai IS NULL OR t.trang_thai NOT IN ('Hoàn thành', 'Hủy bỏ'))
+      ));
+$$;
+
+-- Điều kiện của index một phần phải khớp điều kiện lọc mới
+DROP INDEX IF EXISTS idx_tickets_open_thoi_han;
+CREATE INDEX idx_tickets_open_thoi_han
+ON tickets (project, thoi_han_mong_muon)
+WHERE trang_thai IS NULL OR trang_thai NOT IN ('Hoàn thành', 'Hủy bỏ');
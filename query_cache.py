@@ -0,0 +1,165 @@
+"""
+Cache kết quả truy vấn cho SupabaseHelper
+
+Cache dùng chung cho mọi session trong cùng process Streamlit, có TTL và
+giới hạn số entry (LRU). Khóa cache có dạng:
+
+    (table, project, filters_key, columns, extra)
+
+trong đó project = None nghĩa là truy vấn trên tất cả project (admin).
+
+Cache lưu và trả về bản sao của list/dict (các giá trị bên trong như chuỗi,
+số, ngày được dùng chung), nên session sửa các dòng nhận được (normalize,
+gắn tên người tạo, preview, ...) không làm thay đổi dữ liệu của session khác.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+def make_filters_key(filters):
+    """
+    Chuyển dict filter thành tuple có thể hash, bỏ qua giá trị None hoặc rỗng
+
+    Args:
+        filters (dict | TicketFilter): Điều kiện lọc
+
+    Returns:
+        tuple: Các cặp (cột, giá trị) đã sắp xếp (hoặc TicketFilter.key())
+    """
+    if not filters:
+        return ()
+    if hasattr(filters, "key"):
+        return filters.key()
+    return tuple(
+        sorted(
+            (column, value)
+            for column, value in filters.items()
+            if value is not None and value != ""
+        )
+    )
+
+
+_CONTAINERS = (dict, list, tuple)
+
+
+def _copy_value(value):
+    """Sao chép các list/dict/tuple lồng nhau, giữ nguyên các giá trị bất biến"""
+    if isinstance(value, dict):
+        copy = dict(value)
+        for key, item in value.items():
+            if isinstance(item, _CONTAINERS):
+                copy[key] = _copy_value(item)
+        return copy
+    if isinstance(value, list):
+        return [
+            _copy_value(item) if isinstance(item, _CONTAINERS) else item
+            for item in value
+        ]
+    if isinstance(value, tuple):
+        return tuple(_copy_value(item) for item in value)
+    return value
+
+
+class QueryCache:
+    def __init__(self, maxsize=256, ttl=60):
+        """
+        Args:
+            maxsize (int): Số entry tối đa, vượt quá sẽ loại entry ít dùng nhất
+            ttl (float): Thời gian sống của một entry (giây)
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """
+        Lấy giá trị trong cache
+
+        Args:
+            key (tuple): Khóa cache
+
+        Returns:
+            tuple: (True, bản sao của value) nếu có và còn hạn, ngược lại
+                (False, None)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, _copy_value(value)
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def set(self, key, value):
+        """
+        Lưu bản sao của giá trị vào cache
+
+        Args:
+            key (tuple): Khóa cache
+            value: Giá trị cần lưu
+        """
+        value = _copy_value(value)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, table, projects=None):
+        """
+        Xóa các entry bị ảnh hưởng bởi thao tác ghi
+
+        Args:
+            table (str): Tên bảng vừa được ghi
+            projects (iterable): Các project bị ảnh hưởng. None = toàn bộ bảng.
+                Entry của truy vấn tất cả project (project = None) luôn bị xóa.
+
+        Returns:
+            int: Số entry đã xóa
+        """
+        with self._lock:
+            stale_keys = [
+                key
+                for key in self._entries
+                if key[0] == table
+                and (projects is None or key[1] is None or key[1] in projects)
+            ]
+            for key in stale_keys:
+                del self._entries[key]
+            self.invalidations += len(stale_keys)
+            return len(stale_keys)
+
+    def clear(self):
+        """Xóa toàn bộ cache"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Lấy các bộ đếm của cache
+
+        Returns:
+            dict: hits, misses, evictions, invalidations, size, hit_rate
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "size": len(self._entries),
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            }
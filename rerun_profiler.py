@@ -0,0 +1,165 @@
+"""
+Đo thời gian từng phần của một lần chạy script Streamlit (rerun)
+
+Mỗi lần chạy toàn trang hoặc chạy riêng một fragment/dialog là một
+RerunProfile gồm các span lồng nhau (tên, độ sâu, thời điểm bắt đầu, thời
+gian, số request tới Supabase), đủ để vẽ waterfall. Có thể bật thêm cProfile
+cho một lần chạy để lấy file pstats.
+
+Ví dụ:
+    profile = start_profile("main", use_cprofile=True)
+    try:
+        with profile_phase("check_authentication"):
+            ...
+    finally:
+        finish_profile(profile)
+    profile.dump_stats("rerun.pstats")  # python -m pstats rerun.pstats
+
+Span được gắn vào profile đang chạy của thread hiện tại (mỗi session
+Streamlit chạy script trong thread riêng); khi không có profile nào đang chạy
+profile_phase không làm gì.
+"""
+
+import cProfile
+import io
+import marshal
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+_active = threading.local()
+
+
+class RerunProfile:
+    def __init__(self, label, use_cprofile=False, counter=None):
+        """
+        Args:
+            label (str): Phần được chạy (vd. "main", "show_ticket_list")
+            use_cprofile (bool): Chạy cProfile trong suốt lần chạy
+            counter (callable): Hàm trả về tổng số request hiện tại (để tính số
+                request của từng span), None = không đếm
+        """
+        self.label = label
+        self.started_at = time.time()
+        self.duration_ms = None
+        self.spans = []
+        self.stats = None
+        self._origin = time.perf_counter()
+        self._stack = []
+        self._counter = counter
+        self._cprofile = cProfile.Profile() if use_cprofile else None
+
+    def open_span(self, name):
+        """
+        Bắt đầu một span con của span đang mở
+
+        Returns:
+            dict: Span {name, depth, start_ms, duration_ms, requests}
+        """
+        span = {
+            "name": name,
+            "depth": len(self._stack),
+            "start_ms": (time.perf_counter() - self._origin) * 1000,
+            "duration_ms": None,
+            "requests": self._counter() if self._counter else None,
+        }
+        self.spans.append(span)
+        self._stack.append(span)
+        return span
+
+    def close_span(self, span):
+        """Kết thúc span (và các span con còn mở do exception)"""
+        end_ms = (time.perf_counter() - self._origin) * 1000
+        while self._stack:
+            opened = self._stack.pop()
+            opened["duration_ms"] = end_ms - opened["start_ms"]
+            if self._counter:
+                opened["requests"] = self._counter() - opened["requests"]
+            if opened is span:
+                break
+
+    @property
+    def has_stats(self):
+        """Lần chạy có dữ liệu cProfile không"""
+        return self.stats is not None
+
+    def pstats_bytes(self):
+        """
+        Nội dung file pstats (giống dump_stats, dùng cho nút tải xuống)
+
+        Returns:
+            bytes: Dữ liệu đọc được bằng pstats.Stats(path)
+        """
+        return marshal.dumps(self.stats.stats)
+
+    def dump_stats(self, path):
+        """Ghi file pstats (xem bằng python -m pstats hoặc snakeviz)"""
+        self.stats.dump_stats(path)
+
+    def top_functions(self, limit=25, sort="cumulative"):
+        """
+        Các hàm tốn thời gian nhất theo cProfile
+
+        Returns:
+            str: Bảng của pstats.print_stats
+        """
+        stream = io.StringIO()
+        # Stats mới mỗi lần gọi vì strip_dirs/sort_stats thay đổi object
+        stats = pstats.Stats(self._cprofile, stream=stream)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+
+def current_profile():
+    """Profile đang chạy của thread hiện tại (None nếu không đo)"""
+    return getattr(_active, "profile", None)
+
+
+def start_profile(label, use_cprofile=False, counter=None):
+    """
+    Bắt đầu đo một lần chạy; span gốc mang tên label
+
+    Returns:
+        RerunProfile: Profile đang chạy (gọi finish_profile khi xong)
+    """
+    profile = RerunProfile(label, use_cprofile, counter)
+    _active.profile = profile
+    profile.open_span(label)
+    if profile._cprofile is not None:
+        try:
+            profile._cprofile.enable()
+        except ValueError:
+            # Đang có profiler khác chạy trong process (vd. profiler bên ngoài)
+            profile._cprofile = None
+    return profile
+
+
+def finish_profile(profile):
+    """Kết thúc lần chạy: đóng mọi span còn mở và thu kết quả cProfile"""
+    if profile._cprofile is not None:
+        profile._cprofile.disable()
+        profile.stats = pstats.Stats(profile._cprofile)
+    if profile.spans:
+        profile.close_span(profile.spans[0])
+    profile.duration_ms = profile.spans[0]["duration_ms"] if profile.spans else 0.0
+    if current_profile() is profile:
+        _active.profile = None
+
+
+@contextmanager
+def profile_phase(name):
+    """
+    Đo một phần của lần chạy hiện tại (không làm gì nếu không có profile)
+
+    Dùng được cả dạng with profile_phase("...") và decorator @profile_phase("...")
+    """
+    profile = current_profile()
+    if profile is None:
+        yield
+        return
+    span = profile.open_span(name)
+    try:
+        yield
+    finally:
+        profile.close_span(span)
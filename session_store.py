@@ -0,0 +1,367 @@
+"""
+Session đăng nhập theo từng trình duyệt ("Ghi nhớ đăng nhập")
+
+Khi đăng nhập có chọn ghi nhớ, app tạo một session và đưa token vào query
+param ?session=... của URL (tải lại trang hoặc bookmark vẫn giữ đăng nhập).
+Token có dạng
+
+    <session id>.<chữ ký HMAC-SHA256 của session id bằng SESSION_SECRET>
+
+nên token giả hoặc bị sửa bị loại ngay, không cần tra cứu. Token hợp lệ được
+tra trong LRU của process (QueryCache); chỉ khi chưa có mới đọc bảng sessions:
+    - SESSION_STORE=supabase (mặc định): bảng user_sessions
+      (migrations/0009_user_sessions.sql), dùng chung cho nhiều replica, chỉ
+      truy cập qua các hàm của migrations/0010_user_session_functions.sql
+    - SESSION_STORE=sqlite: file SQLite SESSION_DB_PATH (chỉ một máy)
+Database chỉ lưu SHA-256 của session id, không lưu token.
+
+Session chỉ xác định user nào đã đăng nhập; quyền admin và project được app
+đọc lại từ bảng users mỗi khi khôi phục đăng nhập từ token.
+
+Các replica phải dùng chung SESSION_SECRET (bắt buộc: thiếu thì không tạo và
+không kiểm tra được token). Đăng xuất có hiệu lực ngay trên replica xử lý nó;
+các replica khác thấy sau tối đa SESSION_CACHE_TTL giây.
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+from database import SupabaseHelper, get_supabase_client
+from query_cache import QueryCache
+
+# Nơi lưu sessions: "supabase" hoặc "sqlite"
+SESSION_STORE = os.getenv("SESSION_STORE", "supabase").lower()
+
+# File SQLite khi SESSION_STORE=sqlite
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", ".streamlit_sessions.db")
+
+# Khóa ký token, phải giống nhau trên mọi replica (bắt buộc khi dùng "Ghi nhớ
+# đăng nhập"; không tự sinh để token không mất hiệu lực âm thầm khi khởi động
+# lại hoặc khi request đến replica khác)
+SESSION_SECRET = os.getenv("SESSION_SECRET", "")
+
+# Thời hạn của một session (ngày)
+SESSION_TTL_DAYS = float(os.getenv("SESSION_TTL_DAYS", "30"))
+
+# LRU trong process: số session tối đa và thời gian trước khi đọc lại bảng
+# sessions (giây, để thấy đăng xuất từ replica khác)
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "10000"))
+SESSION_CACHE_TTL = float(os.getenv("SESSION_CACHE_TTL", "300"))
+
+# Query param chứa token
+SESSION_QUERY_PARAM = "session"
+
+SESSION_TABLE = "user_sessions"
+
+# Thông tin user lưu cùng session (giống st.session_state khi đăng nhập)
+SESSION_USER_FIELDS = ["user_id", "username", "full_name", "project", "is_admin"]
+
+# Khoảng cách giữa hai lần xóa session hết hạn (giây)
+PURGE_INTERVAL = 3600
+
+
+def sign_session_id(session_id, secret=None):
+    """
+    Ký session id bằng HMAC-SHA256
+
+    Returns:
+        str: Chữ ký dạng base64 URL-safe (không có "=")
+    """
+    digest = hmac.new(
+        (secret or SESSION_SECRET).encode(), session_id.encode(), hashlib.sha256
+    ).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def make_token(session_id, secret=None):
+    """Tạo token "<session id>.<chữ ký>" cho một session id"""
+    return f"{session_id}.{sign_session_id(session_id, secret)}"
+
+
+def parse_token(token, secret=None):
+    """
+    Kiểm tra chữ ký của token
+
+    Args:
+        token (str): Token lấy từ URL
+        secret (str): Khóa ký (mặc định SESSION_SECRET)
+
+    Returns:
+        str: Session id nếu chữ ký đúng, ngược lại None
+    """
+    if not token or token.count(".") != 1:
+        return None
+    session_id, signature = token.split(".")
+    if not hmac.compare_digest(signature, sign_session_id(session_id, secret)):
+        return None
+    return session_id
+
+
+def session_key(session_id):
+    """Khóa lưu trong database: SHA-256 của session id"""
+    return hashlib.sha256(session_id.encode()).hexdigest()
+
+
+class SqliteSessionBackend:
+    def __init__(self, path=SESSION_DB_PATH):
+        """
+        Args:
+            path (str): File SQLite (được tạo nếu chưa có)
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        # WAL: nhiều process trên cùng máy đọc/ghi đồng thời
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {SESSION_TABLE} (
+                id TEXT PRIMARY KEY,
+                user_id INTEGER NOT NULL,
+                username TEXT NOT NULL,
+                full_name TEXT,
+                project TEXT,
+                is_admin INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{SESSION_TABLE}_expires_at "
+            f"ON {SESSION_TABLE} (expires_at)"
+        )
+
+    def get(self, key):
+        """
+        Đọc một session
+
+        Returns:
+            dict: SESSION_USER_FIELDS và expires_at (epoch), None nếu không có
+        """
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(SESSION_USER_FIELDS)}, expires_at "
+                f"FROM {SESSION_TABLE} WHERE id = ?",
+                (key,),
+            ).fetchone()
+        if row is None:
+            return None
+        record = dict(zip(SESSION_USER_FIELDS + ["expires_at"], row))
+        record["is_admin"] = bool(record["is_admin"])
+        return record
+
+    def put(self, key, record):
+        """Lưu một session mới"""
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {SESSION_TABLE} "
+                f"(id, {', '.join(SESSION_USER_FIELDS)}, created_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    *(record.get(field) for field in SESSION_USER_FIELDS),
+                    time.time(),
+                    record["expires_at"],
+                ),
+            )
+
+    def delete(self, key):
+        """Xóa một session (đăng xuất)"""
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {SESSION_TABLE} WHERE id = ?", (key,))
+
+    def purge_expired(self, now):
+        """
+        Xóa các session đã hết hạn
+
+        Returns:
+            int: Số session đã xóa
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                f"DELETE FROM {SESSION_TABLE} WHERE expires_at < ?", (now,)
+            )
+        return cursor.rowcount
+
+
+def _to_iso(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+class SupabaseSessionBackend:
+    """
+    Sessions trong bảng user_sessions của Supabase (dùng chung cho mọi replica)
+
+    Anon key không có quyền trên bảng; mọi thao tác đi qua các hàm SECURITY
+    DEFINER (migrations/0010_user_session_functions.sql), chỉ chạm tới đúng
+    session có id được đưa vào.
+    """
+
+    def _rpc(self, name, params=None):
+        return SupabaseHelper._execute(get_supabase_client().rpc(name, params or {}))
+
+    def get(self, key):
+        """
+        Đọc một session
+
+        Returns:
+            dict: SESSION_USER_FIELDS và expires_at (epoch), None nếu không có
+        """
+        response = self._rpc("get_user_session", {"p_id": key})
+        if not response.data:
+            return None
+        record = dict(response.data[0])
+        record["expires_at"] = datetime.fromisoformat(
+            record["expires_at"]
+        ).timestamp()
+        return record
+
+    def put(self, key, record):
+        """Lưu một session mới"""
+        params = {f"p_{field}": record.get(field) for field in SESSION_USER_FIELDS}
+        params["p_id"] = key
+        params["p_expires_at"] = _to_iso(record["expires_at"])
+        self._rpc("create_user_session", params)
+
+    def delete(self, key):
+        """Xóa một session (đăng xuất)"""
+        self._rpc("delete_user_session", {"p_id": key})
+
+    def purge_expired(self, now):
+        """
+        Xóa các session đã hết hạn (theo giờ của database)
+
+        Returns:
+            int: Số session đã xóa
+        """
+        response = self._rpc("purge_user_sessions")
+        return response.data or 0
+
+
+class SessionStore:
+    def __init__(
+        self,
+        backend,
+        secret=None,
+        ttl_days=SESSION_TTL_DAYS,
+        cache_size=SESSION_CACHE_SIZE,
+        cache_ttl=SESSION_CACHE_TTL,
+    ):
+        """
+        Args:
+            backend: SqliteSessionBackend hoặc SupabaseSessionBackend
+            secret (str): Khóa ký token (mặc định SESSION_SECRET)
+            ttl_days (float): Thời hạn của session (ngày)
+            cache_size (int): Số session tối đa trong LRU
+            cache_ttl (float): Thời gian giữ một session trong LRU (giây)
+
+        Raises:
+            RuntimeError: Chưa đặt SESSION_SECRET
+        """
+        self.backend = backend
+        self.secret = secret or SESSION_SECRET
+        if not self.secret:
+            raise RuntimeError(
+                "Chưa đặt SESSION_SECRET (chuỗi ngẫu nhiên dài, giống nhau trên "
+                "mọi replica) nên không dùng được ghi nhớ đăng nhập"
+            )
+        self.ttl = ttl_days * 24 * 60 * 60
+        self._cache = QueryCache(maxsize=cache_size, ttl=cache_ttl)
+        self._last_purge = 0.0
+
+    def create(self, user):
+        """
+        Tạo session cho user vừa đăng nhập
+
+        Args:
+            user (dict): Dòng của bảng users (id, username, full_name, ...)
+
+        Returns:
+            str: Token để đưa vào URL
+        """
+        session_id = secrets.token_urlsafe(32)
+        record = {field: user.get(field) for field in SESSION_USER_FIELDS}
+        record["user_id"] = user.get("id")
+        record["is_admin"] = bool(user.get("is_admin", False))
+        record["expires_at"] = time.time() + self.ttl
+
+        key = session_key(session_id)
+        self.backend.put(key, record)
+        self._cache.set((SESSION_TABLE, key), record)
+        self._purge_expired()
+        return make_token(session_id, self.secret)
+
+    def validate(self, token):
+        """
+        Kiểm tra token: chữ ký, rồi LRU, chỉ đọc bảng sessions khi LRU chưa có
+
+        Returns:
+            dict: Thông tin user của session (SESSION_USER_FIELDS), None nếu
+            token sai, hết hạn hoặc đã đăng xuất
+        """
+        session_id = parse_token(token, self.secret)
+        if session_id is None:
+            return None
+
+        cache_key = (SESSION_TABLE, session_key(session_id))
+        hit, record = self._cache.get(cache_key)
+        if not hit:
+            record = self.backend.get(cache_key[1])
+            # Cả kết quả None cũng được giữ để token cũ không đọc lại database
+            self._cache.set(cache_key, record)
+        if record is None or record["expires_at"] <= time.time():
+            return None
+        return record
+
+    def revoke(self, token):
+        """Xóa session của token (đăng xuất)"""
+        session_id = parse_token(token, self.secret)
+        if session_id is None:
+            return
+        key = session_key(session_id)
+        self._cache.set((SESSION_TABLE, key), None)
+        self.backend.delete(key)
+
+    def _purge_expired(self):
+        """Xóa session hết hạn, tối đa một lần mỗi PURGE_INTERVAL giây"""
+        now = time.time()
+        if now - self._last_purge < PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        try:
+            self.backend.purge_expired(now)
+        except Exception:
+            # Không ảnh hưởng session vừa tạo, lần sau xóa tiếp
+            pass
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_session_store():
+    """
+    Lấy SessionStore dùng chung trong process (backend theo SESSION_STORE)
+
+    Returns:
+        SessionStore: Store của process
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            if SESSION_STORE == "sqlite":
+                backend = SqliteSessionBackend(SESSION_DB_PATH)
+            else:
+                backend = SupabaseSessionBackend()
+            _store = SessionStore(backend)
+        return _store
@@ -0,0 +1,142 @@
+"""
+Phân tích tickets bằng pandas (vector hóa)
+
+Danh sách tickets được chuyển thành DataFrame có kiểu dữ liệu rõ ràng một lần
+(cột ngày đã parse, trạng thái/ưu tiên dạng category). Mọi thống kê — số ngày
+hoàn thành, trung bình, phân bố theo trạng thái/ưu tiên/nền tảng — đều tính
+trên cột, không lặp từng ticket bằng Python.
+"""
+
+import pandas as pd
+
+# Cột ngày và kiểu của chúng trong bảng tickets
+TIMESTAMP_COLUMNS = ["ngay_yeu_cau", "created_at", "updated_at"]
+DATE_COLUMNS = ["thoi_han_mong_muon", "ngay_hoan_thanh"]
+CATEGORY_COLUMNS = ["trang_thai", "uu_tien", "phan_loai", "nen_tang", "project"]
+
+COMPLETED_STATUS = "Hoàn thành"
+
+
+def tickets_to_frame(tickets, categories=None):
+    """
+    Chuyển danh sách tickets thành DataFrame có kiểu dữ liệu
+
+    Args:
+        tickets (list): Danh sách tickets (dict)
+        categories (dict): Thứ tự category cho từng cột, vd.
+            {"trang_thai": TRANG_THAI_OPTIONS}. Giá trị ngoài danh sách vẫn
+            được giữ lại (thêm vào cuối).
+
+    Returns:
+        pd.DataFrame: Có thêm cột completion_days (số ngày hoàn thành, NaN nếu
+        chưa hoàn thành hoặc thiếu ngày)
+    """
+    df = pd.DataFrame.from_records(tickets or [])
+
+    for column in TIMESTAMP_COLUMNS + DATE_COLUMNS:
+        parsed_column = f"{column}_date"
+        if parsed_column in df:
+            # Ngày đã được parse sẵn bởi ticket_normalize
+            df[column] = pd.to_datetime(df[parsed_column])
+        elif column in df:
+            # Chỉ lấy phần ngày (timestamp cũng được cắt [:10] như khi hiển thị)
+            df[column] = pd.to_datetime(
+                df[column].astype("string").str[:10],
+                errors="coerce",
+                format="%Y-%m-%d",
+            )
+
+    for column in CATEGORY_COLUMNS:
+        if column in df:
+            known = list((categories or {}).get(column, []))
+            extra = sorted(
+                value for value in df[column].dropna().unique() if value not in known
+            )
+            df[column] = pd.Categorical(df[column], categories=known + extra)
+
+    df["completion_days"] = completion_days(df)
+    return df
+
+
+def completion_days(df):
+    """
+    Tính số ngày hoàn thành (ngay_hoan_thanh - ngay_yeu_cau, không âm)
+
+    Args:
+        df (pd.DataFrame): Kết quả của tickets_to_frame
+
+    Returns:
+        pd.Series: Số ngày (kiểu Int64, <NA> nếu thiếu một trong hai ngày)
+    """
+    if "so_ngay_hoan_thanh" in df:
+        # Đã được tính sẵn bởi ticket_normalize
+        return df["so_ngay_hoan_thanh"].astype("Int64")
+    if "ngay_yeu_cau" not in df or "ngay_hoan_thanh" not in df:
+        return pd.Series(pd.NA, index=df.index, dtype="Int64")
+    days = (df["ngay_hoan_thanh"] - df["ngay_yeu_cau"]).dt.days
+    return days.clip(lower=0).astype("Int64")
+
+
+def summarize_tickets(df):
+    """
+    Tính thống kê tổng quan (cùng định dạng SupabaseHelper.get_ticket_stats)
+
+    Args:
+        df (pd.DataFrame): Kết quả của tickets_to_frame
+
+    Returns:
+        dict: {"total": int, "by_status": dict, "avg_completion_days": float hoặc None}
+    """
+    by_status = {}
+    if "trang_thai" in df and len(df):
+        counts = df["trang_thai"].astype("object").fillna("").value_counts()
+        by_status = {status: int(count) for status, count in counts.items()}
+
+    avg_completion_days = None
+    if "trang_thai" in df and len(df):
+        completed = df.loc[df["trang_thai"] == COMPLETED_STATUS, "completion_days"]
+        if completed.notna().any():
+            avg_completion_days = round(float(completed.mean()), 1)
+
+    return {
+        "total": int(len(df)),
+        "by_status": by_status,
+        "avg_completion_days": avg_completion_days,
+    }
+
+
+def breakdown(df, column):
+    """
+    Phân bố số lượng tickets và số ngày hoàn thành trung bình theo một cột
+
+    Args:
+        df (pd.DataFrame): Kết quả của tickets_to_frame
+        column (str): Cột cần nhóm (trang_thai, uu_tien, nen_tang, ...)
+
+    Returns:
+        pd.DataFrame: index là giá trị của cột, gồm so_luong và tg_ht_trung_binh
+    """
+    if column not in df:
+        return pd.DataFrame(columns=["so_luong", "tg_ht_trung_binh"])
+    grouped = df.groupby(column, observed=False)
+    return pd.DataFrame(
+        {
+            "so_luong": grouped.size(),
+            "tg_ht_trung_binh": grouped["completion_days"].mean().round(1),
+        }
+    )
+
+
+def breakdowns(df):
+    """
+    Phân bố theo trạng thái, ưu tiên và nền tảng
+
+    Args:
+        df (pd.DataFrame): Kết quả của tickets_to_frame
+
+    Returns:
+        dict: {"trang_thai": DataFrame, "uu_tien": DataFrame, "nen_tang": DataFrame}
+    """
+    return {
+        column: breakdown(df, column) for column in ["trang_thai", "uu_tien", "nen_tang"]
+    }
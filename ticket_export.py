@@ -0,0 +1,201 @@
+"""
+Xuất toàn bộ tickets ra CSV hoặc Parquet
+
+Tickets được lấy theo từng trang cố định (SupabaseHelper.iter_ticket_pages)
+và ghi ngay vào file, nên bộ nhớ chỉ phải giữ một trang dù bảng có bao nhiêu
+dòng. Phạm vi project và bộ lọc giống hệt danh sách tickets.
+
+Parquet cần thư viện pyarrow (chỉ import khi xuất Parquet).
+
+File tạm cho nút tải xuống bị xóa khi session xuất lại hoặc đổi bộ lọc; file
+của các session đã đóng được dọn theo tuổi (EXPORT_FILE_MAX_AGE) ở lần xuất
+tiếp theo.
+"""
+
+import csv
+import glob
+import os
+import tempfile
+import time
+
+from database import EXPORT_PAGE_SIZE
+from ticket_normalize import strip_derived_fields
+
+# Các cột được xuất, theo thứ tự của bảng tickets (cột chưa có -> để trống)
+EXPORT_COLUMNS = [
+    "id",
+    "project",
+    "ngay_yeu_cau",
+    "phan_loai",
+    "nen_tang",
+    "noi_dung",
+    "link",
+    "uu_tien",
+    "thoi_han_mong_muon",
+    "ngay_hoan_thanh",
+    "trang_thai",
+    "ghi_chu",
+    "user_id",
+    "created_by",
+    "created_at",
+    "updated_at",
+]
+
+# Cột số nguyên trong file Parquet (các cột còn lại là chuỗi, ngày theo ISO)
+EXPORT_INT_COLUMNS = ("id", "user_id", "created_by")
+
+# File xuất tạm cũ hơn số giây này bị xóa ở lần xuất tiếp theo
+EXPORT_FILE_MAX_AGE = float(os.getenv("EXPORT_FILE_MAX_AGE", "3600"))
+
+# Tiền tố file xuất tạm (để dọn đúng file của module này)
+EXPORT_FILE_PREFIX = "tickets_export_"
+
+# Định dạng -> (MIME type, đuôi file)
+EXPORT_FORMATS = {
+    "csv": ("text/csv", ".csv"),
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+}
+
+
+def _export_rows(tickets):
+    """Chuyển một trang tickets về các cột gốc theo EXPORT_COLUMNS"""
+    rows = []
+    for ticket in tickets:
+        ticket = strip_derived_fields(ticket)
+        rows.append({column: ticket.get(column) for column in EXPORT_COLUMNS})
+    return rows
+
+
+def _write_csv(pages, path, on_progress):
+    # utf-8-sig để Excel hiển thị đúng tiếng Việt
+    written = 0
+    with open(path, "w", encoding="utf-8-sig", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=EXPORT_COLUMNS)
+        writer.writeheader()
+        for tickets in pages:
+            writer.writerows(_export_rows(tickets))
+            written += len(tickets)
+            if on_progress:
+                on_progress(written)
+    return written
+
+
+def _write_parquet(pages, path, on_progress):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError(
+            "Cần cài pyarrow để xuất Parquet (pip install pyarrow)"
+        ) from e
+
+    schema = pa.schema(
+        [
+            (column, pa.int64() if column in EXPORT_INT_COLUMNS else pa.string())
+            for column in EXPORT_COLUMNS
+        ]
+    )
+    written = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for tickets in pages:
+            # Mỗi trang là một row group
+            rows = _export_rows(tickets)
+            writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+            written += len(tickets)
+            if on_progress:
+                on_progress(written)
+    return written
+
+
+def export_tickets(
+    db,
+    path,
+    fmt="csv",
+    project=None,
+    filters=None,
+    page_size=EXPORT_PAGE_SIZE,
+    on_progress=None,
+):
+    """
+    Xuất tickets ra file
+
+    Ví dụ:
+        rows = export_tickets(SupabaseHelper(), "tickets.parquet", "parquet")
+
+    Args:
+        db (SupabaseHelper): Database helper
+        path (str): Đường dẫn file cần ghi
+        fmt (str): "csv" hoặc "parquet"
+        project (str): Project cần lọc (None = tất cả project, dành cho admin)
+        filters (dict | TicketFilter): Các filter bổ sung (giống danh sách tickets)
+        page_size (int): Số ticket mỗi request
+        on_progress (callable): on_progress(số dòng đã ghi), gọi sau mỗi trang
+
+    Returns:
+        int: Số tickets đã xuất
+
+    Raises:
+        ValueError: Định dạng không hỗ trợ
+        ImportError: Xuất Parquet khi chưa cài pyarrow
+        Exception: Lỗi từ Supabase
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Định dạng không hỗ trợ: {fmt}")
+
+    pages = db.iter_ticket_pages(project, filters, page_size)
+    writer = _write_parquet if fmt == "parquet" else _write_csv
+    return writer(pages, path, on_progress)
+
+
+def export_tickets_to_tempfile(db, fmt="csv", project=None, filters=None, **kwargs):
+    """
+    Xuất tickets ra một file tạm (dùng cho nút tải xuống)
+
+    File lỗi giữa chừng sẽ bị xóa; file thành công do người gọi xóa khi không
+    cần nữa, hoặc bị remove_stale_exports() xóa khi quá EXPORT_FILE_MAX_AGE.
+
+    Args:
+        db (SupabaseHelper): Database helper
+        fmt (str): "csv" hoặc "parquet"
+        project (str): Project cần lọc
+        filters (dict | TicketFilter): Các filter bổ sung
+        **kwargs: page_size, on_progress (xem export_tickets)
+
+    Returns:
+        tuple: (đường dẫn file, số tickets đã xuất)
+    """
+    remove_stale_exports()
+    suffix = EXPORT_FORMATS.get(fmt, ("", ""))[1]
+    fd, path = tempfile.mkstemp(prefix=EXPORT_FILE_PREFIX, suffix=suffix)
+    os.close(fd)
+    try:
+        rows = export_tickets(db, path, fmt, project, filters, **kwargs)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, rows
+
+
+def remove_stale_exports(max_age=None):
+    """
+    Xóa các file xuất tạm cũ (của các session đã đóng mà không tự dọn)
+
+    Args:
+        max_age (float): Tuổi tối đa của file (giây, mặc định EXPORT_FILE_MAX_AGE)
+
+    Returns:
+        int: Số file đã xóa
+    """
+    max_age = EXPORT_FILE_MAX_AGE if max_age is None else max_age
+    cutoff = time.time() - max_age
+    pattern = os.path.join(tempfile.gettempdir(), EXPORT_FILE_PREFIX + "*")
+    removed = 0
+    for path in glob.glob(pattern):
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            # File vừa bị session khác xóa
+            pass
+    return removed
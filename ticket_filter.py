@@ -0,0 +1,340 @@
+"""
+Bộ lọc tickets: nhiều giá trị, khoảng ngày, quá hạn và thứ tự sắp xếp
+
+TicketFilter mô tả điều kiện lọc của danh sách tickets và được dịch thành
+một truy vấn PostgREST duy nhất (in_/eq, gte/lt/lte, order), nên việc lọc
+luôn chạy trong database với các index trong migrations/0005_ticket_filters.sql.
+Cùng một bộ lọc được truyền vào các hàm RPC (get_ticket_stats, search_tickets)
+qua rpc_params(), vào snapshot cục bộ (đồng bộ delta) qua matches(), và vào
+bản sao SQLite (ticket_replica) qua sql_where()/sql_order().
+
+SupabaseHelper vẫn nhận dict {cột: giá trị} như trước (lọc bằng eq);
+TicketFilter.from_dict() chuyển dict đó về bộ lọc tương đương.
+"""
+
+from datetime import date, timedelta
+
+from ticket_normalize import CLOSED_STATUSES, is_overdue
+
+# Các cột lọc được nhiều giá trị (in_)
+TICKET_FILTER_COLUMNS = ("trang_thai", "uu_tien", "phan_loai", "nen_tang")
+
+# Các cột lọc được theo khoảng ngày (ngay_yeu_cau là timestamp, còn lại là date)
+TICKET_DATE_RANGE_COLUMNS = ("ngay_yeu_cau", "thoi_han_mong_muon", "ngay_hoan_thanh")
+
+# Các cột sắp xếp được (luôn kèm id để thứ tự ổn định giữa các trang)
+TICKET_SORT_COLUMNS = ("ngay_yeu_cau", "thoi_han_mong_muon", "ngay_hoan_thanh", "id")
+
+DEFAULT_SORT = ("ngay_yeu_cau", True)
+
+
+def _as_date(value):
+    """Chuyển date hoặc chuỗi YYYY-MM-DD thành date (None nếu trống)"""
+    if value in (None, ""):
+        return None
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+class TicketFilter:
+    def __init__(
+        self,
+        values=None,
+        date_ranges=None,
+        overdue=False,
+        sort=DEFAULT_SORT,
+        equals=None,
+    ):
+        """
+        Args:
+            values (dict): Cột -> danh sách giá trị chấp nhận (rỗng = không lọc)
+            date_ranges (dict): Cột ngày -> (từ ngày, đến ngày), mỗi đầu có thể None
+            overdue (bool): Chỉ lấy tickets đã quá thời hạn mà chưa hoàn thành/hủy
+            sort (tuple): (cột, giảm dần) trong TICKET_SORT_COLUMNS
+            equals (dict): Các điều kiện bằng khác (vd. {"id": 5})
+
+        Raises:
+            ValueError: Cột không hỗ trợ hoặc khoảng ngày ngược
+        """
+        self.values = {}
+        for column, accepted in (values or {}).items():
+            if column not in TICKET_FILTER_COLUMNS:
+                raise ValueError(f"Không lọc nhiều giá trị được theo cột {column}")
+            accepted = tuple(sorted({value for value in accepted or () if value}))
+            if accepted:
+                self.values[column] = accepted
+
+        self.date_ranges = {}
+        for column, (start, end) in (date_ranges or {}).items():
+            if column not in TICKET_DATE_RANGE_COLUMNS:
+                raise ValueError(f"Không lọc theo khoảng ngày được với cột {column}")
+            start, end = _as_date(start), _as_date(end)
+            if start and end and start > end:
+                raise ValueError(f"Khoảng ngày của {column} không hợp lệ")
+            if start or end:
+                self.date_ranges[column] = (start, end)
+
+        column, descending = sort or DEFAULT_SORT
+        if column not in TICKET_SORT_COLUMNS:
+            raise ValueError(f"Không sắp xếp được theo cột {column}")
+        self.sort = (column, bool(descending))
+
+        self.overdue = bool(overdue)
+        self.equals = {
+            column: value
+            for column, value in (equals or {}).items()
+            if value is not None and value != ""
+        }
+
+    @classmethod
+    def from_dict(cls, filters):
+        """
+        Chuyển filters kiểu cũ ({cột: giá trị}, lọc bằng) thành TicketFilter
+
+        Args:
+            filters (dict | TicketFilter | None): Điều kiện lọc
+
+        Returns:
+            TicketFilter: Bộ lọc tương đương (chính filters nếu đã là TicketFilter)
+        """
+        if isinstance(filters, TicketFilter):
+            return filters
+        values, equals = {}, {}
+        for column, value in (filters or {}).items():
+            if value is None or value == "":
+                continue
+            if column in TICKET_FILTER_COLUMNS:
+                values[column] = [value]
+            else:
+                equals[column] = value
+        return cls(values=values, equals=equals)
+
+    def with_sort(self, column, descending=True):
+        """
+        Tạo bản sao với thứ tự sắp xếp khác
+
+        Returns:
+            TicketFilter: Bộ lọc mới
+        """
+        return TicketFilter(
+            values=self.values,
+            date_ranges=self.date_ranges,
+            overdue=self.overdue,
+            sort=(column, descending),
+            equals=self.equals,
+        )
+
+    def __bool__(self):
+        # Có điều kiện lọc hoặc thứ tự khác mặc định
+        return bool(
+            self.values
+            or self.date_ranges
+            or self.overdue
+            or self.equals
+            or self.sort != DEFAULT_SORT
+        )
+
+    def __eq__(self, other):
+        return isinstance(other, TicketFilter) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __repr__(self):
+        return f"TicketFilter{self.key()!r}"
+
+    def key(self):
+        """
+        Khóa có thể hash (dùng cho cache truy vấn và nhận biết bộ lọc đổi)
+
+        Returns:
+            tuple: Mô tả đầy đủ bộ lọc
+        """
+        return (
+            tuple(sorted(self.values.items())),
+            tuple(
+                (column, start and start.isoformat(), end and end.isoformat())
+                for column, (start, end) in sorted(self.date_ranges.items())
+            ),
+            # Quá hạn phụ thuộc ngày hiện tại
+            date.today().isoformat() if self.overdue else None,
+            tuple(sorted(self.equals.items())),
+            self.sort,
+        )
+
+    def apply(self, query):
+        """
+        Thêm các điều kiện lọc vào query builder của PostgREST
+
+        Args:
+            query: Query builder của Supabase
+
+        Returns:
+            Query builder đã áp dụng filter
+        """
+        for column, value in self.equals.items():
+            query = query.eq(column, value)
+
+        for column, accepted in self.values.items():
+            if len(accepted) == 1:
+                query = query.eq(column, accepted[0])
+            else:
+                query = query.in_(column, list(accepted))
+
+        for column, (start, end) in self.date_ranges.items():
+            if start:
+                query = query.gte(column, start.isoformat())
+            if end:
+                if column == "ngay_yeu_cau":
+                    # Cột timestamp: lấy hết ngày cuối
+                    query = query.lt(column, (end + timedelta(days=1)).isoformat())
+                else:
+                    query = query.lte(column, end.isoformat())
+
+        if self.overdue:
+            query = query.lt("thoi_han_mong_muon", date.today().isoformat())
+            # trang_thai NULL vẫn là ticket còn mở (giống is_overdue và
+            # migrations/0011_overdue_null_status.sql)
+            closed = ",".join(f'"{status}"' for status in CLOSED_STATUSES)
+            query = query.or_(f"trang_thai.is.null,trang_thai.not.in.({closed})")
+        return query
+
+    def apply_order(self, query):
+        """
+        Thêm thứ tự sắp xếp (kèm id để các trang không trùng/lệch dòng)
+
+        Args:
+            query: Query builder của Supabase
+
+        Returns:
+            Query builder đã sắp xếp
+        """
+        column, descending = self.sort
+        if column != "id":
+            query = query.order(column, desc=descending, nullsfirst=False)
+        return query.order("id", desc=descending)
+
+    def rpc_params(self):
+        """
+        Tham số bộ lọc cho các hàm RPC (get_ticket_stats, search_tickets)
+
+        Điều kiện bằng khác (equals) không được RPC hỗ trợ và bị bỏ qua.
+
+        Returns:
+            dict: p_<cột> (mảng hoặc None), p_<cột>_from/_to, p_overdue
+        """
+        params = {
+            f"p_{column}": list(self.values[column]) if column in self.values else None
+            for column in TICKET_FILTER_COLUMNS
+        }
+        for column in TICKET_DATE_RANGE_COLUMNS:
+            start, end = self.date_ranges.get(column, (None, None))
+            params[f"p_{column}_from"] = start.isoformat() if start else None
+            params[f"p_{column}_to"] = end.isoformat() if end else None
+        params["p_overdue"] = self.overdue
+        return params
+
+    def matches(self, ticket, today=None):
+        """
+        Kiểm tra một ticket đã chuẩn hóa có khớp bộ lọc không (snapshot cục bộ)
+
+        Args:
+            ticket (dict): Ticket có các cột <cột>_date của ticket_normalize
+            today (date): Ngày dùng để tính quá hạn (mặc định: hôm nay)
+
+        Returns:
+            bool: True nếu khớp
+        """
+        for column, value in self.equals.items():
+            if ticket.get(column) != value:
+                return False
+        for column, accepted in self.values.items():
+            if ticket.get(column) not in accepted:
+                return False
+        for column, (start, end) in self.date_ranges.items():
+            day = ticket.get(f"{column}_date")
+            if day is None or (start and day < start) or (end and day > end):
+                return False
+        if self.overdue and not is_overdue(ticket, today):
+            return False
+        return True
+
+    def sort_rows(self, tickets):
+        """
+        Sắp xếp tickets đã chuẩn hóa giống apply_order (NULL xếp cuối)
+
+        Returns:
+            list: Danh sách mới đã sắp xếp
+        """
+        column, descending = self.sort
+        rows = sorted(tickets, key=lambda t: t.get("id") or 0, reverse=descending)
+        if column == "id":
+            return rows
+        field = f"{column}_date" if column != "ngay_yeu_cau" else column
+        present = [t for t in rows if t.get(field) is not None]
+        missing = [t for t in rows if t.get(field) is None]
+        present.sort(key=lambda t: str(t[field]), reverse=descending)
+        return present + missing
+
+    def sql_where(self, today=None, alias=""):
+        """
+        Dịch bộ lọc thành điều kiện WHERE của SQLite (bản sao ticket_replica)
+
+        Cột ngày được so sánh theo 10 ký tự đầu (YYYY-MM-DD), giống matches().
+
+        Args:
+            today (date): Ngày dùng để tính quá hạn (mặc định: hôm nay)
+            alias (str): Tiền tố bảng của các cột (vd. "t.")
+
+        Returns:
+            tuple: (điều kiện SQL, danh sách tham số); điều kiện "1" nếu không lọc
+
+        Raises:
+            ValueError: Tên cột của equals không hợp lệ
+        """
+        clauses, params = [], []
+        for column, value in self.equals.items():
+            if not column.isidentifier():
+                raise ValueError(f"Không lọc được theo cột {column}")
+            clauses.append(f"{alias}{column} = ?")
+            params.append(value)
+        for column, accepted in self.values.items():
+            clauses.append(
+                f"{alias}{column} IN ({', '.join('?' * len(accepted))})"
+            )
+            params.extend(accepted)
+        for column, (start, end) in self.date_ranges.items():
+            day = f"substr({alias}{column}, 1, 10)"
+            clauses.append(f"{alias}{column} IS NOT NULL")
+            if start:
+                clauses.append(f"{day} >= ?")
+                params.append(start.isoformat())
+            if end:
+                clauses.append(f"{day} <= ?")
+                params.append(end.isoformat())
+        if self.overdue:
+            clauses.append(
+                f"substr({alias}thoi_han_mong_muon, 1, 10) < ? "
+                f"AND coalesce({alias}trang_thai, '') NOT IN "
+                f"({', '.join('?' * len(CLOSED_STATUSES))})"
+            )
+            params.append((today or date.today()).isoformat())
+            params.extend(CLOSED_STATUSES)
+        return " AND ".join(clauses) or "1", params
+
+    def sql_order(self, alias=""):
+        """
+        Dịch thứ tự sắp xếp thành ORDER BY của SQLite (giống apply_order)
+
+        Returns:
+            str: Biểu thức ORDER BY (NULL xếp cuối, kèm id)
+        """
+        column, descending = self.sort
+        direction = "DESC" if descending else "ASC"
+        order = f"{alias}id {direction}"
+        if column != "id":
+            order = (
+                f"{alias}{column} IS NULL, {alias}{column} {direction}, " + order
+            )
+        return order
@@ -0,0 +1,146 @@
+"""
+Chuẩn hóa tickets ngay khi lấy ra từ SupabaseHelper
+
+Các cột ngày được parse đúng một lần (đường nhanh date.fromisoformat, nhớ kết
+quả theo từng chuỗi ngày khác nhau), kèm các cột suy ra để phần hiển thị
+không phải parse lại ngày:
+
+    - <cột>_date: đối tượng date của ngay_yeu_cau, thoi_han_mong_muon,
+      ngay_hoan_thanh, created_at, updated_at
+    - so_ngay_hoan_thanh: số ngày từ ngày tạo tới ngày hoàn thành (không âm)
+    - qua_han: đã quá thời hạn mong muốn mà chưa hoàn thành/hủy (tại lúc
+      chuẩn hóa; snapshot giữ dòng qua nhiều ngày nên phần hiển thị và bộ lọc
+      tính lại bằng is_overdue())
+
+Cột nhúng nguoi_tao ({"full_name": ...} của embedded select) được làm phẳng
+thành chuỗi tên người tạo.
+
+Các cột suy ra chỉ dùng để đọc, không bao giờ được ghi ngược lên database.
+"""
+
+from datetime import date
+from functools import lru_cache
+
+TICKET_DATE_FIELDS = (
+    "ngay_yeu_cau",
+    "thoi_han_mong_muon",
+    "ngay_hoan_thanh",
+    "created_at",
+    "updated_at",
+)
+
+# Trạng thái không còn tính quá hạn
+CLOSED_STATUSES = ("Hoàn thành", "Hủy bỏ")
+
+DERIVED_FIELDS = tuple(f"{field}_date" for field in TICKET_DATE_FIELDS) + (
+    "so_ngay_hoan_thanh",
+    "qua_han",
+)
+
+
+@lru_cache(maxsize=8192)
+def _parse_iso_date(day):
+    """Parse chuỗi YYYY-MM-DD (được nhớ theo từng ngày khác nhau)"""
+    try:
+        return date.fromisoformat(day)
+    except ValueError:
+        return None
+
+
+def parse_date(value):
+    """
+    Chuyển giá trị ngày/timestamp từ Supabase thành date
+
+    Args:
+        value: Chuỗi ISO (ngày hoặc timestamp), date hoặc None
+
+    Returns:
+        date: Ngày tương ứng, hoặc None nếu không hợp lệ
+    """
+    if not value:
+        return None
+    if isinstance(value, date):
+        return value if type(value) is date else value.date()
+    return _parse_iso_date(str(value).strip()[:10])
+
+
+def normalize_ticket(ticket, today=None):
+    """
+    Thêm các cột ngày đã parse và cột suy ra vào một ticket (sửa tại chỗ)
+
+    Args:
+        ticket (dict): Ticket lấy từ Supabase
+        today (date): Ngày dùng để tính quá hạn (mặc định: hôm nay)
+
+    Returns:
+        dict: Chính ticket đó
+    """
+    for field in TICKET_DATE_FIELDS:
+        if field in ticket:
+            ticket[f"{field}_date"] = parse_date(ticket[field])
+
+    if "ngay_yeu_cau" in ticket and "ngay_hoan_thanh" in ticket:
+        created = ticket["ngay_yeu_cau_date"]
+        completed = ticket["ngay_hoan_thanh_date"]
+        ticket["so_ngay_hoan_thanh"] = (
+            max(0, (completed - created).days) if created and completed else None
+        )
+
+    if "thoi_han_mong_muon" in ticket and "trang_thai" in ticket:
+        ticket["qua_han"] = is_overdue(ticket, today)
+
+    creator = ticket.get("nguoi_tao")
+    if isinstance(creator, dict):
+        ticket["nguoi_tao"] = creator.get("full_name")
+
+    return ticket
+
+
+def is_overdue(ticket, today=None):
+    """
+    Kiểm tra ticket đã quá thời hạn mong muốn mà chưa hoàn thành/hủy
+
+    Args:
+        ticket (dict): Ticket đã chuẩn hóa (cần thoi_han_mong_muon_date)
+        today (date): Ngày dùng để so sánh (mặc định: hôm nay)
+
+    Returns:
+        bool: True nếu quá hạn
+    """
+    deadline = ticket.get("thoi_han_mong_muon_date")
+    return bool(
+        deadline
+        and deadline < (today or date.today())
+        and ticket.get("trang_thai") not in CLOSED_STATUSES
+    )
+
+
+def normalize_tickets(tickets, today=None):
+    """
+    Chuẩn hóa danh sách tickets (sửa tại chỗ)
+
+    Args:
+        tickets (list): Danh sách tickets
+        today (date): Ngày dùng để tính quá hạn (mặc định: hôm nay)
+
+    Returns:
+        list: Chính danh sách đó
+    """
+    today = today or date.today()
+    for ticket in tickets or []:
+        if isinstance(ticket, dict):
+            normalize_ticket(ticket, today)
+    return tickets
+
+
+def strip_derived_fields(ticket):
+    """
+    Bỏ các cột suy ra trước khi ghi/xuất dữ liệu
+
+    Args:
+        ticket (dict): Ticket đã chuẩn hóa
+
+    Returns:
+        dict: Bản sao chỉ gồm các cột gốc
+    """
+    return {key: value for key, value in ticket.items() if key not in DERIVED_FIELDS}
@@ -0,0 +1,534 @@
+"""
+Bản sao SQLite cục bộ của tickets và users (chế độ read replica)
+
+Bộ dữ liệu tickets đủ nhỏ để giữ trọn trong mỗi process, nên thay vì hỏi
+Supabase ở mỗi lần rerun, process giữ một bản sao SQLite (mặc định trong bộ
+nhớ) và đọc mọi thứ từ đó:
+    - danh sách, bộ lọc và phân trang: TicketFilter.sql_where()/sql_order()
+    - thống kê: GROUP BY trong SQLite (cùng định dạng get_ticket_stats)
+    - tìm kiếm: bảng FTS5 trên nội dung + ghi chú đã bỏ dấu (khớp tiền tố
+      từng từ, xếp theo bm25)
+    - tên người tạo: JOIN với bảng users của bản sao
+
+Bản sao được đồng bộ delta giống TicketSnapshot (watermark updated_at và
+ticket_tombstones), nhưng bởi một thread nền: lần sync đầu tiên chạy đồng bộ,
+sau đó thread tự đồng bộ mỗi REPLICA_SYNC_INTERVAL giây hoặc ngay khi có
+thao tác ghi (mark_stale). Thao tác ghi vẫn đi qua SupabaseHelper; dòng
+Supabase trả về được áp dụng ngay vào bản sao khi ghi thành công (không đẩy
+watermark, để lần sync sau vẫn tải các thay đổi từ replica khác).
+
+Bật bằng biến môi trường TICKET_SYNC_MODE=replica.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from datetime import date
+
+from database import (
+    SEARCH_LIMIT,
+    SupabaseHelper,
+    TICKET_PREVIEW_LENGTHS,
+    add_ticket_previews,
+    add_write_listener,
+)
+from ticket_filter import TicketFilter
+from ticket_normalize import normalize_ticket
+from ticket_sync import SNAPSHOT_COLUMN_NAMES, SnapshotScope, TicketSnapshot
+
+# File SQLite của bản sao (":memory:" = chỉ trong bộ nhớ, tải lại khi khởi động)
+REPLICA_DB_PATH = os.getenv("REPLICA_DB_PATH", ":memory:")
+
+# Chu kỳ đồng bộ của thread nền (giây)
+REPLICA_SYNC_INTERVAL = float(os.getenv("REPLICA_SYNC_INTERVAL", "5"))
+
+# Các cột của tickets được giữ trong bản sao (nội dung đầy đủ cho tìm kiếm)
+REPLICA_COLUMNS = (
+    "id",
+    "project",
+    "phan_loai",
+    "nen_tang",
+    "uu_tien",
+    "trang_thai",
+    "thoi_han_mong_muon",
+    "ngay_yeu_cau",
+    "ngay_hoan_thanh",
+    "noi_dung",
+    "ghi_chu",
+    "created_by",
+    "updated_at",
+)
+PREVIEW_COLUMNS = tuple(f"{column}_preview" for column in TICKET_PREVIEW_LENGTHS)
+REPLICA_SYNC_COLUMNS = ", ".join(REPLICA_COLUMNS)
+
+# Trạng thái tính số ngày hoàn thành (giống ticket_analytics, không import pandas)
+COMPLETED_STATUS = "Hoàn thành"
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS tickets (id INTEGER PRIMARY KEY, "
+    + ", ".join(f"{column} TEXT" for column in REPLICA_COLUMNS[1:] + PREVIEW_COLUMNS)
+    + ")",
+    "CREATE INDEX IF NOT EXISTS idx_tickets_project_ngay_yeu_cau "
+    "ON tickets (project, ngay_yeu_cau DESC, id DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_tickets_ngay_yeu_cau "
+    "ON tickets (ngay_yeu_cau DESC, id DESC)",
+    "CREATE TABLE IF NOT EXISTS users (id INTEGER PRIMARY KEY, full_name TEXT)",
+    # rowid = id của ticket, content = nội dung + ghi chú đã bỏ dấu
+    "CREATE VIRTUAL TABLE IF NOT EXISTS tickets_fts USING fts5(content)",
+    "CREATE TABLE IF NOT EXISTS replica_meta (key TEXT PRIMARY KEY, value TEXT)",
+]
+
+
+def unaccent(text):
+    """Bỏ dấu tiếng Việt và chuyển chữ thường (giống f_unaccent + lower trong SQL)"""
+    text = (text or "").replace("đ", "d").replace("Đ", "D")
+    text = unicodedata.normalize("NFD", text)
+    return "".join(char for char in text if not unicodedata.combining(char)).lower()
+
+
+def fts_query(query):
+    """
+    Chuyển chuỗi tìm kiếm thành truy vấn FTS5 (mọi từ, khớp tiền tố)
+
+    Returns:
+        str: Truy vấn MATCH, None nếu không có từ nào
+    """
+    words = [word for word in re.split(r"[^0-9a-z]+", unaccent(query)) if word]
+    return " ".join(f'"{word}"*' for word in words) or None
+
+
+def _select_list():
+    """Các cột trả về giống snapshot (nguoi_tao lấy từ bảng users)"""
+    return ", ".join(
+        "u.full_name AS nguoi_tao" if column == "nguoi_tao" else f"t.{column}"
+        for column in SNAPSHOT_COLUMN_NAMES
+    )
+
+
+class TicketReplica(TicketSnapshot):
+    columns = REPLICA_SYNC_COLUMNS
+    supports_search = True
+
+    def __init__(self, path=REPLICA_DB_PATH, interval=REPLICA_SYNC_INTERVAL):
+        """
+        Args:
+            path (str): File SQLite của bản sao (":memory:" = trong bộ nhớ)
+            interval (float): Chu kỳ đồng bộ của thread nền (giây)
+        """
+        super().__init__(project=None)
+        self.path = path
+        self.interval = interval
+        self.last_error = None
+        self._user_names = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        # self._lock (của TicketSnapshot) chỉ giữ một lần sync tại một thời
+        # điểm; đọc/ghi SQLite dùng khóa riêng nên không phải chờ Supabase
+        self._db_lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            for statement in SCHEMA:
+                self._conn.execute(statement)
+        self._load_meta()
+
+    def _load_meta(self):
+        """Đọc watermark đã lưu (file SQLite: tiếp tục đồng bộ delta sau khởi động)"""
+        meta = dict(self._conn.execute("SELECT key, value FROM replica_meta"))
+        self.watermark = meta.get("watermark")
+        self.tombstone_watermark = meta.get("tombstone_watermark")
+
+    def _save_meta(self):
+        with self._db_lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO replica_meta (key, value) VALUES (?, ?)",
+                [
+                    ("watermark", self.watermark),
+                    ("tombstone_watermark", self.tombstone_watermark),
+                ],
+            )
+
+    def scope(self, project=None):
+        """
+        Lấy phạm vi một project của bản sao (cùng giao diện TicketSnapshot)
+
+        Returns:
+            ReplicaScope: Phạm vi project (None = tất cả project)
+        """
+        return ReplicaScope(self, project)
+
+    def mark_stale(self):
+        """Đánh thức thread nền để đồng bộ ngay"""
+        super().mark_stale()
+        self._wake.set()
+
+    def sync(self, db, force=False):
+        """
+        Lần đầu: đồng bộ ngay rồi khởi động thread nền. Các lần sau không gửi
+        request nào (thread nền lo việc đồng bộ)
+
+        Args:
+            db (SupabaseHelper): Database helper (chỉ dùng cho lần đầu)
+            force (bool): Đánh thức thread nền để đồng bộ ngay
+
+        Returns:
+            bool: True nếu lần đồng bộ gần nhất thành công
+        """
+        with self._start_lock:
+            if self._thread is None:
+                ok = self.refresh(db)
+                self._thread = threading.Thread(
+                    target=self._run, name="ticket-replica-sync", daemon=True
+                )
+                self._thread.start()
+                return ok
+        if force:
+            self._wake.set()
+        return self.last_error is None
+
+    def refresh(self, db):
+        """
+        Đồng bộ bản sao với Supabase một lần (users, tickets, tickets đã xóa)
+
+        Args:
+            db (SupabaseHelper): Database helper
+
+        Returns:
+            bool: True nếu đồng bộ thành công
+        """
+        try:
+            self._sync_users(db)
+            ok = TicketSnapshot.sync(self, db, force=True)
+            self.last_error = None if ok else "Không đồng bộ được tickets"
+        except Exception as e:
+            ok = False
+            self.last_error = str(e)
+        if ok:
+            self._save_meta()
+        return ok
+
+    def close(self):
+        """Dừng thread nền"""
+        self._stopped.set()
+        self._wake.set()
+
+    def _run(self):
+        """Vòng lặp của thread nền"""
+        db = SupabaseHelper()
+        while not self._stopped.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if not self._stopped.is_set():
+                self.refresh(db)
+
+    def _sync_users(self, db):
+        """Thay bảng users của bản sao khi danh bạ users thay đổi"""
+        names = db.get_user_names()
+        # {} = lỗi (đã báo bởi get_user_names) -> giữ danh bạ cũ
+        if not names or names == self._user_names:
+            return
+        with self._db_lock, self._conn:
+            self._conn.execute("DELETE FROM users")
+            self._conn.executemany(
+                "INSERT INTO users (id, full_name) VALUES (?, ?)", names.items()
+            )
+        self._user_names = names
+        self._bump()
+
+    def apply_upsert(self, rows, advance_watermark=True):
+        """
+        Thêm hoặc cập nhật tickets trong bản sao (dòng thiếu cột giữ giá trị cũ)
+
+        Args:
+            rows (list): Các tickets mới/đã sửa
+            advance_watermark (bool): Đẩy watermark theo updated_at của các dòng
+        """
+        self._upsert(rows, advance_watermark)
+
+    def apply_records(self, records):
+        """
+        Áp dụng các dòng đầy đủ từ write response hoặc change feed
+
+        Watermark không đổi: các thay đổi cũ hơn từ replica khác có thể chưa
+        được tải, chỉ sync() mới được đẩy watermark lên. Thread nền được đánh
+        thức để đồng bộ ngay.
+
+        Args:
+            records (list): Tickets đầy đủ các cột
+        """
+        self._upsert(records, advance_watermark=False)
+        self.mark_stale()
+
+    def _upsert(self, rows, advance_watermark):
+        groups = {}
+        for row in rows or []:
+            if row.get("id") is None:
+                continue
+            row = {column: row[column] for column in REPLICA_COLUMNS if column in row}
+            if "noi_dung" in row or "ghi_chu" in row:
+                add_ticket_previews([row])
+            groups.setdefault(tuple(row), []).append(row)
+        if not groups:
+            return
+
+        with self._db_lock:
+            with self._conn:
+                for columns, group in groups.items():
+                    updates = ", ".join(
+                        f"{column} = excluded.{column}" for column in columns[1:]
+                    ) or "id = excluded.id"
+                    self._conn.executemany(
+                        f"INSERT INTO tickets ({', '.join(columns)}) "
+                        f"VALUES ({', '.join('?' * len(columns))}) "
+                        f"ON CONFLICT (id) DO UPDATE SET {updates}",
+                        [tuple(row[column] for column in columns) for row in group],
+                    )
+                    if "noi_dung" in columns or "ghi_chu" in columns:
+                        self._index_search([row["id"] for row in group])
+
+            if advance_watermark:
+                stamps = [
+                    row["updated_at"]
+                    for group in groups.values()
+                    for row in group
+                    if row.get("updated_at")
+                ]
+                if stamps and (not self.watermark or max(stamps) > self.watermark):
+                    self.watermark = max(stamps)
+            self._bump()
+
+    def _index_search(self, ticket_ids):
+        """Cập nhật bảng FTS5 của các tickets (nội dung + ghi chú đã bỏ dấu)"""
+        rows = []
+        for ticket_id in ticket_ids:
+            row = self._conn.execute(
+                "SELECT noi_dung, ghi_chu FROM tickets WHERE id = ?", (ticket_id,)
+            ).fetchone()
+            rows.append((ticket_id, unaccent(" ".join(filter(None, row)))))
+        self._conn.executemany(
+            "DELETE FROM tickets_fts WHERE rowid = ?", [(row[0],) for row in rows]
+        )
+        self._conn.executemany(
+            "INSERT INTO tickets_fts (rowid, content) VALUES (?, ?)", rows
+        )
+
+    def apply_delete(self, ticket_ids):
+        """
+        Xóa các tickets khỏi bản sao
+
+        Args:
+            ticket_ids (list): ID các tickets đã bị xóa
+        """
+        params = [(ticket_id,) for ticket_id in ticket_ids or [] if ticket_id]
+        if not params:
+            return
+        with self._db_lock:
+            with self._conn:
+                cursor = self._conn.executemany(
+                    "DELETE FROM tickets WHERE id = ?", params
+                )
+                self._conn.executemany(
+                    "DELETE FROM tickets_fts WHERE rowid = ?", params
+                )
+            if cursor.rowcount:
+                self._bump()
+
+    def apply_users(self, rows):
+        """
+        Thêm hoặc cập nhật users trong bản sao (write response của bảng users)
+
+        Args:
+            rows (list): Các users mới/đã sửa
+        """
+        params = [
+            (row["id"], row.get("full_name") or row.get("username"))
+            for row in rows or []
+            if row.get("id") is not None
+        ]
+        if not params:
+            return
+        with self._db_lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO users (id, full_name) VALUES (?, ?)",
+                    params,
+                )
+            self._user_names = None
+            self._bump()
+
+    def _where(self, filters, project, today):
+        """Điều kiện WHERE của bộ lọc và phạm vi project"""
+        ticket_filter = TicketFilter.from_dict(filters)
+        where, params = ticket_filter.sql_where(today, alias="t.")
+        if project:
+            where += " AND t.project = ?"
+            params.append(project)
+        return ticket_filter, where, params
+
+    def _fetch(self, sql, params, today):
+        """Chạy câu SELECT và trả về các tickets đã chuẩn hóa"""
+        with self._db_lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            normalize_ticket(dict(zip(SNAPSHOT_COLUMN_NAMES, row)), today)
+            for row in rows
+        ]
+
+    def select(self, filters=None, project=None):
+        """
+        Lọc tickets trong bản sao theo thứ tự của danh sách
+
+        Args:
+            filters (dict | TicketFilter): Các filter (dict = lọc bằng)
+            project (str): Project cần lọc (None = tất cả project)
+
+        Returns:
+            list: Danh sách tickets đã lọc
+        """
+        today = date.today()
+        ticket_filter, where, params = self._where(filters, project, today)
+        return self._fetch(
+            f"SELECT {_select_list()} FROM tickets t "
+            "LEFT JOIN users u ON u.id = t.created_by "
+            f"WHERE {where} ORDER BY {ticket_filter.sql_order('t.')}",
+            params,
+            today,
+        )
+
+    def query_page(self, filters=None, page=0, page_size=50, project=None):
+        """
+        Lấy một trang tickets (cùng định dạng select_tickets_page)
+
+        Returns:
+            dict: {"data": list, "total": int, "page": int, "page_size": int}
+        """
+        today = date.today()
+        ticket_filter, where, params = self._where(filters, project, today)
+        page_size = max(1, int(page_size))
+        with self._db_lock:
+            (total,) = self._conn.execute(
+                f"SELECT count(*) FROM tickets t WHERE {where}", params
+            ).fetchone()
+            last_page = max(0, (total - 1) // page_size)
+            page = min(max(0, int(page)), last_page)
+            data = self._fetch(
+                f"SELECT {_select_list()} FROM tickets t "
+                "LEFT JOIN users u ON u.id = t.created_by "
+                f"WHERE {where} ORDER BY {ticket_filter.sql_order('t.')} "
+                "LIMIT ? OFFSET ?",
+                params + [page_size, page * page_size],
+                today,
+            )
+        return {"data": data, "total": total, "page": page, "page_size": page_size}
+
+    def stats(self, filters=None, project=None):
+        """
+        Tính thống kê trong SQLite (cùng định dạng get_ticket_stats)
+
+        Returns:
+            dict: {"total": int, "by_status": dict, "avg_completion_days": float hoặc None}
+        """
+        _, where, params = self._where(filters, project, date.today())
+        days = (
+            "max(0, CAST(julianday(substr(t.ngay_hoan_thanh, 1, 10)) "
+            "- julianday(substr(t.ngay_yeu_cau, 1, 10)) AS INTEGER))"
+        )
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT coalesce(t.trang_thai, '') AS status, count(*), "
+                f"sum(CASE WHEN t.trang_thai = ? THEN {days} END), "
+                f"count(CASE WHEN t.trang_thai = ? THEN {days} END) "
+                f"FROM tickets t WHERE {where} "
+                "GROUP BY status ORDER BY count(*) DESC",
+                [COMPLETED_STATUS, COMPLETED_STATUS] + params,
+            ).fetchall()
+
+        total_days = sum(row[2] or 0 for row in rows)
+        completed = sum(row[3] for row in rows)
+        return {
+            "total": sum(row[1] for row in rows),
+            "by_status": {row[0]: row[1] for row in rows},
+            "avg_completion_days": (
+                round(total_days / completed, 1) if completed else None
+            ),
+        }
+
+    def search(self, query, filters=None, limit=SEARCH_LIMIT, project=None):
+        """
+        Tìm tickets theo nội dung và ghi chú (FTS5, giống search_tickets)
+
+        Không phân biệt dấu, khớp tiền tố từng từ, liên quan nhất trước.
+
+        Args:
+            query (str): Chuỗi cần tìm
+            filters (dict | TicketFilter): Các filter bổ sung
+            limit (int): Số kết quả tối đa
+            project (str): Project cần lọc (None = tất cả project)
+
+        Returns:
+            list: Danh sách tickets, liên quan nhất trước
+        """
+        match = fts_query(query)
+        if match is None:
+            return []
+        today = date.today()
+        _, where, params = self._where(filters, project, today)
+        return self._fetch(
+            f"SELECT {_select_list()} FROM tickets_fts "
+            "JOIN tickets t ON t.id = tickets_fts.rowid "
+            "LEFT JOIN users u ON u.id = t.created_by "
+            f"WHERE tickets_fts MATCH ? AND {where} "
+            "ORDER BY bm25(tickets_fts), t.ngay_yeu_cau DESC, t.id DESC LIMIT ?",
+            [match] + params + [limit],
+            today,
+        )
+
+
+class ReplicaScope(SnapshotScope):
+    """Phạm vi một project của TicketReplica (thêm tìm kiếm trong bản sao)"""
+
+    def search(self, query, filters=None, limit=SEARCH_LIMIT):
+        return self.snapshot.search(query, filters, limit, self.project)
+
+
+_replica = None
+_replica_lock = threading.Lock()
+
+
+def get_ticket_replica(create=True):
+    """
+    Lấy bản sao dùng chung trong process
+
+    Args:
+        create (bool): Tạo bản sao nếu chưa có
+
+    Returns:
+        TicketReplica: Bản sao của process (None nếu chưa có và create=False)
+    """
+    global _replica
+    with _replica_lock:
+        if _replica is None and create:
+            _replica = TicketReplica()
+        return _replica
+
+
+def _on_write(table_name, operation, rows, projects):
+    """Áp dụng ngay dòng Supabase trả về sau khi ghi thành công"""
+    replica = get_ticket_replica(create=False)
+    if replica is None:
+        return
+    if table_name == "tickets":
+        if operation == "delete":
+            replica.apply_delete([row.get("id") for row in rows])
+        else:
+            replica.apply_records(rows)
+    elif table_name == "users" and operation != "delete":
+        replica.apply_users(rows)
+
+
+add_write_listener(_on_write)
@@ -0,0 +1,401 @@
+"""
+Đồng bộ delta tickets theo watermark updated_at
+
+Mỗi process giữ một snapshot tickets của tất cả project; phạm vi một project
+(SnapshotScope) chỉ lọc snapshot đó, nên ticket chuyển project không bị kẹt
+lại trong phạm vi cũ. Mỗi lần đồng bộ chỉ hỏi Supabase các dòng có updated_at
+mới hơn watermark và các tombstone (tickets đã xóa, xem
+migrations/0003_ticket_sync.sql), nên các lần rerun chỉ truyền những dòng thay
+đổi thay vì toàn bộ bảng.
+
+Các dòng trong snapshot dùng chung giữa các session: select()/query_page()
+trả về bản sao để session sửa dòng (gắn tên người tạo, ...) không ảnh hưởng
+snapshot.
+
+Bật bằng biến môi trường TICKET_SYNC_MODE=delta. Với TICKET_SYNC_MODE=replica,
+các snapshot được thay bằng bản sao SQLite dùng chung (ticket_replica.py).
+"""
+
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+
+from database import (
+    TICKET_VIEW_COLUMNS,
+    add_ticket_previews,
+    add_write_listener,
+    column_names,
+    compute_ticket_stats,
+)
+from ticket_filter import DEFAULT_SORT, TicketFilter
+from ticket_normalize import normalize_ticket
+
+SYNC_MODE = os.getenv("TICKET_SYNC_MODE", "query").lower()
+
+# Khoảng thời gian tối thiểu giữa hai lần hỏi Supabase (giây)
+SYNC_MIN_INTERVAL = float(os.getenv("TICKET_SYNC_MIN_INTERVAL", "2"))
+
+# Lùi watermark một chút để không bỏ sót transaction commit trễ (giây)
+SYNC_OVERLAP_SECONDS = 5
+
+# Snapshot chỉ giữ các cột của danh sách + updated_at để tính watermark
+SNAPSHOT_COLUMNS = TICKET_VIEW_COLUMNS["list"] + ", updated_at"
+SNAPSHOT_COLUMN_NAMES = column_names(SNAPSHOT_COLUMNS)
+
+
+def is_delta_sync_enabled():
+    """Kiểm tra chế độ đồng bộ delta (snapshot hoặc bản sao SQLite) có được bật không"""
+    return SYNC_MODE in ("delta", "replica")
+
+
+def is_replica_enabled():
+    """Kiểm tra chế độ bản sao SQLite (ticket_replica) có được bật không"""
+    return SYNC_MODE == "replica"
+
+
+def _rewind(watermark):
+    """Lùi watermark SYNC_OVERLAP_SECONDS giây (trả về chuỗi ISO)"""
+    if not watermark:
+        return None
+    try:
+        moment = datetime.fromisoformat(watermark.replace("Z", "+00:00"))
+    except ValueError:
+        return watermark
+    return (moment - timedelta(seconds=SYNC_OVERLAP_SECONDS)).isoformat()
+
+
+def _sort_key(ticket):
+    """Thứ tự giống select_tickets_page: ngay_yeu_cau giảm dần, rồi id giảm dần"""
+    return (str(ticket.get("ngay_yeu_cau") or ""), ticket.get("id") or 0)
+
+
+class TicketSnapshot:
+    # Cột lấy từ Supabase khi đồng bộ
+    columns = SNAPSHOT_COLUMNS
+
+    # Tìm kiếm vẫn dùng search_tickets của Supabase
+    supports_search = False
+
+    def __init__(self, project=None):
+        """
+        Args:
+            project (str): Phạm vi project của snapshot (None = tất cả project)
+        """
+        self.project = project
+        self.rows = {}
+        self.watermark = None
+        self.tombstone_watermark = None
+        self.version = 0
+        self.last_sync_at = 0.0
+        self.last_sync_stats = {"changed": 0, "deleted": 0, "full": False}
+        self._stale = True
+        self._sorted_ids = None
+        self._lock = threading.RLock()
+
+    def mark_stale(self):
+        """Buộc lần sync tiếp theo hỏi Supabase ngay (bỏ qua SYNC_MIN_INTERVAL)"""
+        self._stale = True
+
+    def sync(self, db, force=False):
+        """
+        Đồng bộ snapshot với Supabase
+
+        Args:
+            db (SupabaseHelper): Database helper
+            force (bool): Bỏ qua giới hạn SYNC_MIN_INTERVAL
+
+        Returns:
+            bool: True nếu đồng bộ thành công (hoặc chưa cần đồng bộ)
+        """
+        with self._lock:
+            elapsed = time.monotonic() - self.last_sync_at
+            if not force and not self._stale and elapsed < SYNC_MIN_INTERVAL:
+                return True
+
+            full_sync = self.watermark is None
+            changed = db.select_tickets_changed_since(
+                self.project, _rewind(self.watermark), self.columns
+            )
+            if changed is None:
+                return False
+
+            deleted = []
+            if not full_sync:
+                deleted = db.select_ticket_tombstones_since(
+                    self.project, _rewind(self.tombstone_watermark)
+                )
+                if deleted is None:
+                    return False
+
+            self.apply_upsert(changed)
+            self.apply_delete([row.get("ticket_id") for row in deleted])
+
+            # Tombstone trước thời điểm load đầy đủ không còn ý nghĩa
+            timestamps = [row.get("deleted_at") for row in deleted]
+            if full_sync:
+                timestamps.append(datetime.now(timezone.utc).isoformat())
+            if self.tombstone_watermark:
+                timestamps.append(self.tombstone_watermark)
+            timestamps = [t for t in timestamps if t]
+            if timestamps:
+                self.tombstone_watermark = max(timestamps)
+
+            self.last_sync_at = time.monotonic()
+            self.last_sync_stats = {
+                "changed": len(changed),
+                "deleted": len(deleted),
+                "full": full_sync,
+            }
+            self._stale = False
+            return True
+
+    def apply_upsert(self, rows, advance_watermark=True):
+        """
+        Thêm hoặc cập nhật các dòng vào snapshot
+
+        Args:
+            rows (list): Các tickets mới/đã sửa
+            advance_watermark (bool): Đẩy watermark theo updated_at của các dòng
+                (chỉ khi các dòng đến từ sync)
+        """
+        with self._lock:
+            changed = False
+            for row in rows or []:
+                ticket_id = row.get("id")
+                if ticket_id is None:
+                    continue
+                if self.project and row.get("project") not in (None, self.project):
+                    # Ticket đã chuyển sang project khác
+                    changed |= self.rows.pop(ticket_id, None) is not None
+                    continue
+                self.rows[ticket_id] = {**self.rows.get(ticket_id, {}), **row}
+                updated_at = row.get("updated_at")
+                if (
+                    advance_watermark
+                    and updated_at
+                    and (not self.watermark or updated_at > self.watermark)
+                ):
+                    self.watermark = updated_at
+                changed = True
+            if changed:
+                self._bump()
+
+    def apply_records(self, records):
+        """
+        Áp dụng các dòng đầy đủ từ write response hoặc change feed
+
+        Watermark không đổi: các thay đổi cũ hơn của tickets khác có thể chưa
+        được tải, chỉ sync() mới được đẩy watermark lên. Snapshot được đánh dấu
+        cần sync ở lần đọc tới.
+
+        Args:
+            records (list): Tickets đầy đủ các cột
+        """
+        self.apply_upsert(
+            [to_snapshot_row(record) for record in records or []],
+            advance_watermark=False,
+        )
+        self.mark_stale()
+
+    def apply_delete(self, ticket_ids):
+        """
+        Xóa các tickets khỏi snapshot
+
+        Args:
+            ticket_ids (list): ID các tickets đã bị xóa
+        """
+        with self._lock:
+            removed = [
+                ticket_id
+                for ticket_id in ticket_ids or []
+                if self.rows.pop(ticket_id, None) is not None
+            ]
+            if removed:
+                self._bump()
+
+    def _bump(self):
+        """Tăng version khi dữ liệu thay đổi"""
+        self.version += 1
+        self._sorted_ids = None
+
+    def _select(self, filters=None, project=None):
+        """Các dòng khớp bộ lọc theo thứ tự của danh sách (dòng dùng chung)"""
+        ticket_filter = TicketFilter.from_dict(filters)
+        today = date.today()
+        with self._lock:
+            if self._sorted_ids is None:
+                ordered = sorted(self.rows.values(), key=_sort_key, reverse=True)
+                self._sorted_ids = [row["id"] for row in ordered]
+            rows = [
+                row
+                for row in map(self.rows.__getitem__, self._sorted_ids)
+                if (project is None or row.get("project") == project)
+                and ticket_filter.matches(row, today)
+            ]
+        if ticket_filter.sort != DEFAULT_SORT:
+            rows = ticket_filter.sort_rows(rows)
+        return rows
+
+    def select(self, filters=None, project=None):
+        """
+        Lọc tickets trong snapshot theo thứ tự của danh sách
+
+        Args:
+            filters (dict | TicketFilter): Các filter (dict = lọc bằng)
+            project (str): Chỉ lấy tickets của project này (None = tất cả)
+
+        Returns:
+            list: Bản sao các tickets đã lọc
+        """
+        return [dict(row) for row in self._select(filters, project)]
+
+    def query_page(self, filters=None, page=0, page_size=50, project=None):
+        """
+        Lấy một trang tickets từ snapshot (cùng định dạng select_tickets_page)
+
+        Returns:
+            dict: {"data": list, "total": int, "page": int, "page_size": int}
+        """
+        rows = self._select(filters, project)
+        page_size = max(1, int(page_size))
+        last_page = max(0, (len(rows) - 1) // page_size)
+        page = min(max(0, int(page)), last_page)
+        start = page * page_size
+        return {
+            "data": [dict(row) for row in rows[start : start + page_size]],
+            "total": len(rows),
+            "page": page,
+            "page_size": page_size,
+        }
+
+    def stats(self, filters=None, project=None):
+        """
+        Tính thống kê từ snapshot (cùng định dạng get_ticket_stats)
+
+        Returns:
+            dict: {"total": int, "by_status": dict, "avg_completion_days": float hoặc None}
+        """
+        return compute_ticket_stats(self._select(filters, project))
+
+    def scope(self, project=None):
+        """
+        Lấy phạm vi một project của snapshot
+
+        Args:
+            project (str): Project (None = tất cả project)
+
+        Returns:
+            SnapshotScope: Phạm vi chỉ đọc các tickets của project
+        """
+        return SnapshotScope(self, project)
+
+
+class SnapshotScope:
+    """Phạm vi một project của TicketSnapshot (cùng giao diện TicketSnapshot)"""
+
+    def __init__(self, snapshot, project=None):
+        self.snapshot = snapshot
+        self.project = project
+
+    @property
+    def supports_search(self):
+        return self.snapshot.supports_search
+
+    @property
+    def version(self):
+        return self.snapshot.version
+
+    @property
+    def last_sync_stats(self):
+        return self.snapshot.last_sync_stats
+
+    def sync(self, db, force=False):
+        return self.snapshot.sync(db, force)
+
+    def mark_stale(self):
+        self.snapshot.mark_stale()
+
+    def select(self, filters=None):
+        return self.snapshot.select(filters, self.project)
+
+    def query_page(self, filters=None, page=0, page_size=50):
+        return self.snapshot.query_page(filters, page, page_size, self.project)
+
+    def stats(self, filters=None):
+        return self.snapshot.stats(filters, self.project)
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def get_ticket_snapshot(project=None):
+    """
+    Lấy phạm vi một project của snapshot dùng chung trong process
+
+    Args:
+        project (str): Project (None = tất cả project, dành cho admin)
+
+    Returns:
+        SnapshotScope: Phạm vi của project đó (ReplicaScope khi bật bản sao)
+    """
+    global _snapshot
+    if is_replica_enabled():
+        from ticket_replica import get_ticket_replica
+
+        return get_ticket_replica().scope(project)
+
+    with _snapshot_lock:
+        if _snapshot is None:
+            _snapshot = TicketSnapshot()
+        return _snapshot.scope(project)
+
+
+def get_ticket_snapshots(projects=None):
+    """
+    Lấy các snapshot bị ảnh hưởng bởi thay đổi của một số project
+
+    Snapshot chứa tất cả project nên luôn bị ảnh hưởng; tham số projects được
+    giữ để người gọi không cần biết cách chia phạm vi.
+
+    Args:
+        projects (iterable): Các project (None = mọi snapshot)
+
+    Returns:
+        list: Snapshot (hoặc bản sao) của process, rỗng nếu chưa được tạo
+    """
+    if is_replica_enabled():
+        from ticket_replica import get_ticket_replica
+
+        replica = get_ticket_replica(create=False)
+        return [replica] if replica is not None else []
+
+    with _snapshot_lock:
+        return [_snapshot] if _snapshot is not None else []
+
+
+def to_snapshot_row(record):
+    """
+    Chuyển một dòng đầy đủ (từ write response hoặc change feed) về dạng snapshot
+
+    Args:
+        record (dict): Ticket đầy đủ các cột
+
+    Returns:
+        dict: Ticket chỉ gồm các cột của snapshot, có bản preview
+    """
+    row = add_ticket_previews([dict(record)])[0]
+    row = {column: row.get(column) for column in SNAPSHOT_COLUMN_NAMES if column in row}
+    return normalize_ticket(row)
+
+
+def _on_write(table_name, operation, rows, projects):
+    """Sau khi ghi tickets, các snapshot liên quan sẽ sync ngay ở lần rerun tới"""
+    if table_name != "tickets":
+        return
+    for snapshot in get_ticket_snapshots(projects):
+        snapshot.mark_stale()
+
+
+add_write_listener(_on_write)
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Làm nóng process trước khi nhận traffic
+
+Session đầu tiên của một process mới phải chờ import các thư viện nặng
+(pandas, altair), tạo client Supabase (init_connection) và tải trang tickets
+đầu tiên. warm_up() làm trước các việc đó khi server khởi động, trong cùng
+process với Streamlit nên cache_resource, cache truy vấn và snapshot được dùng
+lại cho mọi session.
+
+Sử dụng (thay cho streamlit run app.py):
+    python warmup.py                        # làm nóng rồi chạy streamlit run app.py
+    python warmup.py --server.port 8080     # tham số còn lại được chuyển cho streamlit
+    python warmup.py --no-serve             # chỉ làm nóng và in thời gian từng bước
+
+Dữ liệu trong cache truy vấn hết hạn sau QUERY_CACHE_TTL giây; import, client
+Supabase và snapshot của chế độ đồng bộ delta thì dùng được suốt đời process.
+Với TICKET_SYNC_MODE=replica, bản sao SQLite được tải và thread đồng bộ nền
+được khởi động ngay tại đây.
+"""
+
+import argparse
+import importlib
+import os
+import sys
+import time
+
+from streamlit.logger import set_log_level
+
+from async_database import fetch_concurrently
+from database import (
+    SupabaseHelper,
+    TICKET_PAGE_SIZE,
+    TICKET_VIEW_COLUMNS,
+    is_supabase_configured,
+)
+from ticket_sync import get_ticket_snapshot, is_delta_sync_enabled
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_FILE = os.path.join(ROOT_DIR, "app.py")
+
+# Làm nóng khi chạy bằng python warmup.py (tắt: WARMUP=false)
+WARMUP_ENABLED = os.getenv("WARMUP", "true").lower() in ("1", "true", "yes")
+
+# Các project được tải trước ngoài phạm vi của admin, phân cách bằng dấu phẩy
+WARMUP_PROJECTS = [
+    project.strip()
+    for project in os.getenv("WARMUP_PROJECTS", "").split(",")
+    if project.strip()
+]
+
+# Module được app import khi cần (không import lúc khởi động script)
+LAZY_MODULES = ["pandas", "ticket_analytics", "altair"]
+
+
+def warm_imports():
+    """Import trước các module nặng mà app chỉ import khi cần"""
+    for name in LAZY_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+
+
+def warm_tickets(db, project=None):
+    """
+    Tải trước trang tickets đầu tiên và thống kê của một phạm vi
+
+    Gửi đúng các truy vấn của lần chạy đầu tiên trong app (bộ lọc mặc định,
+    trang 0) để session đầu tiên lấy được từ cache/snapshot.
+
+    Args:
+        db (SupabaseHelper): Database helper
+        project (str): Project (None = tất cả project, như admin)
+    """
+    if is_delta_sync_enabled():
+        get_ticket_snapshot(project).sync(db)
+        return
+
+    calls = {
+        "page": (
+            "select_tickets_page",
+            project,
+            None,
+            0,
+            TICKET_PAGE_SIZE,
+            TICKET_VIEW_COLUMNS["list"],
+        ),
+        "stats": ("get_ticket_stats", project, None),
+    }
+    if project is None:
+        calls["users"] = ("get_all_users",)
+    fetch_concurrently(db, **calls)
+
+
+def warm_up(projects=None):
+    """
+    Làm nóng process: import, client Supabase, trang tickets và thống kê
+
+    Args:
+        projects (list): Project được tải trước ngoài phạm vi của admin
+            (None = WARMUP_PROJECTS)
+
+    Returns:
+        dict: Thời gian (ms) của từng bước; bước lỗi có thêm "<bước>_error"
+    """
+    timings = {}
+
+    def step(name, func, *args):
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        except Exception as e:
+            timings[f"{name}_error"] = str(e)
+        finally:
+            timings[name] = (time.perf_counter() - start) * 1000
+
+    step("imports", warm_imports)
+    if not is_supabase_configured():
+        timings["client_error"] = "Chưa cấu hình SUPABASE_URL và SUPABASE_ANON_KEY"
+        return timings
+
+    db = step("client", SupabaseHelper)
+    if db is None or db.supabase is None:
+        return timings
+
+    for project in [None] + list(WARMUP_PROJECTS if projects is None else projects):
+        step(f"tickets:{project or 'ALL'}", warm_tickets, db, project)
+    return timings
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Làm nóng process rồi chạy streamlit run app.py",
+        epilog="Các tham số khác được chuyển nguyên cho streamlit run",
+    )
+    parser.add_argument(
+        "--no-serve", action="store_true", help="Chỉ làm nóng, không chạy server"
+    )
+    parser.add_argument(
+        "--project",
+        action="append",
+        dest="projects",
+        help="Project cần tải trước (lặp lại được, mặc định: WARMUP_PROJECTS)",
+    )
+    return parser.parse_known_args()
+
+
+def main():
+    args, streamlit_args = parse_args()
+
+    if WARMUP_ENABLED:
+        # Ẩn cảnh báo "missing ScriptRunContext" khi gọi SupabaseHelper ngoài Streamlit
+        set_log_level("error")
+        print("🔥 Đang làm nóng process...")
+        timings = warm_up(args.projects)
+        for name, value in timings.items():
+            if name.endswith("_error"):
+                print(f"   ⚠️ {name[: -len('_error')]}: {value}")
+            else:
+                print(f"   {name:<24} {value:>9.1f} ms")
+        set_log_level("info")
+
+    if args.no_serve:
+        return
+
+    # Chạy Streamlit trong cùng process để dùng lại những gì đã làm nóng
+    from streamlit.web import cli
+
+    sys.argv = ["streamlit", "run", APP_FILE, *streamlit_args]
+    sys.exit(cli.main())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+"""
+Hàng đợi ghi tickets chạy nền (thêm/sửa ticket không chặn lần chạy của script)
+
+Dialog thêm/sửa ticket chỉ đưa thao tác vào hàng đợi rồi đóng ngay; một thread
+nền gửi lần lượt từng thao tác tới Supabase qua SupabaseHelper, nên cache,
+snapshot/bản sao và change feed vẫn được cập nhật như khi ghi trực tiếp.
+Nhiều lần sửa cùng một ticket của cùng một session khi lần trước chưa được gửi
+được gộp thành một request (giá trị sau ghi đè giá trị trước); thao tác của
+các session khác nhau không bao giờ bị gộp, nên kết quả và lỗi luôn về đúng
+session đã gửi.
+
+Thread nền không gọi Streamlit: lỗi của Supabase được lưu nguyên văn vào
+WriteJob.error để session hiển thị khi nhận kết quả.
+
+Trong lúc chờ, danh sách áp dụng các thay đổi đang chờ của session lên các
+dòng đã tải (cập nhật lạc quan, apply_pending). Khi thao tác xong, session nhận
+kết quả qua take_finished(): thành công thì dòng từ Supabase thay cho bản lạc
+quan, lỗi thì bản lạc quan bị bỏ (quay về dữ liệu cũ) kèm thông báo lỗi.
+
+Tắt bằng biến môi trường WRITE_QUEUE=false (ghi trực tiếp như trước).
+"""
+
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from database import SupabaseHelper, add_ticket_previews
+from ticket_normalize import normalize_ticket
+
+WRITE_QUEUE_ENABLED = os.getenv("WRITE_QUEUE", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+# Chu kỳ session kiểm tra các thao tác của mình đã xong chưa (giây)
+WRITE_QUEUE_POLL_SECONDS = float(os.getenv("WRITE_QUEUE_POLL_SECONDS", "1"))
+
+# Kết quả không được session nào nhận (session đã đóng) bị xóa sau (giây)
+JOB_RETENTION_SECONDS = 600
+
+PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+
+
+def is_write_queue_enabled():
+    """Kiểm tra hàng đợi ghi nền có được bật không"""
+    return WRITE_QUEUE_ENABLED
+
+
+class WriteJob:
+    def __init__(self, job_id, operation, data, owner, ticket_id=None, **context):
+        """
+        Args:
+            job_id (int): ID của thao tác trong hàng đợi
+            operation (str): "insert" hoặc "update"
+            data (dict): Dữ liệu ghi (update: các cột cần sửa)
+            owner (str): Session gửi thao tác (nhận kết quả qua take_finished)
+            ticket_id (int): Ticket cần sửa (với update)
+            **context: user_id, project của người tạo (với insert)
+        """
+        self.id = job_id
+        self.operation = operation
+        self.data = dict(data)
+        self.owner = owner
+        self.ticket_id = ticket_id
+        self.context = context
+        self.status = PENDING
+        self.result = None
+        self.error = None
+        self.coalesced = 1
+        self.finished_at = None
+
+    @property
+    def done(self):
+        return self.status in (DONE, FAILED)
+
+    def describe(self):
+        """Mô tả ngắn cho thông báo (vd. "cập nhật ticket #12")"""
+        if self.operation == "insert":
+            ticket_id = (self.result or {}).get("id")
+            return f"thêm ticket #{ticket_id}" if ticket_id else "thêm ticket"
+        return f"cập nhật ticket #{self.ticket_id}"
+
+
+class WriteQueue:
+    def __init__(self, db_factory=SupabaseHelper):
+        """
+        Args:
+            db_factory (callable): Tạo SupabaseHelper cho thread nền
+        """
+        self.db_factory = db_factory
+        self.requests = 0
+        self._jobs = {}
+        self._queue = deque()
+        self._pending_updates = {}
+        self._ids = itertools.count(1)
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def submit_insert(self, data, user_id, project, owner):
+        """
+        Đưa một thao tác thêm ticket vào hàng đợi
+
+        Args:
+            data (dict): Dữ liệu ticket
+            user_id (int): ID người tạo
+            project (str): Project
+            owner (str): Session gửi thao tác (nhận kết quả qua take_finished)
+
+        Returns:
+            WriteJob: Thao tác đã đưa vào hàng đợi
+        """
+        with self._cond:
+            job = WriteJob(
+                next(self._ids),
+                "insert",
+                data,
+                owner,
+                user_id=user_id,
+                project=project,
+            )
+            return self._enqueue(job)
+
+    def submit_update(self, ticket_id, data, owner):
+        """
+        Đưa một thao tác sửa ticket vào hàng đợi
+
+        Nếu session đã có thao tác sửa ticket này chưa được gửi, dữ liệu được
+        gộp vào thao tác đó (cột trùng lấy giá trị mới) thay vì thêm request.
+
+        Args:
+            ticket_id (int): ID ticket
+            data (dict): Các cột cần sửa
+            owner (str): Session gửi thao tác
+
+        Returns:
+            WriteJob: Thao tác chứa thay đổi này
+        """
+        with self._cond:
+            job = self._pending_updates.get((owner, ticket_id))
+            if job is not None:
+                job.data.update(data)
+                job.coalesced += 1
+                return job
+            job = WriteJob(next(self._ids), "update", data, owner, ticket_id=ticket_id)
+            self._pending_updates[(owner, ticket_id)] = job
+            return self._enqueue(job)
+
+    def _enqueue(self, job):
+        self._jobs[job.id] = job
+        self._queue.append(job.id)
+        self._forget_abandoned()
+        self._ensure_worker()
+        self._cond.notify_all()
+        return job
+
+    def _forget_abandoned(self):
+        """Xóa kết quả cũ mà không session nào nhận"""
+        cutoff = time.monotonic() - JOB_RETENTION_SECONDS
+        for job_id in [
+            job.id
+            for job in self._jobs.values()
+            if job.done and job.finished_at < cutoff
+        ]:
+            del self._jobs[job_id]
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name="ticket-write-queue", daemon=True
+            )
+            self._thread.start()
+
+    def jobs_for(self, owner):
+        """
+        Lấy các thao tác chưa xong của một session (theo thứ tự gửi)
+
+        Returns:
+            list: Các WriteJob đang chờ hoặc đang gửi
+        """
+        with self._cond:
+            return [
+                job
+                for job in self._jobs.values()
+                if job.owner == owner and not job.done
+            ]
+
+    def has_jobs(self, owner):
+        """Session còn thao tác chưa nhận kết quả không"""
+        with self._cond:
+            return any(job.owner == owner for job in self._jobs.values())
+
+    def take_finished(self, owner):
+        """
+        Lấy (một lần) các thao tác đã xong của một session
+
+        Returns:
+            list: Các WriteJob đã xong (DONE hoặc FAILED)
+        """
+        with self._cond:
+            finished = [
+                job for job in self._jobs.values() if job.owner == owner and job.done
+            ]
+            for job in finished:
+                del self._jobs[job.id]
+            return finished
+
+    def wait(self, timeout=None):
+        """
+        Chờ hàng đợi gửi hết các thao tác
+
+        Returns:
+            bool: True nếu không còn thao tác nào chưa xong
+        """
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: all(job.done for job in self._jobs.values()), timeout
+            )
+
+    def _run(self):
+        """Vòng lặp của thread nền: gửi lần lượt từng thao tác"""
+        db = self.db_factory()
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue)
+                job = self._jobs[self._queue.popleft()]
+                key = (job.owner, job.ticket_id)
+                if self._pending_updates.get(key) is job:
+                    # Từ đây, các lần sửa mới tạo thao tác mới (gửi sau thao tác này)
+                    del self._pending_updates[key]
+                job.status = RUNNING
+
+            try:
+                result, error = self._apply(db, job), None
+            except Exception as e:
+                result, error = None, str(e) or type(e).__name__
+
+            with self._cond:
+                self.requests += 1
+                job.result = result
+                job.error = error
+                job.status = FAILED if error else DONE
+                job.finished_at = time.monotonic()
+                self._cond.notify_all()
+
+    def _apply(self, db, job):
+        """
+        Gửi một thao tác tới Supabase
+
+        Gọi thẳng query (không qua insert_ticket/update_data) để lỗi được ném
+        ra thay vì hiển thị bằng st.error từ thread nền. Cache, snapshot và
+        change feed vẫn được cập nhật qua _after_write.
+
+        Returns:
+            dict: Dòng Supabase trả về (đầy đủ các cột, đã chuẩn hóa)
+
+        Raises:
+            Exception: Lỗi của Supabase, hoặc LookupError nếu ticket không còn
+        """
+        if job.operation == "insert":
+            project = job.context["project"]
+            data = {
+                **job.data,
+                "created_by": job.context["user_id"],
+                "project": project,
+            }
+            response = db._execute(db.supabase.table("tickets").insert(data))
+            db._after_write("tickets", "insert", response.data, {project})
+        else:
+            response = db._execute(
+                db.supabase.table("tickets")
+                .update(dict(job.data))
+                .eq("id", job.ticket_id)
+            )
+            db._after_write(
+                "tickets",
+                "update",
+                response.data,
+                db._affected_projects(response.data, job.data),
+            )
+        if not response.data:
+            raise LookupError(f"Không tìm thấy ticket #{job.ticket_id}")
+        return response.data[0]
+
+
+def _pending_row(ticket, data):
+    """Bản lạc quan của một ticket: dữ liệu cũ + thay đổi đang chờ"""
+    row = {**ticket, **data}
+    if "noi_dung" in data or "ghi_chu" in data:
+        add_ticket_previews([row])
+    row["dang_luu"] = True
+    return normalize_ticket(row)
+
+
+def apply_pending(tickets, jobs, include_inserts=False, ticket_filter=None):
+    """
+    Áp dụng các thao tác đang chờ lên các dòng đã tải (cập nhật lạc quan)
+
+    Các dòng được sao chép, cache và snapshot không bị sửa. Dòng lạc quan có
+    cột dang_luu = True.
+
+    Args:
+        tickets (list): Các tickets đang hiển thị
+        jobs (list): Các WriteJob chưa xong của session (jobs_for)
+        include_inserts (bool): Thêm các ticket đang được tạo lên đầu danh sách
+        ticket_filter (TicketFilter): Chỉ thêm các ticket mới khớp bộ lọc
+
+    Returns:
+        list: Danh sách mới
+    """
+    updates = {}
+    for job in jobs:
+        if job.operation == "update":
+            updates.setdefault(job.ticket_id, {}).update(job.data)
+
+    rows = [
+        _pending_row(ticket, updates[ticket.get("id")])
+        if ticket.get("id") in updates
+        else ticket
+        for ticket in tickets
+    ]
+    if include_inserts:
+        # Ngày tạo thật do database gán khi insert
+        created_at = datetime.now().isoformat()
+        created = [
+            _pending_row(
+                {
+                    "created_by": job.context["user_id"],
+                    "project": job.context["project"],
+                    "ngay_yeu_cau": created_at,
+                },
+                job.data,
+            )
+            for job in jobs
+            if job.operation == "insert"
+        ]
+        created = [
+            row
+            for row in reversed(created)
+            if ticket_filter is None or ticket_filter.matches(row)
+        ]
+        rows = created + rows
+    return rows
+
+
+_write_queue = None
+_write_queue_lock = threading.Lock()
+
+
+def get_write_queue():
+    """
+    Lấy hàng đợi ghi dùng chung trong process
+
+    Returns:
+        WriteQueue: Hàng đợi của process
+    """
+    global _write_queue
+    with _write_queue_lock:
+        if _write_queue is None:
+            _write_queue = WriteQueue()
+        return _write_queue